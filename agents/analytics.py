@@ -0,0 +1,187 @@
+"""
+Vectorized holder and flow analytics over decoded Transfer events.
+
+Events are consumed in column chunks (block, from, to, value) and folded
+into per-address and per-bucket accumulators with NumPy group-bys, so memory
+grows with the number of distinct addresses and buckets, not with the number
+of events. uint256 amounts do not fit a NumPy dtype, so they are split into
+32-bit limbs; per-chunk limb sums are exact in float64 bincounts as long as a
+chunk has at most 2**20 events, and are carried in int64 accumulators.
+Exact Python ints are only rebuilt for the addresses and buckets reported.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CHUNK = 1 << 20
+LIMB_BITS = 32
+LIMBS = 256 // LIMB_BITS
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# (blocks, from addresses, to addresses, value limbs)
+Columns = Tuple[np.ndarray, Sequence[str], Sequence[str], np.ndarray]
+
+
+def split_limbs(values: Sequence[Any]) -> np.ndarray:
+    """(n, LIMBS) int64 array of 32-bit limbs for uint256 values given as ints or decimal strings."""
+    out = np.zeros((len(values), LIMBS), dtype=np.int64)
+    if not len(values):
+        return out
+    try:
+        lo = np.fromiter(map(int, values), dtype=np.uint64, count=len(values))
+        small: Any = slice(None)
+    except OverflowError:  # some value needs more than 64 bits
+        ints = np.fromiter(map(int, values), dtype=object, count=len(values))
+        small = (ints < 1 << 64).astype(bool)
+        lo = ints[small].astype(np.uint64)
+        for i in np.flatnonzero(~small).tolist():
+            v = int(ints[i])
+            for k in range(LIMBS):
+                out[i, k] = (v >> (LIMB_BITS * k)) & 0xFFFFFFFF
+    out[small, 0] = (lo & np.uint64(0xFFFFFFFF)).astype(np.int64)
+    out[small, 1] = (lo >> np.uint64(32)).astype(np.int64)
+    return out
+
+
+def join_limbs(limbs: np.ndarray) -> np.ndarray:
+    """Object array of exact Python ints from rows of (possibly negative or over-full) limb sums."""
+    total = np.zeros(len(limbs), dtype=object)
+    for k in range(limbs.shape[1]):
+        total = total + limbs[:, k].astype(object) * (1 << (LIMB_BITS * k))
+    return total
+
+
+def approx_limbs(limbs: np.ndarray) -> np.ndarray:
+    scale = 2.0 ** (LIMB_BITS * np.arange(limbs.shape[1]))
+    return limbs.astype(np.float64) @ scale
+
+
+def chunk_columns(rows: Iterable[Tuple[int, str, str, Any]], size: int = CHUNK) -> Iterator[Columns]:
+    """Group (block, from, to, value) rows into column chunks of at most `size` events."""
+    size = min(int(size), CHUNK)
+    batch: List[Tuple[int, str, str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield to_columns(batch)
+            batch = []
+    if batch:
+        yield to_columns(batch)
+
+
+def to_columns(rows: Sequence[Tuple[int, str, str, Any]]) -> Columns:
+    # Addresses stay Python strings: interning them through a dict is far
+    # cheaper than sorting 42-char unicode arrays
+    blocks = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    src = [r[1] for r in rows]
+    dst = [r[2] for r in rows]
+    return blocks, src, dst, split_limbs([r[3] for r in rows])
+
+
+def event_rows(events: Iterable[Dict[str, Any]]) -> Iterator[Tuple[int, str, str, Any]]:
+    """(block, from, to, value) rows from decoded ERC-20 Transfer dicts (agents/tools/logs.py)."""
+    for ev in events:
+        if "value" in ev:
+            yield ev["block"], ev["from"], ev["to"], ev["value"]
+
+
+class FlowStats:
+    """Streaming accumulator for net balances, bucketed volume and unique senders."""
+
+    def __init__(self, bucket_blocks: int = 1_000) -> None:
+        self.bucket_blocks = int(bucket_blocks)
+        self.addresses: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._net = np.zeros((0, LIMBS), dtype=np.int64)
+        self._buckets: Dict[int, Dict[str, Any]] = {}
+        self.events = 0
+
+    def _intern(self, addrs: Sequence[str]) -> np.ndarray:
+        ids = self._ids
+        for a in set(addrs).difference(ids):
+            ids[a] = len(self.addresses)
+            self.addresses.append(a)
+        return np.fromiter(map(ids.__getitem__, addrs), dtype=np.int64, count=len(addrs))
+
+    def add(self, cols: Columns) -> None:
+        blocks, src, dst, limbs = cols
+        n = len(blocks)
+        if not n:
+            return
+        if n > CHUNK:
+            raise ValueError(f"chunk of {n} events exceeds {CHUNK}; use chunk_columns()")
+        src_ids = self._intern(src)
+        dst_ids = self._intern(dst)
+        size = len(self.addresses)
+        if size > len(self._net):
+            grown = np.zeros((max(size, 2 * len(self._net)), LIMBS), dtype=np.int64)
+            grown[:len(self._net)] = self._net
+            self._net = grown
+        used = [k for k in range(LIMBS) if limbs[:, k].any()]
+        for k in used:
+            w = limbs[:, k].astype(np.float64)
+            self._net[:size, k] += np.bincount(dst_ids, weights=w, minlength=size).astype(np.int64)
+            self._net[:size, k] -= np.bincount(src_ids, weights=w, minlength=size).astype(np.int64)
+
+        buckets = blocks // self.bucket_blocks
+        ub, bidx = np.unique(buckets, return_inverse=True)
+        counts = np.bincount(bidx, minlength=len(ub))
+        volume = np.zeros((len(ub), LIMBS), dtype=np.int64)
+        for k in used:
+            volume[:, k] = np.bincount(bidx, weights=limbs[:, k].astype(np.float64), minlength=len(ub)).astype(np.int64)
+        order = np.argsort(bidx, kind="stable")
+        bounds = np.searchsorted(bidx[order], np.arange(len(ub) + 1))
+        sorted_src = src_ids[order]
+        for i, b in enumerate(ub.tolist()):
+            senders = np.unique(sorted_src[bounds[i]:bounds[i + 1]])
+            acc = self._buckets.get(b)
+            if acc is None:
+                self._buckets[b] = {"count": int(counts[i]), "volume": volume[i], "senders": senders}
+            else:
+                acc["count"] += int(counts[i])
+                acc["volume"] = acc["volume"] + volume[i]
+                acc["senders"] = np.union1d(acc["senders"], senders)
+        self.events += n
+
+    def net_balances(self) -> Dict[str, int]:
+        """Exact net flow per address (negative for net senders such as the mint address)."""
+        size = len(self.addresses)
+        return dict(zip(self.addresses, join_limbs(self._net[:size]).tolist()))
+
+    def holders(self, top: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Addresses with a positive balance, largest first (all of them when top is None)."""
+        size = len(self.addresses)
+        net = self._net[:size]
+        approx = approx_limbs(net)
+        if ZERO_ADDRESS in self._ids:
+            approx[self._ids[ZERO_ADDRESS]] = 0.0
+        idx = np.flatnonzero(approx > 0)
+        if top is not None and len(idx) > 4 * top:
+            # Rank by the float estimate, then order a margin of candidates exactly
+            idx = idx[np.argpartition(-approx[idx], 4 * top)[:4 * top]]
+        exact = join_limbs(net[idx]).tolist()
+        out = sorted(((self.addresses[i], v) for i, v in zip(idx.tolist(), exact) if v > 0), key=lambda x: -x[1])
+        return out[:top] if top is not None else out
+
+    def over_time(self) -> List[Dict[str, Any]]:
+        """Per bucket: first block, transfer count, exact volume and unique senders, in block order."""
+        keys = sorted(self._buckets)
+        if not keys:
+            return []
+        volumes = join_limbs(np.stack([self._buckets[b]["volume"] for b in keys])).tolist()
+        return [
+            {
+                "from_block": b * self.bucket_blocks,
+                "count": self._buckets[b]["count"],
+                "volume": v,
+                "unique_senders": int(len(self._buckets[b]["senders"])),
+            }
+            for b, v in zip(keys, volumes)
+        ]
+
+
+def flow_stats(columns: Iterable[Columns], bucket_blocks: int = 1_000) -> FlowStats:
+    stats = FlowStats(bucket_blocks)
+    for cols in columns:
+        stats.add(cols)
+    return stats
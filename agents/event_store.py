@@ -0,0 +1,188 @@
+"""
+Local SQLite store of decoded Transfer events.
+
+Transfers are keyed by (token, block, log_index), indexed by sender and
+recipient, and each token remembers the block span already indexed, so
+`sync` only asks the node for blocks outside that span. Only blocks at least
+EVM_CACHE_CONFIRMATIONS deep are indexed, since the span is never fetched
+again and a reorg above it would leave orphaned transfers behind. Holder balances and
+transfer histograms are then answered from disk without RPC (aggregation is
+in agents/analytics.py). Amounts are uint256 and are stored as decimal text
+because SQLite integers are 64-bit.
+"""
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agents.tools.blocks import chain_cache
+from agents.tools.logs import scan_transfers
+from agents.tools.rpc import RPC, to_checksum_address
+
+STORE_PATH = Path(__file__).resolve().parents[1] / "runs" / "events.sqlite"
+COMMIT_EVERY = 5_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transfers (
+    token TEXT NOT NULL,
+    block INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    tx_hash TEXT NOT NULL,
+    from_addr TEXT NOT NULL,
+    to_addr TEXT NOT NULL,
+    value TEXT,
+    token_id TEXT,
+    PRIMARY KEY (token, block, log_index)
+);
+CREATE INDEX IF NOT EXISTS idx_transfers_from ON transfers (from_addr);
+CREATE INDEX IF NOT EXISTS idx_transfers_to ON transfers (to_addr);
+CREATE TABLE IF NOT EXISTS sync_state (
+    token TEXT PRIMARY KEY,
+    first_block INTEGER NOT NULL,
+    last_block INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+COLUMNS = ("token", "block", "log_index", "tx_hash", "from", "to", "value", "token_id")
+
+
+class EventStore:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        env_path = os.environ.get("EVENT_STORE_PATH")
+        self.path = path if path is not None else (Path(env_path) if env_path else STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def span(self, token: str) -> Optional[Tuple[int, int]]:
+        """(first_block, last_block) already indexed for a token, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT first_block, last_block FROM sync_state WHERE token = ?", (to_checksum_address(token),)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def add_transfers(self, token: str, events: Iterable[Dict[str, Any]], first_block: int, last_block: int) -> int:
+        """Insert events and, in the same transaction, widen the token's indexed span by [first_block, last_block].
+
+        The span only grows when the new range overlaps or touches it, so it
+        never claims a gap that was not fetched.
+        """
+        token = to_checksum_address(token)
+        rows = [
+            (token, ev["block"], ev["log_index"], ev["tx_hash"], ev["from"], ev["to"],
+             str(ev["value"]) if "value" in ev else None,
+             str(ev["token_id"]) if "token_id" in ev else None)
+            for ev in events
+        ]
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany("INSERT OR IGNORE INTO transfers VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            added = self._db.total_changes - before
+            self._db.execute(
+                "INSERT INTO sync_state VALUES (?, ?, ?, ?) ON CONFLICT(token) DO UPDATE SET "
+                "first_block = min(first_block, excluded.first_block), "
+                "last_block = max(last_block, excluded.last_block), updated_at = excluded.updated_at "
+                "WHERE excluded.first_block <= last_block + 1 AND excluded.last_block >= first_block - 1",
+                (token, first_block, last_block, time.time()),
+            )
+        return added
+
+    def _fetch(self, rpc: RPC, token: str, start: int, end: int, **scan_kwargs: Any) -> int:
+        # Commit in slices that end on a block boundary so an interrupted sync resumes cleanly
+        added, batch = 0, []
+        for ev in scan_transfers(rpc, token, start, end, **scan_kwargs):
+            if len(batch) >= COMMIT_EVERY and ev["block"] != batch[-1]["block"]:
+                added += self.add_transfers(token, batch, start, ev["block"] - 1)
+                batch = []
+            batch.append(ev)
+        return added + self.add_transfers(token, batch, start, end)
+
+    def sync(self, rpc: RPC, token: str, start: int, end: int, confirmations: Optional[int] = None,
+             **scan_kwargs: Any) -> Dict[str, Any]:
+        """Index [start, end] for a token, fetching only blocks outside the span already stored.
+
+        `end` is capped at the head minus `confirmations` (default: the block
+        cache's depth); the result's `confirmed_to` is that cap. A range that
+        does not touch the stored span is extended to it, so the span stays
+        one contiguous interval.
+        """
+        cache = chain_cache(rpc)
+        confirmed_to = cache.block_number() - (cache.confirmations if confirmations is None else confirmations)
+        end = min(end, confirmed_to)
+        span = self.span(token)
+        ranges = [(start, end)]
+        if span is not None:
+            ranges = [(start, span[0] - 1), (span[1] + 1, end)]
+        ranges = [(a, b) for a, b in ranges if a <= b]
+        added = sum(self._fetch(rpc, token, a, b, **scan_kwargs) for a, b in ranges)
+        return {"token": to_checksum_address(token), "fetched": ranges, "added": added, "span": self.span(token),
+                "confirmed_to": confirmed_to}
+
+    def transfers(self, token: str, start: Optional[int] = None, end: Optional[int] = None,
+                  address: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stored transfers of a token in block order, optionally within a block range or touching an address."""
+        sql, args = "SELECT * FROM transfers WHERE token = ?", [to_checksum_address(token)]
+        if start is not None:
+            sql += " AND block >= ?"
+            args.append(start)
+        if end is not None:
+            sql += " AND block <= ?"
+            args.append(end)
+        if address is not None:
+            sql += " AND (from_addr = ? OR to_addr = ?)"
+            args += [to_checksum_address(address)] * 2
+        sql += " ORDER BY block, log_index"
+        with self._lock:
+            rows = self._db.execute(sql, args).fetchall()
+        for row in rows:
+            ev = {k: v for k, v in zip(COLUMNS, row) if v is not None}
+            for k in ("value", "token_id"):
+                if k in ev:
+                    ev[k] = int(ev[k])
+            yield ev
+
+    def rows(self, token: str, start: Optional[int] = None, end: Optional[int] = None,
+             chunk: int = 100_000) -> Iterator[Tuple[int, str, str, str]]:
+        """Stream (block, from, to, value) of a token's ERC-20 transfers in block order on a separate read connection."""
+        sql, args = "SELECT block, from_addr, to_addr, value FROM transfers WHERE token = ? AND value IS NOT NULL", [
+            to_checksum_address(token)
+        ]
+        if start is not None:
+            sql += " AND block >= ?"
+            args.append(start)
+        if end is not None:
+            sql += " AND block <= ?"
+            args.append(end)
+        db = sqlite3.connect(str(self.path))
+        try:
+            cur = db.execute(sql + " ORDER BY block, log_index", args)
+            while True:
+                batch = cur.fetchmany(chunk)
+                if not batch:
+                    break
+                yield from batch
+        finally:
+            db.close()
+
+    def holders(self, token: str, limit: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Addresses with a positive net balance from stored transfers, largest first."""
+        from agents.analytics import chunk_columns, flow_stats
+
+        return flow_stats(chunk_columns(self.rows(token))).holders(limit)
+
+    def transfers_over_time(self, token: str, bucket_blocks: int = 1_000) -> List[Dict[str, Any]]:
+        """Transfer count, volume and unique senders per bucket of `bucket_blocks` blocks."""
+        from agents.analytics import chunk_columns, flow_stats
+
+        return flow_stats(chunk_columns(self.rows(token)), bucket_blocks).over_time()
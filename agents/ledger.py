@@ -0,0 +1,195 @@
+"""
+Sliding-window spend ledger for budget policies.
+
+Each charge is one entry shared by every window that tracks its wallet and
+destination; windows keep running value/count sums and evict expired entries
+from the left, so a check is O(budgets) amortized. Charges are appended to a
+JSONL file before `charge` returns, so a crash after the transaction is sent
+cannot forget one; refunds are buffered and written with the next charge or
+flush. The file is replayed on startup so budgets survive a restart.
+"""
+import atexit
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from agents.policies import Budget
+
+LEDGER_PATH = Path(__file__).resolve().parents[1] / "runs" / "spend-ledger.jsonl"
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_HORIZON = 86_400
+
+
+class Entry:
+    __slots__ = ("id", "ts", "value", "count")
+
+    def __init__(self, id: int, ts: float, value: int) -> None:
+        self.id = id
+        self.ts = ts
+        self.value = value
+        self.count = 1
+
+
+class Window:
+    __slots__ = ("seconds", "entries", "value", "count")
+
+    def __init__(self, seconds: int, history: Iterable[Entry], now: float) -> None:
+        self.seconds = seconds
+        self.entries: Deque[Entry] = deque(e for e in history if e.ts > now - seconds)
+        self.value = sum(e.value for e in self.entries)
+        self.count = sum(e.count for e in self.entries)
+
+    def evict(self, now: float) -> None:
+        cutoff = now - self.seconds
+        while self.entries and self.entries[0].ts <= cutoff:
+            e = self.entries.popleft()
+            self.value -= e.value
+            self.count -= e.count
+
+    def add(self, e: Entry) -> None:
+        self.entries.append(e)
+        self.value += e.value
+        self.count += e.count
+
+
+class Charge:
+    __slots__ = ("entry", "windows")
+
+    def __init__(self, entry: Entry, windows: List[Window]) -> None:
+        self.entry = entry
+        self.windows = windows
+
+
+class SpendLedger:
+    def __init__(self, path: Optional[Path] = None, flush_interval: Optional[float] = None) -> None:
+        env_path = os.environ.get("POLICY_LEDGER_PATH")
+        self.path = path if path is not None else (Path(env_path) if env_path else LEDGER_PATH)
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.environ.get("POLICY_LEDGER_FLUSH_INTERVAL", DEFAULT_FLUSH_INTERVAL)
+        )
+        self.horizon = DEFAULT_HORIZON
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history: Dict[str, Deque[Entry]] = {}
+        self._windows: Dict[str, Dict[int, Window]] = {}
+        self._buffer: List[str] = []
+        self._flushed_at = time.monotonic()
+        self._loaded = False
+
+    @staticmethod
+    def keys(wallet: str, to: str) -> Tuple[str, str]:
+        return "wallet:" + wallet.lower(), "destination:" + to.lower()
+
+    def _window(self, key: str, seconds: int, now: float) -> Window:
+        per_key = self._windows.setdefault(key, {})
+        w = per_key.get(seconds)
+        if w is None:
+            # New budget window: seed it from the raw history kept for the key
+            w = per_key[seconds] = Window(seconds, self._history.get(key, ()), now)
+        else:
+            w.evict(now)
+        return w
+
+    def _record(self, key: str, e: Entry, now: float) -> List[Window]:
+        hist = self._history.setdefault(key, deque())
+        hist.append(e)
+        cutoff = now - self.horizon
+        while hist and hist[0].ts <= cutoff:
+            hist.popleft()
+        windows = list(self._windows.get(key, {}).values())
+        for w in windows:
+            w.add(e)
+        return windows
+
+    def charge(self, budgets: List[Budget], wallet: str, to: str, value_wei: int, now: Optional[float] = None) -> Charge:
+        """Check every budget for this transfer and record it; raises ValueError on violation."""
+        now = time.time() if now is None else now
+        keys = dict(zip(("wallet", "destination"), self.keys(wallet, to)))
+        with self._lock:
+            self.horizon = max([self.horizon] + [b.window_s for b in budgets])
+            self._ensure_loaded()
+            for b in budgets:
+                w = self._window(keys[b.scope], b.window_s, now)
+                if b.max_value_wei is not None and w.value + value_wei > b.max_value_wei:
+                    raise ValueError(f"{b.scope} spend over {b.window} would exceed {b.max_value_wei} wei")
+                if b.max_tx_count is not None and w.count + 1 > b.max_tx_count:
+                    raise ValueError(f"{b.scope} tx count over {b.window} would exceed {b.max_tx_count}")
+            e = Entry(next(self._ids), now, int(value_wei))
+            windows = self._record(keys["wallet"], e, now) + self._record(keys["destination"], e, now)
+            self._append({"id": e.id, "ts": now, "wallet": wallet.lower(), "to": to.lower(), "value": e.value})
+            if self.path:
+                self._flush_locked()
+            return Charge(e, windows)
+
+    def refund(self, charge: Charge) -> None:
+        """Undo a charge whose transaction was never broadcast."""
+        with self._lock:
+            e = charge.entry
+            for w in charge.windows:
+                if w.entries and w.entries[0].ts <= e.ts:
+                    w.value -= e.value
+                    w.count -= e.count
+            e.value = 0
+            e.count = 0
+            self._append({"refund": e.id})
+
+    def _append(self, rec: Dict) -> None:
+        if not self.path:
+            return
+        self._buffer.append(json.dumps(rec))
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        self._flushed_at = time.monotonic()
+        if not self._buffer:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a") as f:
+            f.write("\n".join(self._buffer) + "\n")
+        self._buffer.clear()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _ensure_loaded(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not self.path.exists():
+            return
+        now = time.time()
+        records: Dict[int, Dict] = {}
+        total = max_id = 0
+        for line in self.path.read_text().splitlines():
+            total += 1
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn write at crash time
+            if "refund" in rec:
+                records.pop(rec["refund"], None)
+                continue
+            max_id = max(max_id, rec["id"])
+            if rec["ts"] > now - self.horizon:
+                records[rec["id"]] = rec
+        for rec in sorted(records.values(), key=lambda r: r["ts"]):
+            e = Entry(rec["id"], rec["ts"], int(rec["value"]))
+            for key in self.keys(rec["wallet"], rec["to"]):
+                self._history.setdefault(key, deque()).append(e)
+        self._ids = itertools.count(max_id + 1)
+        if total > 2 * len(records) + 1000:
+            # Compact: rewrite only live entries, atomically
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text("".join(json.dumps(r) + "\n" for r in sorted(records.values(), key=lambda r: r["ts"])))
+            tmp.replace(self.path)
+
+
+LEDGER = SpendLedger()
+atexit.register(LEDGER.flush)
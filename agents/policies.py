@@ -1,19 +1,157 @@
-from dataclasses import dataclass
-from typing import List
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+
+POLICY_PATH = Path(__file__).resolve().parents[1] / "config" / "policies.yaml"
+DEFAULT_RELOAD_INTERVAL = 1.0
+WINDOW_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86_400}
+
+
+def parse_window(window: Any) -> int:
+    """Window length in seconds from an int or a string like 30s, 5m, 1h, 1d."""
+    if isinstance(window, int):
+        return window
+    w = str(window).strip().lower()
+    if w[-1:] in WINDOW_UNITS:
+        return int(w[:-1]) * WINDOW_UNITS[w[-1]]
+    return int(w)
+
+
+@dataclass(frozen=True)
+class Budget:
+    scope: str  # "wallet" or "destination"
+    window: str
+    window_s: int
+    max_value_wei: Optional[int] = None
+    max_tx_count: Optional[int] = None
 
 
 @dataclass
 class SpendPolicy:
-    max_value_wei: int
+    max_value_wei: Optional[int]
     allowlist: List[str]
     denylist: List[str]
+    budgets: List[Budget] = field(default_factory=list)
+    _allow: FrozenSet[str] = field(init=False, repr=False, compare=False)
+    _deny: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Normalize once so each check is a set lookup
+        self._allow = frozenset(a.lower() for a in self.allowlist if a)
+        self._deny = frozenset(a.lower() for a in self.denylist if a)
 
     def check(self, to_addr: str, value_wei: int) -> None:
+        self.check_limit(to_addr, value_wei, self.max_value_wei)
+
+    def check_limit(self, to_addr: str, value_wei: int, limit: Optional[int]) -> None:
+        """Same as check() but with an explicit value limit (None = no limit)."""
         ta = to_addr.lower()
-        if ta in {a.lower() for a in self.denylist}:
+        if ta in self._deny:
             raise ValueError("Destination is denylisted")
-        if self.allowlist and ta not in {a.lower() for a in self.allowlist}:
+        if self._allow and ta not in self._allow:
             raise ValueError("Destination not in allowlist")
-        if value_wei > self.max_value_wei:
+        if limit is not None and value_wei > limit:
             raise ValueError("Transfer exceeds policy max value")
 
+
+def load_policy(path: Path = POLICY_PATH) -> Dict[str, Any]:
+    # Load policy from config/policies.yaml if present; else use env overrides
+    data: Dict[str, Any] = {}
+    if path.exists():
+        import yaml  # deferred: only needed when a policy file exists
+
+        data = yaml.safe_load(path.read_text()) or {}
+    evm = data.get("evm", {})
+    # Env overrides
+    if os.environ.get("POLICY_MAX_VALUE_WEI"):
+        evm["max_value_wei"] = int(os.environ["POLICY_MAX_VALUE_WEI"])
+    if os.environ.get("POLICY_ALLOWLIST"):
+        evm["allowlist"] = [x.strip() for x in os.environ["POLICY_ALLOWLIST"].split(",") if x.strip()]
+    if os.environ.get("POLICY_DENYLIST"):
+        evm["denylist"] = [x.strip() for x in os.environ["POLICY_DENYLIST"].split(",") if x.strip()]
+    return evm
+
+
+def compile_budget(raw: Dict[str, Any]) -> Budget:
+    scope = raw.get("scope", "wallet")
+    if scope not in ("wallet", "destination"):
+        raise ValueError(f"Unknown budget scope: {scope}")
+    mv, mc = raw.get("max_value_wei"), raw.get("max_tx_count")
+    return Budget(
+        scope=scope,
+        window=str(raw["window"]),
+        window_s=parse_window(raw["window"]),
+        max_value_wei=int(mv) if mv is not None else None,
+        max_tx_count=int(mc) if mc is not None else None,
+    )
+
+
+def compile_policy(evm: Dict[str, Any]) -> SpendPolicy:
+    # In config files a max_value_wei of 0 (or none) means "no limit"
+    return SpendPolicy(
+        max_value_wei=int(evm.get("max_value_wei") or 0) or None,
+        allowlist=list(evm.get("allowlist") or []),
+        denylist=list(evm.get("denylist") or []),
+        budgets=[compile_budget(b) for b in evm.get("budgets") or []],
+    )
+
+
+class PolicyCache:
+    """Compiled SpendPolicy cached in-process.
+
+    The policy file is stat'ed at most once per reload interval and recompiled
+    only when its mtime/size or the POLICY_* env overrides change; a SIGHUP
+    (see install_sighup) forces a reload on the next check.
+    """
+
+    def __init__(self, path: Path = POLICY_PATH, interval: Optional[float] = None) -> None:
+        self.path = path
+        self.interval = interval if interval is not None else float(
+            os.environ.get("POLICY_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL)
+        )
+        self._lock = threading.Lock()
+        self._policy: Optional[SpendPolicy] = None
+        self._stamp: Optional[Tuple[Any, ...]] = None
+        self._checked_at = 0.0
+        self._dirty = True
+
+    def _fingerprint(self) -> Tuple[Any, ...]:
+        try:
+            st = self.path.stat()
+            file_key: Tuple[Any, ...] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            file_key = (None, None)
+        env_key = tuple(os.environ.get(k) for k in ("POLICY_MAX_VALUE_WEI", "POLICY_ALLOWLIST", "POLICY_DENYLIST"))
+        return file_key + env_key
+
+    def get(self) -> SpendPolicy:
+        now = time.monotonic()
+        if self._policy is not None and not self._dirty and now - self._checked_at < self.interval:
+            return self._policy
+        with self._lock:
+            stamp = self._fingerprint()
+            if self._policy is None or self._dirty or stamp != self._stamp:
+                self._policy = compile_policy(load_policy(self.path))
+                self._stamp = stamp
+                self._dirty = False
+            self._checked_at = now
+            return self._policy
+
+    def invalidate(self) -> None:
+        self._dirty = True
+
+
+POLICY = PolicyCache()
+
+
+def install_sighup() -> bool:
+    """Reload policies on SIGHUP; only possible from the main thread."""
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signal.SIGHUP, lambda *_: POLICY.invalidate())
+    return True
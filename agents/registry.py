@@ -2,35 +2,191 @@
 import argparse
 import importlib
 import json
-from typing import Any, Dict
+import os
+import itertools
+import socket
+import socketserver
+import stat
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, IO
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents.tools.evm import close_ctx, init_ctx
 
 
 REGISTRY = {
     "evm.get_balance": ("agents.tools.evm", "get_balance"),
+    "evm.get_balances": ("agents.tools.evm", "get_balances"),
+    "evm.multicall": ("agents.tools.evm", "multicall"),
     "evm.simulate_transfer": ("agents.tools.evm", "simulate_transfer"),
     "evm.send_transfer": ("agents.tools.evm", "send_transfer"),
 }
 
+_RESOLVED: Dict[str, Callable[..., Any]] = {}
+
+
+def resolve(tool: str) -> Callable[..., Any]:
+    fn = _RESOLVED.get(tool)
+    if fn is None:
+        if tool not in REGISTRY:
+            raise SystemExit(f"Unknown tool: {tool}")
+        mod_name, fn_name = REGISTRY[tool]
+        fn = _RESOLVED[tool] = getattr(importlib.import_module(mod_name), fn_name)
+    return fn
+
 
 def run(tool: str, payload: Dict[str, Any]) -> Any:
-    if tool not in REGISTRY:
-        raise SystemExit(f"Unknown tool: {tool}")
-    mod_name, fn_name = REGISTRY[tool]
-    mod = importlib.import_module(mod_name)
-    fn = getattr(mod, fn_name)
-    return fn(**payload)
+    return resolve(tool)(**payload)
+
+
+def handle(line: str) -> Dict[str, Any]:
+    """Run one JSON-lines request: {"id", "tool", "args"} -> {"id", "ok", "result"|"error"}."""
+    rid = None
+    try:
+        req = json.loads(line)
+        rid = req.get("id")
+        return {"id": rid, "ok": True, "result": run(req["tool"], req.get("args") or {})}
+    except (Exception, SystemExit) as e:
+        return {"id": rid, "ok": False, "error": str(e)}
+
+
+def warm() -> None:
+    for tool in REGISTRY:
+        resolve(tool)
+    try:
+        init_ctx()
+    except SystemExit:
+        pass  # env not set yet; the context stays lazy
+
+
+def serve_stream(inp: IO[str], out: IO[str], workers: int = 1) -> None:
+    """Answer JSON-lines requests from inp on out; with workers > 1 replies may be out of order."""
+    lock = threading.Lock()
+
+    def reply(resp: Dict[str, Any]) -> None:
+        data = json.dumps(resp, default=str)
+        with lock:
+            out.write(data + "\n")
+            out.flush()
+
+    if workers <= 1:
+        for line in inp:
+            if line.strip():
+                reply(handle(line))
+        return
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for line in inp:
+            if line.strip():
+                pool.submit(handle, line).add_done_callback(lambda f: reply(f.result()))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        inp = (line.decode() for line in self.rfile)
+        out = _SocketWriter(self.wfile)
+        serve_stream(inp, out, self.server.workers)
+
+
+class _SocketWriter:
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+
+    def write(self, s: str) -> None:
+        self.wfile.write(s.encode())
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    workers = 1
+
+
+def remove_stale_socket(path: str) -> None:
+    """Remove a socket left behind by a registry that exited; refuse anything else at `path`."""
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise SystemExit(f"{path} exists and is not a socket; refusing to remove it")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except ConnectionRefusedError:
+            os.unlink(path)
+            return
+    raise SystemExit(f"A registry is already listening on {path}")
+
+
+def serve_socket(path: str, workers: int = 1) -> None:
+    remove_stale_socket(path)
+    with _UnixServer(path, _Handler) as srv:
+        srv.workers = workers
+        print(f"Registry listening on {path}", file=sys.stderr)
+        try:
+            srv.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+class RegistryClient:
+    """Synchronous client for a `--socket` registry daemon."""
+
+    def __init__(self, path: str) -> None:
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._file = self._sock.makefile("rw")
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def run(self, tool: str, payload: Dict[str, Any]) -> Any:
+        with self._lock:
+            self._file.write(json.dumps({"id": next(self._ids), "tool": tool, "args": payload}) + "\n")
+            self._file.flush()
+            resp = json.loads(self._file.readline())
+        if not resp["ok"]:
+            raise SystemExit(resp["error"])
+        return resp["result"]
+
+    def close(self) -> None:
+        self._file.close()
+        self._sock.close()
 
 
 def main():
     p = argparse.ArgumentParser(description="Simple tool registry CLI")
-    p.add_argument("tool", help="e.g. evm.get_balance")
-    p.add_argument("json_payload", help='JSON, e.g. {"address":"0x..."}')
+    p.add_argument("tool", nargs="?", help="e.g. evm.get_balance")
+    p.add_argument("json_payload", nargs="?", help='JSON, e.g. {"address":"0x..."}')
+    p.add_argument("--serve", action="store_true", help="stay resident and answer JSON-lines requests on stdin")
+    p.add_argument("--socket", help="stay resident and answer JSON-lines requests on this Unix socket")
+    p.add_argument("--workers", type=int, default=1, help="concurrent requests per stream in daemon mode")
     args = p.parse_args()
+    if args.serve or args.socket:
+        warm()
+        try:
+            if args.socket:
+                serve_socket(args.socket, args.workers)
+            else:
+                serve_stream(sys.stdin, sys.stdout, args.workers)
+        finally:
+            close_ctx()
+        return
+    if not args.tool or args.json_payload is None:
+        p.error("tool and json_payload are required unless --serve/--socket is given")
     payload = json.loads(args.json_payload)
-    out = run(args.tool, payload)
+    try:
+        out = run(args.tool, payload)
+    finally:
+        close_ctx()
     print(json.dumps(out, indent=2))
 
 
 if __name__ == "__main__":
     main()
-
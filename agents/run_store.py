@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Shared store for run records and lab artifacts.
+
+Every writer (evaluation harness, lab runner, playbooks, lab scripts)
+appends one row per run to a SQLite file in WAL mode, so concurrent
+processes can write while reports read. Rows get a unique, time-ordered id
+and are indexed by lab, framework, task, tool and start time; the record
+itself is kept as JSON. `python agents/run_store.py import` loads the
+legacy `runs/*.json` / `*.jsonl` files once (each source is remembered, so
+re-imports are skipped).
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+ROOT = Path(__file__).resolve().parents[1]
+STORE_PATH = ROOT / "runs" / "runs.sqlite"
+BUSY_TIMEOUT_MS = 30_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    lab TEXT,
+    framework TEXT,
+    task TEXT,
+    tool TEXT,
+    started_at REAL NOT NULL,
+    success INTEGER,
+    latency_ms REAL,
+    source TEXT UNIQUE,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_lab ON runs (lab, framework, task, started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_tool ON runs (lab, tool);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+"""
+
+COLUMNS = ("id", "kind", "lab", "framework", "task", "tool", "started_at", "success", "latency_ms", "source", "body")
+
+
+def new_run_id(at: Optional[float] = None) -> str:
+    """Sortable unique id: UTC time to the microsecond plus a random suffix."""
+    ts = datetime.fromtimestamp(time.time() if at is None else at, timezone.utc)
+    return ts.strftime("%Y%m%dT%H%M%S%fZ") + "-" + uuid.uuid4().hex[:8]
+
+
+def parse_ts(ts: Any) -> Optional[float]:
+    """Unix time from the legacy "%Y%m%dT%H%M%SZ" timestamps (None if absent or malformed)."""
+    if not isinstance(ts, str):
+        return None
+    try:
+        return datetime.strptime(ts, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def make_row(
+    body: Dict[str, Any],
+    kind: str,
+    lab: Optional[str] = None,
+    framework: Optional[str] = None,
+    task: Optional[str] = None,
+    tool: Optional[str] = None,
+    started_at: Optional[float] = None,
+    source: Optional[str] = None,
+) -> Tuple[Any, ...]:
+    started_at = started_at if started_at is not None else (parse_ts(body.get("timestamp")) or time.time())
+    success = body.get("success")
+    latency = body.get("latency_ms")
+    return (
+        new_run_id(started_at),
+        kind,
+        lab if lab is not None else body.get("lab"),
+        framework if framework is not None else body.get("framework"),
+        task if task is not None else body.get("task"),
+        tool if tool is not None else body.get("tool"),
+        started_at,
+        None if success is None else int(bool(success)),
+        None if latency is None else float(latency),
+        source,
+        json.dumps(body, default=str),
+    )
+
+
+def from_row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    """Record body with the indexed columns merged in (`run_id`, `kind`, `lab`, ...)."""
+    rec = json.loads(row[-1])
+    rec.update({
+        "run_id": row[0], "kind": row[1], "lab": row[2], "framework": row[3], "task": row[4],
+        "started_at": row[6],
+    })
+    if row[5] is not None:
+        rec["tool"] = row[5]
+    return rec
+
+
+class RunStore:
+    def __init__(self, path: Optional[Path] = None) -> None:
+        env_path = os.environ.get("RUN_STORE_PATH")
+        self.path = path if path is not None else (Path(env_path) if env_path else STORE_PATH)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = self._connect()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(str(self.path), check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        db.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def add(self, body: Dict[str, Any], kind: str, **cols: Any) -> str:
+        """Append one record and return its run id.
+
+        `lab`, `framework`, `task`, `tool` and `started_at` default to the
+        same-named fields of the body (start time from its legacy `timestamp`).
+        """
+        row = make_row(body, kind, **cols)
+        with self._lock, self._db:
+            self._db.execute(f"INSERT INTO runs VALUES ({', '.join('?' * len(COLUMNS))})", row)
+        return row[0]
+
+    def add_many(self, rows: Iterable[Tuple[Any, ...]]) -> int:
+        """Insert rows built with `make_row` in one transaction; rows whose source was already imported are skipped."""
+        with self._lock, self._db:
+            before = self._db.total_changes
+            self._db.executemany(f"INSERT OR IGNORE INTO runs VALUES ({', '.join('?' * len(COLUMNS))})", rows)
+            return self._db.total_changes - before
+
+    def get(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(COLUMNS)} FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return from_row(row) if row else None
+
+    def query(
+        self,
+        lab: Optional[str] = None,
+        kind: Optional[str] = None,
+        framework: Optional[str] = None,
+        task: Optional[str] = None,
+        tool: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        chunk: int = 1_000,
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream matching records in start-time order without loading them all."""
+        where: List[str] = []
+        params: List[Any] = []
+        for col, val in (("lab", lab), ("kind", kind), ("framework", framework), ("task", task), ("tool", tool)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                params.append(val)
+        if since is not None:
+            where.append("started_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("started_at < ?")
+            params.append(until)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM runs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at, id"
+        # A separate connection so a long read does not hold the writer lock
+        db = self._connect()
+        try:
+            cur = db.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk)
+                if not rows:
+                    break
+                for row in rows:
+                    yield from_row(row)
+        finally:
+            db.close()
+
+    def artifacts(self, lab: str, parse: bool = True) -> Iterator[Tuple[str, Optional[str], Optional[str], Any]]:
+        """(run id, task, tool, body as recorded) for each artifact of a lab, oldest first.
+
+        With parse=False the body is the stored JSON text, for callers that
+        hand it to other processes.
+        """
+        db = self._connect()
+        try:
+            cur = db.execute(
+                "SELECT id, task, tool, body FROM runs WHERE lab = ? AND kind = 'artifact' ORDER BY started_at, id",
+                (lab,),
+            )
+            for run_id, task, tool, body in cur:
+                yield run_id, task, tool, json.loads(body) if parse else body
+        finally:
+            db.close()
+
+    def count(self, **filters: Any) -> int:
+        return sum(1 for _ in self.query(**filters))
+
+
+_STORE: Optional[RunStore] = None
+_STORE_LOCK = threading.Lock()
+
+
+def run_store() -> RunStore:
+    """The process-wide store (RUN_STORE_PATH, default runs/runs.sqlite at the repo root)."""
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            _STORE = RunStore()
+        return _STORE
+
+
+def record_run(body: Dict[str, Any], kind: str, **cols: Any) -> str:
+    return run_store().add(body, kind, **cols)
+
+
+def legacy_rows(path: Path, lab: Optional[str]) -> Iterator[Tuple[Any, ...]]:
+    """Rows for one legacy runs/ file: harness/run and playbook JSON become runs, anything else an artifact."""
+    mtime = path.stat().st_mtime
+    name = path.name
+    if path.suffix == ".jsonl":
+        if name.endswith("-eval.jsonl"):
+            kind, task = "eval", None
+        elif name.startswith("playbook-matrix-"):
+            kind, task = "playbook", None
+        else:
+            kind, task = "artifact", path.stem.split("-", 1)[-1]
+        with path.open() as f:
+            for i, line in enumerate(f):
+                try:
+                    body = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(body, dict):
+                    yield make_row(body, kind, lab=lab, task=task,
+                                   started_at=parse_ts(body.get("timestamp")) or mtime, source=f"{path}:{i}")
+        return
+    try:
+        body = json.loads(path.read_text())
+    except ValueError:
+        return
+    if not isinstance(body, dict):
+        body = {"value": body}
+    if name.startswith("playbook-"):
+        # run_playbook.py wrote each run's step outputs to playbook-<ts>.json
+        yield make_row({"outputs": body}, "playbook", lab=lab,
+                       started_at=parse_ts(path.stem.split("-", 1)[1]) or mtime, source=str(path))
+        return
+    # evaluate_agent.py/lab_runner.py wrote <ts>.json with success/framework; lab scripts wrote <ts>-<name>.json
+    is_run = "success" in body and "framework" in body
+    artifact = None if is_run else name.split("-", 1)[-1].rsplit(".", 1)[0]
+    yield make_row(body, "eval" if is_run else "artifact", lab=lab, task=None if is_run else artifact,
+                   started_at=parse_ts(body.get("timestamp")) or parse_ts(name.split("-")[0]) or mtime,
+                   source=str(path))
+
+
+def import_files(store: RunStore, runs_dirs: Iterable[Path]) -> int:
+    """Import legacy runs/*.json and *.jsonl files; labs/<lab>/runs files are tagged with <lab>."""
+    added = 0
+    for d in runs_dirs:
+        d = d.resolve()
+        lab = d.parent.name if d.parent.parent.name == "labs" else None
+        for path in sorted(list(d.glob("*.json")) + list(d.glob("*.jsonl"))):
+            if path.name == "spend-ledger.jsonl" or (
+                path.suffix == ".jsonl" and path.name.startswith("playbook-")
+                and not path.name.startswith("playbook-matrix-")
+            ):
+                continue  # step checkpoints (playbook-<ts>.jsonl) and the spend ledger are not run records
+            added += store.add_many(legacy_rows(path, lab))
+    return added
+
+
+def main():
+    p = argparse.ArgumentParser(description="Shared run store")
+    sub = p.add_subparsers(dest="cmd")
+    imp = sub.add_parser("import", help="import legacy runs/*.json files")
+    imp.add_argument("dirs", nargs="*", help="runs folders (default: labs/*/runs and runs/)")
+    q = sub.add_parser("query", help="print matching records as JSON lines")
+    for flag in ("lab", "kind", "framework", "task", "tool"):
+        q.add_argument(f"--{flag}")
+    args = p.parse_args()
+
+    store = run_store()
+    if args.cmd == "import":
+        dirs = [Path(d) for d in args.dirs] or [d for d in (ROOT / "labs").glob("*/runs")] + [ROOT / "runs"]
+        added = import_files(store, [d for d in dirs if d.is_dir()])
+        print(f"Imported {added} record(s) into {store.path}")
+    elif args.cmd == "query":
+        filters = {k: getattr(args, k) for k in ("lab", "kind", "framework", "task", "tool")}
+        for rec in store.query(**filters):
+            print(json.dumps(rec, default=str))
+    else:
+        p.print_help()
+
+
+if __name__ == "__main__":
+    main()
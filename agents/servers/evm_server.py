@@ -1,17 +1,69 @@
 #!/usr/bin/env python3
-from fastapi import FastAPI, HTTPException
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
-from agents.tools.evm import get_balance, simulate_transfer, send_transfer
+from typing import Any, Dict, List, Optional, Union
+from agents.ledger import LEDGER
+from agents.policies import install_sighup
+from agents.tools.evm_async import (
+    close_async_ctx,
+    init_async_ctx,
+    get_balance,
+    get_balances,
+    multicall,
+    simulate_transfer,
+    send_transfer,
+)
+from agents.tools.receipts import TRACKER
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Warm the shared RPC context at startup; stay lazy if env is not set yet.
+    try:
+        await init_async_ctx()
+    except SystemExit:
+        pass
+    install_sighup()
+    TRACKER.start()
+    yield
+    await TRACKER.stop()
+    await close_async_ctx()
+    LEDGER.flush()
 
 
-app = FastAPI(title="EVM Tool Server", version="0.1.0")
+app = FastAPI(title="EVM Tool Server", version="0.1.0", lifespan=lifespan)
 
 
 class BalanceIn(BaseModel):
     address: str = Field(pattern=r"^0x[0-9a-fA-F]{40}$")
 
 
+class BalancesIn(BaseModel):
+    addresses: List[str] = Field(min_length=1)
+    block: Union[int, str] = "latest"
+    batch_size: int = Field(default=100, ge=1, le=1000)
+    concurrency: int = Field(default=4, ge=1, le=64)
+
+
+class CallIn(BaseModel):
+    target: str = Field(pattern=r"^0x[0-9a-fA-F]{40}$")
+    abi: Optional[List[Dict[str, Any]]] = None
+    function: Optional[str] = None
+    args: List[Any] = []
+    data: Optional[str] = Field(default=None, pattern=r"^0x[0-9a-fA-F]*$")
+    allow_failure: bool = True
+
+
+class MulticallIn(BaseModel):
+    calls: List[CallIn] = Field(min_length=1)
+    block: Union[int, str] = "latest"
+    batch_size: int = Field(default=500, ge=1, le=5000)
+    concurrency: int = Field(default=4, ge=1, le=64)
+
+
 class SimIn(BaseModel):
     to: str = Field(pattern=r"^0x[0-9a-fA-F]{40}$")
     value_wei: int = Field(ge=0)
@@ -19,38 +71,81 @@ class SimIn(BaseModel):
 
 class SendIn(SimIn):
     max_value_wei: Optional[int] = Field(default=None, ge=0)
+    wait: bool = True
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"ok": True}
 
 
 @app.post("/evm/get_balance")
-def api_get_balance(inp: BalanceIn):
+async def api_get_balance(inp: BalanceIn):
+    try:
+        return await get_balance(inp.address)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/evm/get_balances")
+async def api_get_balances(inp: BalancesIn):
     try:
-        return get_balance(inp.address)
+        return await get_balances(inp.addresses, inp.block, inp.batch_size, inp.concurrency)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/evm/multicall")
+async def api_multicall(inp: MulticallIn):
+    calls = [c.model_dump(exclude_none=True) for c in inp.calls]
+    try:
+        return await multicall(calls, inp.block, inp.batch_size, inp.concurrency)
+    except (Exception, SystemExit) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/evm/simulate_transfer")
-def api_simulate(inp: SimIn):
+async def api_simulate(inp: SimIn):
     try:
-        return simulate_transfer(inp.to, inp.value_wei)
+        return await simulate_transfer(inp.to, inp.value_wei)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/evm/send_transfer")
-def api_send(inp: SendIn):
+async def api_send(inp: SendIn):
     try:
-        return send_transfer(inp.to, inp.value_wei, inp.max_value_wei)
+        out = await send_transfer(inp.to, inp.value_wei, inp.max_value_wei, inp.wait)
     except SystemExit as e:
         raise HTTPException(status_code=403, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    if not inp.wait:
+        TRACKER.track(out["tx_hash"])
+    return out
 
 
-# Run: uvicorn agents.servers.evm_server:app --reload
+@app.get("/evm/tx/{tx_hash}")
+async def api_tx_status(tx_hash: str, wait: float = Query(default=0, ge=0, le=120)):
+    # wait > 0 long-polls until the tx is mined or the timeout elapses
+    try:
+        if wait:
+            return await TRACKER.wait(tx_hash, wait)
+        return await TRACKER.lookup(tx_hash)
+    except (Exception, SystemExit) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/evm/tx/{tx_hash}/stream")
+async def api_tx_stream(tx_hash: str):
+    async def events():
+        try:
+            async for st in TRACKER.updates(tx_hash):
+                yield f"data: {json.dumps(st)}\n\n"
+        except (Exception, SystemExit) as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
 
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+# Run: uvicorn agents.servers.evm_server:app --reload
@@ -0,0 +1,323 @@
+"""
+Read-through cache for blocks, receipts and the chain head.
+
+Blocks are immutable per hash, so they are cached by hash unconditionally.
+Number -> hash mappings and receipts are only recorded once they are
+EVM_CACHE_CONFIRMATIONS blocks deep, so a block seen near the head is never
+served by number after the chain replaced it; newer ones always go to the node.
+Every block the cache sees is checked against its neighbours' hashes: when a
+parent hash does not match, number mappings and receipts from the fork
+point up are dropped. A block fetched by hash may be an orphan, so it is
+cached by hash only and never changes the number mappings. Entries live in an in-memory LRU (EVM_CACHE_SIZE) and,
+when EVM_CACHE_PATH is set, confirmed entries also go to a SQLite file that
+survives restarts.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from agents.tools.rpc import RPC
+
+DEFAULT_CACHE_SIZE = 10_000
+DEFAULT_CONFIRMATIONS = 12
+DEFAULT_HEAD_TTL = 1.0
+BATCH_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blocks (hash TEXT NOT NULL, full INTEGER NOT NULL, body TEXT NOT NULL,
+                                   PRIMARY KEY (hash, full));
+CREATE TABLE IF NOT EXISTS numbers (number INTEGER PRIMARY KEY, hash TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS receipts (tx_hash TEXT PRIMARY KEY, block_number INTEGER NOT NULL, body TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS idx_receipts_block ON receipts (block_number);
+"""
+
+
+class LRU:
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key: Any) -> Any:
+        val = self._data.get(key)
+        if val is not None:
+            self._data.move_to_end(key)
+        return val
+
+    def put(self, key: Any, val: Any) -> None:
+        self._data[key] = val
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def drop(self, pred) -> None:
+        for key in [k for k, v in self._data.items() if pred(k, v)]:
+            del self._data[key]
+
+
+class ChainCache:
+    def __init__(
+        self,
+        rpc: RPC,
+        size: Optional[int] = None,
+        path: Optional[Path] = None,
+        confirmations: Optional[int] = None,
+        head_ttl: Optional[float] = None,
+    ) -> None:
+        self.rpc = rpc
+        size = size or int(os.environ.get("EVM_CACHE_SIZE", DEFAULT_CACHE_SIZE))
+        self.confirmations = confirmations if confirmations is not None else int(
+            os.environ.get("EVM_CACHE_CONFIRMATIONS", DEFAULT_CONFIRMATIONS)
+        )
+        self.head_ttl = head_ttl if head_ttl is not None else float(
+            os.environ.get("EVM_CACHE_HEAD_TTL", DEFAULT_HEAD_TTL)
+        )
+        self._lock = threading.RLock()
+        self._blocks = LRU(size)  # (hash, full) -> block
+        self._numbers = LRU(size)  # number -> hash
+        self._receipts = LRU(size)  # tx hash -> receipt
+        self._head: Optional[int] = None
+        self._head_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.reorgs = 0
+        env_path = os.environ.get("EVM_CACHE_PATH")
+        path = path if path is not None else (Path(env_path) if env_path else None)
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # Head
+
+    def block_number(self) -> int:
+        """Chain head, refreshed at most every head_ttl seconds; each refresh is also a reorg check."""
+        with self._lock:
+            if self._head is not None and time.monotonic() - self._head_at < self.head_ttl:
+                return self._head
+        head = self.rpc.call("eth_getBlockByNumber", ["latest", False])
+        with self._lock:
+            self._head = int(head["number"], 16)
+            self._head_at = time.monotonic()
+            self._remember(head, False)
+            return self._head
+
+    def confirmed(self, number: int) -> bool:
+        return number <= self.block_number() - self.confirmations
+
+    # Blocks
+
+    def get_block(self, block: Union[int, str], full: bool = False) -> Optional[Dict[str, Any]]:
+        """Block by number, 0x-hash or tag, as the raw JSON-RPC object."""
+        if isinstance(block, str) and len(block) == 66:
+            return self._by_hash(block.lower(), full)
+        number = block if isinstance(block, int) else (int(block, 16) if block.startswith("0x") else None)
+        if number is not None and self.confirmed(number):
+            with self._lock:
+                h = self._numbers.get(number) or self._disk_number(number)
+            if h is not None:
+                hit = self._by_hash(h, full, fetch=False)
+                if hit is not None:
+                    return hit
+        tag = hex(number) if number is not None else block
+        self._tally(misses=1)
+        out = self.rpc.call("eth_getBlockByNumber", [tag, full])
+        if out is not None:
+            with self._lock:
+                self._remember(out, full)
+        return out
+
+    def get_blocks(self, numbers: Iterable[int], full: bool = False) -> List[Optional[Dict[str, Any]]]:
+        """Several blocks by number; the ones not cached are fetched in one JSON-RPC batch."""
+        numbers = list(numbers)
+        out: List[Optional[Dict[str, Any]]] = [None] * len(numbers)
+        missing = []
+        depth = self.block_number() - self.confirmations
+        for i, n in enumerate(numbers):
+            h = None
+            if n <= depth:
+                with self._lock:
+                    h = self._numbers.get(n) or self._disk_number(n)
+            hit = self._by_hash(h, full, fetch=False) if h else None
+            if hit is None:
+                missing.append(i)
+            out[i] = hit
+        if missing:
+            self._tally(misses=len(missing))
+            resps = []
+            for j in range(0, len(missing), BATCH_SIZE):
+                resps += self.rpc.batch([("eth_getBlockByNumber", [hex(numbers[i]), full]) for i in missing[j:j + BATCH_SIZE]])
+            with self._lock:
+                for i, resp in zip(missing, resps):
+                    if resp.get("error"):
+                        raise ValueError(resp["error"])
+                    out[i] = resp.get("result")
+                    if out[i] is not None:
+                        self._remember(out[i], full)
+        return out
+
+    def _by_hash(self, h: str, full: bool, fetch: bool = True) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            hit = self._blocks.get((h, full)) or self._disk_block(h, full)
+        if hit is not None:
+            self._tally(hits=1)
+            return hit
+        if not fetch:
+            return None
+        self._tally(misses=1)
+        out = self.rpc.call("eth_getBlockByHash", [h, full])
+        if out is not None:
+            with self._lock:
+                self._remember(out, full, canonical=False)
+        return out
+
+    def _tally(self, hits: int = 0, misses: int = 0) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def _remember(self, block: Dict[str, Any], full: bool, canonical: bool = True) -> None:
+        """Cache a block; `canonical` is False for blocks fetched by hash, which may not be on the chain."""
+        n, h, parent = int(block["number"], 16), block["hash"].lower(), block["parentHash"].lower()
+        if not canonical:
+            self._blocks.put((h, full), block)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", (h, int(full), json.dumps(block)))
+            return
+        # Any disagreement with known neighbours means the chain reorganized
+        known = self._numbers.get(n)
+        if known is not None and known != h:
+            self.invalidate_from(n)
+        prev = self._numbers.get(n - 1)
+        if prev is not None and prev != parent:
+            self.invalidate_from(n - 1)
+        nxt = self._numbers.get(n + 1)
+        if nxt is not None:
+            child = self._blocks.get((nxt, False)) or self._blocks.get((nxt, True))
+            if child is not None and child["parentHash"].lower() != h:
+                self.invalidate_from(n + 1)
+        self._blocks.put((h, full), block)
+        # Heights above the confirmation depth may still be replaced, so they get no mapping yet
+        confirmed = self._head is not None and n <= self._head - self.confirmations
+        if confirmed:
+            self._numbers.put(n, h)
+        if self._db is not None:
+            with self._db:
+                self._db.execute("INSERT OR REPLACE INTO blocks VALUES (?, ?, ?)", (h, int(full), json.dumps(block)))
+                if confirmed:
+                    self._db.execute("INSERT OR REPLACE INTO numbers VALUES (?, ?)", (n, h))
+
+    def invalidate_from(self, number: int) -> None:
+        """Forget number -> hash mappings and receipts at or above `number` (blocks by hash stay valid)."""
+        self.reorgs += 1
+        self._numbers.drop(lambda k, _: k >= number)
+        self._receipts.drop(lambda _, r: int(r["blockNumber"], 16) >= number)
+        if self._db is not None:
+            with self._db:
+                self._db.execute("DELETE FROM numbers WHERE number >= ?", (number,))
+                self._db.execute("DELETE FROM receipts WHERE block_number >= ?", (number,))
+
+    # Receipts
+
+    def get_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        """Receipt as the raw JSON-RPC object; cached once its block is confirmed."""
+        return self.get_receipts([tx_hash])[0]
+
+    def get_receipts(self, tx_hashes: Iterable[str]) -> List[Optional[Dict[str, Any]]]:
+        hashes = [h.lower() for h in tx_hashes]
+        out: List[Optional[Dict[str, Any]]] = []
+        missing = []
+        with self._lock:
+            for i, h in enumerate(hashes):
+                hit = self._receipts.get(h) or self._disk_receipt(h)
+                out.append(hit)
+                if hit is None:
+                    missing.append(i)
+        self._tally(hits=len(hashes) - len(missing), misses=len(missing))
+        if missing:
+            resps = []
+            for j in range(0, len(missing), BATCH_SIZE):
+                resps += self.rpc.batch([("eth_getTransactionReceipt", [hashes[i]]) for i in missing[j:j + BATCH_SIZE]])
+            for i, resp in zip(missing, resps):
+                if resp.get("error"):
+                    raise ValueError(resp["error"])
+                rcpt = out[i] = resp.get("result")
+                if rcpt is not None and self.confirmed(int(rcpt["blockNumber"], 16)):
+                    self._store_receipt(hashes[i], rcpt)
+        return out
+
+    def _store_receipt(self, h: str, rcpt: Dict[str, Any]) -> None:
+        with self._lock:
+            # The receipt must belong to the block we hold for that height
+            n = int(rcpt["blockNumber"], 16)
+            known = self._numbers.get(n)
+            if known is not None and known != rcpt["blockHash"].lower():
+                return
+            self._receipts.put(h, rcpt)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute("INSERT OR REPLACE INTO receipts VALUES (?, ?, ?)", (h, n, json.dumps(rcpt)))
+
+    # Disk tier
+
+    def _disk_number(self, number: int) -> Optional[str]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT hash FROM numbers WHERE number = ?", (number,)).fetchone()
+        if row is not None:
+            self._numbers.put(number, row[0])
+        return row[0] if row else None
+
+    def _disk_block(self, h: str, full: bool) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT body FROM blocks WHERE hash = ? AND full = ?", (h, int(full))).fetchone()
+        if row is None:
+            return None
+        block = json.loads(row[0])
+        self._blocks.put((h, full), block)
+        return block
+
+    def _disk_receipt(self, h: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        row = self._db.execute("SELECT body FROM receipts WHERE tx_hash = ?", (h,)).fetchone()
+        if row is None:
+            return None
+        rcpt = json.loads(row[0])
+        self._receipts.put(h, rcpt)
+        return rcpt
+
+
+_CACHES: Dict[str, ChainCache] = {}
+_LOCK = threading.Lock()
+
+
+def chain_cache(rpc: RPC) -> ChainCache:
+    """The process-wide cache for an RPC endpoint."""
+    with _LOCK:
+        cache = _CACHES.get(rpc.endpoint)
+        if cache is None:
+            cache = _CACHES[rpc.endpoint] = ChainCache(rpc)
+        return cache
+
+
+def clear() -> None:
+    with _LOCK:
+        caches = list(_CACHES.values())
+        _CACHES.clear()
+    for cache in caches:
+        cache.close()
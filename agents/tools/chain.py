@@ -0,0 +1,117 @@
+"""
+Chain metadata cache and EIP-1559 fee oracle shared by the tools and labs.
+
+chain_id is memoized per RPC endpoint for the life of the process. Fee
+parameters come from `eth_feeHistory` reward percentiles and are cached per
+endpoint for the block they were computed at, for at most EVM_FEE_TTL seconds.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_FEE_TTL = 6.0
+DEFAULT_FEE_BLOCKS = 10
+DEFAULT_FEE_PERCENTILE = 50
+
+_CHAIN_IDS: Dict[str, int] = {}
+# endpoint -> (block_number, fetched_at, fee params)
+_FEES: Dict[str, Tuple[int, float, Dict[str, int]]] = {}
+_LOCK = threading.Lock()
+
+
+def _endpoint(w3: Any) -> str:
+    return str(getattr(w3.provider, "endpoint_uri", id(w3.provider)))
+
+
+def _fee_settings() -> Tuple[float, int, int]:
+    return (
+        float(os.environ.get("EVM_FEE_TTL", DEFAULT_FEE_TTL)),
+        int(os.environ.get("EVM_FEE_BLOCKS", DEFAULT_FEE_BLOCKS)),
+        int(os.environ.get("EVM_FEE_PERCENTILE", DEFAULT_FEE_PERCENTILE)),
+    )
+
+
+def fees_from_history(hist: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, int]]]:
+    """Turn an eth_feeHistory result into (newest block, 1559 fee params).
+
+    Returns None params when the chain has no base fee (pre-London/legacy).
+    The last baseFeePerGas entry is the projected base fee of the next block.
+    """
+    base_fees = [int(x) for x in hist.get("baseFeePerGas") or []]
+    rewards = [int(r[0]) for r in hist.get("reward") or [] if r]
+    newest = int(hist["oldestBlock"]) + max(len(base_fees) - 2, 0)
+    if not base_fees or base_fees[-1] == 0:
+        return newest, None
+    rewards.sort()
+    tip = rewards[len(rewards) // 2] if rewards else 0
+    return newest, {
+        "maxPriorityFeePerGas": tip,
+        # Headroom for the base fee to rise for a few full blocks
+        "maxFeePerGas": 2 * base_fees[-1] + tip,
+    }
+
+
+def _cached_fees(key: str, block: Optional[int], ttl: float) -> Optional[Dict[str, int]]:
+    hit = _FEES.get(key)
+    if hit is None:
+        return None
+    cached_block, fetched_at, fees = hit
+    if block is not None and block == cached_block:
+        return fees
+    if block is None and time.monotonic() - fetched_at < ttl:
+        return fees
+    return None
+
+
+def _store_fees(key: str, block: int, fees: Dict[str, int]) -> Dict[str, int]:
+    with _LOCK:
+        _FEES[key] = (block, time.monotonic(), fees)
+    return fees
+
+
+def chain_id(w3: Any) -> int:
+    key = _endpoint(w3)
+    cid = _CHAIN_IDS.get(key)
+    if cid is None:
+        cid = _CHAIN_IDS[key] = int(w3.eth.chain_id)
+    return cid
+
+
+def fee_params(w3: Any, block: Optional[int] = None) -> Dict[str, int]:
+    """Fee fields to merge into a tx dict: 1559 max fees, or gasPrice on legacy chains."""
+    key = _endpoint(w3)
+    ttl, blocks, pct = _fee_settings()
+    fees = _cached_fees(key, block, ttl)
+    if fees is not None:
+        return fees
+    newest, fees = fees_from_history(w3.eth.fee_history(blocks, "latest", [pct]))
+    if fees is None:
+        fees = {"gasPrice": int(w3.eth.gas_price)}
+    return _store_fees(key, newest, fees)
+
+
+async def async_chain_id(w3: Any) -> int:
+    key = _endpoint(w3)
+    cid = _CHAIN_IDS.get(key)
+    if cid is None:
+        cid = _CHAIN_IDS[key] = int(await w3.eth.chain_id)
+    return cid
+
+
+async def async_fee_params(w3: Any, block: Optional[int] = None) -> Dict[str, int]:
+    key = _endpoint(w3)
+    ttl, blocks, pct = _fee_settings()
+    fees = _cached_fees(key, block, ttl)
+    if fees is not None:
+        return fees
+    newest, fees = fees_from_history(await w3.eth.fee_history(blocks, "latest", [pct]))
+    if fees is None:
+        fees = {"gasPrice": int(await w3.eth.gas_price)}
+    return _store_fees(key, newest, fees)
+
+
+def clear() -> None:
+    with _LOCK:
+        _CHAIN_IDS.clear()
+        _FEES.clear()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Table-driven decoding of well-known token events straight from log hex.
+
+web3's `ContractEvent.process_log` rebuilds ABI codecs and normalizers for
+every log. The events handled here have fixed layouts, so each gets a small
+precompiled decoder keyed by (topic0, topic count): ERC-20 and ERC-721
+share the Transfer/Approval signatures and differ only in whether the last
+argument is indexed. Logs may be raw JSON-RPC dicts (hex strings) or web3
+log objects (HexBytes / ints).
+"""
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from agents.tools.rpc import to_checksum_address
+
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+APPROVAL_TOPIC = "0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925"
+APPROVAL_FOR_ALL_TOPIC = "0x17307eab39ab6107e8899845ad3d59bd9653f200f220920489ca2b5937696c31"
+
+Decoder = Callable[[List[str], str], Dict[str, Any]]
+
+
+@lru_cache(maxsize=None)
+def event_topic(signature: str) -> str:
+    """topic0 for an event signature such as "Transfer(address,address,uint256)"."""
+    from eth_hash.auto import keccak
+
+    return "0x" + keccak(signature.encode()).hex()
+
+
+# Holders and tokens repeat heavily across logs; checksumming is the decode hot spot
+@lru_cache(maxsize=65536)
+def checksum(address: str) -> str:
+    return to_checksum_address(address)
+
+
+def topic_address(topic: str) -> str:
+    return checksum("0x" + topic[-40:])
+
+
+def word(data: str, i: int) -> int:
+    """i-th 32-byte word of 0x-prefixed ABI data as an int (0 when absent)."""
+    chunk = data[2 + 64 * i:66 + 64 * i]
+    return int(chunk, 16) if chunk else 0
+
+
+def _erc20_transfer(t: List[str], data: str) -> Dict[str, Any]:
+    return {"event": "Transfer", "from": topic_address(t[1]), "to": topic_address(t[2]), "value": word(data, 0)}
+
+
+def _erc721_transfer(t: List[str], data: str) -> Dict[str, Any]:
+    return {"event": "Transfer", "from": topic_address(t[1]), "to": topic_address(t[2]), "token_id": int(t[3], 16)}
+
+
+def _erc20_approval(t: List[str], data: str) -> Dict[str, Any]:
+    return {"event": "Approval", "owner": topic_address(t[1]), "spender": topic_address(t[2]), "value": word(data, 0)}
+
+
+def _erc721_approval(t: List[str], data: str) -> Dict[str, Any]:
+    return {"event": "Approval", "owner": topic_address(t[1]), "approved": topic_address(t[2]),
+            "token_id": int(t[3], 16)}
+
+
+def _approval_for_all(t: List[str], data: str) -> Dict[str, Any]:
+    return {"event": "ApprovalForAll", "owner": topic_address(t[1]), "operator": topic_address(t[2]),
+            "approved": bool(word(data, 0))}
+
+
+DECODERS: Dict[Tuple[str, int], Decoder] = {
+    (TRANSFER_TOPIC, 3): _erc20_transfer,
+    (TRANSFER_TOPIC, 4): _erc721_transfer,
+    (APPROVAL_TOPIC, 3): _erc20_approval,
+    (APPROVAL_TOPIC, 4): _erc721_approval,
+    (APPROVAL_FOR_ALL_TOPIC, 3): _approval_for_all,
+}
+
+
+def register(signature: str, topics: int, decoder: Decoder) -> None:
+    """Add a decoder for another fixed-layout event, keyed like the built-ins."""
+    DECODERS[(event_topic(signature), topics)] = decoder
+
+
+def _hex(v: Any) -> str:
+    if isinstance(v, str):
+        return v.lower()
+    return "0x" + bytes(v).hex()
+
+
+def _int(v: Any) -> int:
+    return v if isinstance(v, int) else int(v, 16)
+
+
+def decode_log(log: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Decoded event dict for a known event, else None."""
+    topics = log["topics"]
+    if not topics:
+        return None
+    t = [_hex(x) for x in topics]
+    fn = DECODERS.get((t[0], len(t)))
+    if fn is None:
+        return None
+    out = {
+        "block": _int(log["blockNumber"]),
+        "log_index": _int(log["logIndex"]),
+        "tx_hash": _hex(log["transactionHash"]),
+        "token": checksum(_hex(log["address"])),
+    }
+    out.update(fn(t, _hex(log.get("data") or "0x")))
+    return out
+
+
+def decode_logs(logs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Decode a batch, dropping removed (reorged) logs and events with no registered decoder."""
+    out = []
+    append = out.append
+    for log in logs:
+        if log.get("removed"):
+            continue
+        ev = decode_log(log)
+        if ev is not None:
+            append(ev)
+    return out
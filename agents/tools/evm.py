@@ -2,62 +2,230 @@
 import argparse
 import json
 import os
+import sys
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-from dotenv import load_dotenv
-from eth_account import Account
-from web3 import Web3
-import yaml
+if __package__ in (None, ""):
+    # Allow `python agents/tools/evm.py ...` without PYTHONPATH
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+# Keep module import cheap: web3, eth_account and yaml are imported only by the
+# code paths that need them, so --help and read-only balance queries skip them.
+from agents.ledger import LEDGER, Charge
+from agents.policies import POLICY, load_policy  # noqa: F401 (load_policy re-exported)
+from agents.tools.blocks import chain_cache
+from agents.tools.blocks import clear as clear_block_caches
+from agents.tools.chain import chain_id, fee_params
+from agents.tools.multicall import DEFAULT_MULTICALL_BATCH, DEFAULT_MULTICALL_CONCURRENCY, aggregate
+from agents.tools.nonce import NONCES, is_nonce_error
+from agents.tools.rpc import (  # noqa: F401 (re-exported for callers of agents.tools.evm)
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RPC_TIMEOUT,
+    RPC,
+    close_sessions,
+    in_context,
+    resolve_block,
+    rpc_session,
+    to_checksum_address,
+)
+
+if TYPE_CHECKING:
+    from web3 import Web3
+
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_CONCURRENCY = 4
+NONCE_RETRIES = 2
 
 
 @dataclass
 class EVMContext:
-    w3: Web3
+    w3: "Web3"
     address: str
     pk: str
 
 
-def load_ctx() -> EVMContext:
-    load_dotenv()
-    rpc = os.environ.get("EVM_RPC_URL")
-    pk = os.environ.get("PRIVATE_KEY")
+# Process-wide state: one lazily built context shared by the CLI, the registry
+# and the FastAPI server (sessions are pooled per endpoint in agents/tools/rpc.py).
+_CTX: Optional[EVMContext] = None
+_RPCS: Dict[str, RPC] = {}
+_LOCK = threading.Lock()
+_INIT_LOCK = threading.Lock()
+_ENV_LOADED = False
+
+
+def load_env() -> None:
+    global _ENV_LOADED
+    if not _ENV_LOADED:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _ENV_LOADED = True
+
+
+def balance_calls(addresses: Sequence[str], block: int) -> Tuple[List[Dict[str, Any]], List[Tuple[int, Tuple[str, Any]]]]:
+    """Split addresses into per-address result slots and the eth_getBalance calls to fill them."""
+    results: List[Dict[str, Any]] = []
+    calls: List[Tuple[int, Tuple[str, Any]]] = []
+    for addr in addresses:
+        try:
+            cs = to_checksum_address(addr)
+        except Exception as e:
+            results.append({"address": addr, "error": str(e)})
+            continue
+        calls.append((len(results), ("eth_getBalance", [cs, hex(block)])))
+        results.append({"address": cs})
+    return results, calls
+
+
+def balance_chunks(calls: List[Tuple[int, Any]], batch_size: int) -> List[List[Tuple[int, Any]]]:
+    size = max(1, int(batch_size))
+    return [calls[i:i + size] for i in range(0, len(calls), size)]
+
+
+def fill_balances(results: List[Dict[str, Any]], chunk, responses: List[Dict[str, Any]]) -> None:
+    for (slot, _), r in zip(chunk, responses):
+        err = r.get("error")
+        if err:
+            results[slot]["error"] = err.get("message", str(err)) if isinstance(err, dict) else str(err)
+        elif r.get("result") is None:
+            results[slot]["error"] = "response has neither result nor error"
+        else:
+            results[slot]["wei"] = int(r["result"], 16)
+
+
+def make_web3(rpc: str, pool_size: Optional[int] = None) -> "Web3":
+    from web3 import Web3
+    from agents.tools.provider import PooledHTTPProvider
+
+    return Web3(PooledHTTPProvider(rpc, rpc_session(rpc, pool_size)))
+
+
+def load_rpc() -> RPC:
+    """Raw JSON-RPC client for read-only tools; needs only EVM_RPC_URL."""
+    load_env()
+    url = os.environ.get("EVM_RPC_URL")
+    if not url:
+        raise SystemExit("Set EVM_RPC_URL in .env or env")
+    client = _RPCS.get(url)
+    if client is None:
+        client = _RPCS[url] = RPC(url)
+    return client
+
+
+def init_ctx(rpc: Optional[str] = None, pk: Optional[str] = None, pool_size: Optional[int] = None) -> EVMContext:
+    """Build (or rebuild) the shared context eagerly; used as a startup hook."""
+    global _CTX
+    from eth_account import Account
+
+    load_env()
+    rpc = rpc or os.environ.get("EVM_RPC_URL")
+    pk = pk or os.environ.get("PRIVATE_KEY")
     if not rpc or not pk:
         raise SystemExit("Set EVM_RPC_URL and PRIVATE_KEY in .env or env")
-    w3 = Web3(Web3.HTTPProvider(rpc))
-    addr = Account.from_key(pk).address
-    return EVMContext(w3=w3, address=addr, pk=pk)
-
-
-def load_policy() -> Dict[str, Any]:
-    # Load policy from config/policies.yaml if present; else use env overrides
-    cfg_path = Path(__file__).resolve().parents[2] / "config" / "policies.yaml"
-    data: Dict[str, Any] = {}
-    if cfg_path.exists():
-        data = yaml.safe_load(cfg_path.read_text()) or {}
-    evm = data.get("evm", {})
-    # Env overrides
-    if os.environ.get("POLICY_MAX_VALUE_WEI"):
-        evm["max_value_wei"] = int(os.environ["POLICY_MAX_VALUE_WEI"])
-    if os.environ.get("POLICY_ALLOWLIST"):
-        evm["allowlist"] = [x.strip() for x in os.environ["POLICY_ALLOWLIST"].split(",") if x.strip()]
-    if os.environ.get("POLICY_DENYLIST"):
-        evm["denylist"] = [x.strip() for x in os.environ["POLICY_DENYLIST"].split(",") if x.strip()]
-    return evm
+    ctx = EVMContext(w3=make_web3(rpc, pool_size), address=Account.from_key(pk).address, pk=pk)
+    with _LOCK:
+        _CTX = ctx
+    return ctx
+
+
+def load_ctx() -> EVMContext:
+    """Return the shared context, initializing it on first use."""
+    ctx = _CTX
+    if ctx is None:
+        with _INIT_LOCK:
+            ctx = _CTX or init_ctx()
+    return ctx
+
+
+def close_ctx() -> None:
+    """Drop the shared context and close pooled sessions; used as a shutdown hook."""
+    global _CTX
+    with _LOCK:
+        _CTX = None
+        _RPCS.clear()
+    clear_block_caches()
+    close_sessions()
+
+
+@contextmanager
+def evm_context(**kwargs: Any) -> Iterator[EVMContext]:
+    try:
+        yield init_ctx(**kwargs) if kwargs else load_ctx()
+    finally:
+        close_ctx()
 
 
 def get_balance(address: str) -> Dict[str, Any]:
-    ctx = load_ctx()
-    bal = ctx.w3.eth.get_balance(Web3.to_checksum_address(address))
-    return {"address": Web3.to_checksum_address(address), "wei": bal}
+    rpc = load_rpc()
+    addr = to_checksum_address(address)
+    return {"address": addr, "wei": int(rpc.call("eth_getBalance", [addr, "latest"]), 16)}
+
+
+def get_balances(
+    addresses: List[str],
+    block: Union[str, int] = "latest",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+) -> Dict[str, Any]:
+    """Fetch many balances via JSON-RPC batches, all pinned to one block height.
+
+    Per-address failures (bad address, RPC error, failed batch) are reported in
+    that address's entry instead of failing the whole request.
+    """
+    rpc = load_rpc()
+    height = chain_cache(rpc).block_number() if block == "latest" else resolve_block(rpc, block)
+    results, calls = balance_calls(addresses, height)
+    chunks = balance_chunks(calls, batch_size)
+
+    def fetch(chunk):
+        try:
+            responses = rpc.batch([c for _, c in chunk])
+        except Exception as e:
+            responses = [{"error": {"message": str(e)}} for _ in chunk]
+        fill_balances(results, chunk, responses)
+
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as pool:
+        list(pool.map(in_context(fetch), chunks))
+    return {"block": height, "balances": results}
+
+
+def get_block(block: Union[str, int] = "latest", full: bool = False) -> Optional[Dict[str, Any]]:
+    """Block by number, hash or tag through the shared block cache (raw JSON-RPC fields)."""
+    return chain_cache(load_rpc()).get_block(block, full)
+
+
+def get_receipt(tx_hash: str) -> Optional[Dict[str, Any]]:
+    """Transaction receipt through the shared block cache, or None if not mined yet."""
+    return chain_cache(load_rpc()).get_receipt(tx_hash)
+
+
+def multicall(
+    calls: List[Dict[str, Any]],
+    block: Union[str, int] = "latest",
+    batch_size: int = DEFAULT_MULTICALL_BATCH,
+    concurrency: int = DEFAULT_MULTICALL_CONCURRENCY,
+) -> Dict[str, Any]:
+    """Many contract reads as Multicall3 aggregate3 calls, all pinned to one block height.
+
+    Each call is {"target", "abi", "function", "args", "allow_failure"} or a
+    raw {"target", "data"}; results keep call order.
+    """
+    rpc = load_rpc()
+    height = chain_cache(rpc).block_number() if block == "latest" else resolve_block(rpc, block)
+    return {"block": height, "results": aggregate(rpc, calls, height, batch_size, concurrency)}
 
 
 def simulate_transfer(to: str, value_wei: int) -> Dict[str, Any]:
     ctx = load_ctx()
     tx = {
         "from": ctx.address,
-        "to": Web3.to_checksum_address(to),
+        "to": to_checksum_address(to),
         "value": int(value_wei),
         "data": b"",
     }
@@ -68,41 +236,137 @@ def simulate_transfer(to: str, value_wei: int) -> Dict[str, Any]:
         return {"ok": False, "error": str(e)}
 
 
-def send_transfer(to: str, value_wei: int, max_value_wei: int = None) -> Dict[str, Any]:
-    pol = load_policy()
-    limit = int(max_value_wei) if max_value_wei is not None else int(pol.get("max_value_wei", 0))
-    if limit and int(value_wei) > limit:
-        raise SystemExit("Policy violation: value exceeds max_value_wei")
-    allow = set(a.lower() for a in pol.get("allowlist", []) if a)
-    deny = set(a.lower() for a in pol.get("denylist", []) if a)
-    if deny and to.lower() in deny:
-        raise SystemExit("Policy violation: destination is denylisted")
-    if allow and to.lower() not in allow:
-        raise SystemExit("Policy violation: destination not in allowlist")
+def check_policy(to: str, value_wei: int, max_value_wei: int = None) -> None:
+    pol = POLICY.get()
+    # A per-call max_value_wei replaces the configured limit; 0 means no limit
+    limit = (int(max_value_wei) or None) if max_value_wei is not None else pol.max_value_wei
+    try:
+        pol.check_limit(to, int(value_wei), limit)
+    except ValueError as e:
+        raise SystemExit(f"Policy violation: {e}")
+
+
+def charge_budgets(wallet: str, to: str, value_wei: int) -> Optional[Charge]:
+    """Record the transfer against rolling budgets; None when no budgets are configured."""
+    budgets = POLICY.get().budgets
+    if not budgets:
+        return None
+    try:
+        return LEDGER.charge(budgets, wallet, to, int(value_wei))
+    except ValueError as e:
+        raise SystemExit(f"Policy violation: {e}")
+
+
+def broadcast(ctx: EVMContext, tx: Dict[str, Any]) -> bytes:
+    """Assign a locally reserved nonce, sign and send; resync and retry on nonce conflicts."""
+    key = (int(tx["chainId"]), ctx.address)
+    for attempt in range(NONCE_RETRIES + 1):
+        nonce = NONCES.reserve(key)
+        if nonce is None:
+            NONCES.seed(key, ctx.w3.eth.get_transaction_count(ctx.address, "pending"))
+            nonce = NONCES.reserve(key)
+        signed = ctx.w3.eth.account.sign_transaction({**tx, "nonce": nonce}, private_key=ctx.pk)
+        try:
+            txh = ctx.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception as e:
+            if is_nonce_error(e) and attempt < NONCE_RETRIES:
+                NONCES.resync(key, ctx.w3.eth.get_transaction_count(ctx.address, "pending"), nonce)
+                continue
+            NONCES.release(key, nonce)
+            raise
+        NONCES.sent(key, nonce)
+        return txh
+
+
+def send_transfer(
+    to: str, value_wei: int, max_value_wei: int = None, wait: bool = True
+) -> Dict[str, Any]:
+    check_policy(to, value_wei, max_value_wei)
     ctx = load_ctx()
     sim = simulate_transfer(to, value_wei)
     if not sim.get("ok"):
         raise SystemExit(f"Simulation failed: {sim.get('error')}")
     tx = {
-        "to": Web3.to_checksum_address(to),
+        "to": to_checksum_address(to),
         "value": int(value_wei),
-        "nonce": ctx.w3.eth.get_transaction_count(ctx.address),
         "gas": max(21_000, int(sim.get("estimated_gas", 21_000))),
-        "maxFeePerGas": ctx.w3.eth.gas_price,
-        "maxPriorityFeePerGas": ctx.w3.eth.gas_price,
-        "chainId": ctx.w3.eth.chain_id,
+        "chainId": chain_id(ctx.w3),
+        **fee_params(ctx.w3),
     }
-    signed = ctx.w3.eth.account.sign_transaction(tx, private_key=ctx.pk)
-    txh = ctx.w3.eth.send_raw_transaction(signed.rawTransaction)
-    rcpt = ctx.w3.eth.wait_for_transaction_receipt(txh)
-    return json.loads(Web3.to_json(rcpt))
+    charge = charge_budgets(ctx.address, to, value_wei)
+    try:
+        txh = broadcast(ctx, tx)
+    except Exception:
+        if charge is not None:
+            LEDGER.refund(charge)
+        raise
+    if not wait:
+        return {"tx_hash": "0x" + bytes(txh).hex(), "status": "pending"}
+    try:
+        rcpt = ctx.w3.eth.wait_for_transaction_receipt(txh)
+    except Exception as e:
+        # Name the hash so callers (e.g. playbook resume) know the transfer already went out
+        raise SystemExit(f"Transaction 0x{bytes(txh).hex()} was broadcast but its receipt was not fetched: {e}")
+    return json.loads(ctx.w3.to_json(rcpt))
+
+
+def profile_startup(argv: List[str]) -> int:
+    """Re-run the CLI under `-X importtime` and print a per-package import breakdown."""
+    import subprocess
+    import time
+
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(Path(__file__).resolve()), *argv],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - t0) * 1000
+    rows: List[Tuple[int, str, int]] = []
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if not line.startswith("import time:") or len(parts) != 3:
+            print(line, file=sys.stderr)
+            continue
+        if parts[1].strip().isdigit():
+            name = parts[2]
+            rows.append((len(name) - len(name.lstrip()), name.strip(), int(parts[1])))
+    # Attribute each top-level import's cumulative time to its root package
+    top = min((indent for indent, _, _ in rows), default=0)
+    totals: Dict[str, int] = {}
+    for indent, name, cumulative in rows:
+        if indent == top:
+            root = name.split(".")[0]
+            totals[root] = totals.get(root, 0) + cumulative
+    imports_ms = sum(totals.values()) / 1000
+    print(f"startup: {wall_ms:.0f} ms wall, {imports_ms:.0f} ms in imports", file=sys.stderr)
+    for root, us in sorted(totals.items(), key=lambda kv: -kv[1])[:15]:
+        print(f"  {us / 1000:8.1f} ms  {root}", file=sys.stderr)
+    return proc.returncode
 
 
 def main():
     p = argparse.ArgumentParser(description="EVM tool CLI")
+    p.add_argument("--profile-startup", action="store_true", help="print an import-time breakdown for this command")
     sub = p.add_subparsers(dest="cmd")
     b = sub.add_parser("get_balance")
     b.add_argument("address")
+    bb = sub.add_parser("get_balances", help="batched balances for many addresses")
+    bb.add_argument("addresses", nargs="*")
+    bb.add_argument("--file", help="file with one address per line ('-' for stdin)")
+    bb.add_argument("--block", default="latest", help="block tag or number to pin results to")
+    bb.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    bb.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY)
+    gb = sub.add_parser("get_block", help="block by number, hash or tag (cached once confirmed)")
+    gb.add_argument("block", nargs="?", default="latest")
+    gb.add_argument("--full", action="store_true", help="include full transaction objects")
+    gr = sub.add_parser("get_receipt", help="transaction receipt (cached once confirmed)")
+    gr.add_argument("tx_hash")
+    mc = sub.add_parser("multicall", help="batched contract reads through Multicall3")
+    mc.add_argument("file", help="JSON list of calls ('-' for stdin)")
+    mc.add_argument("--block", default="latest", help="block tag or number to pin results to")
+    mc.add_argument("--batch-size", type=int, default=DEFAULT_MULTICALL_BATCH)
+    mc.add_argument("--concurrency", type=int, default=DEFAULT_MULTICALL_CONCURRENCY)
     s = sub.add_parser("simulate_transfer")
     s.add_argument("to")
     s.add_argument("value_wei", type=int)
@@ -110,16 +374,38 @@ def main():
     t.add_argument("to")
     t.add_argument("value_wei", type=int)
     t.add_argument("max_value_wei", type=int)
+    t.add_argument("--no-wait", action="store_true", help="return the tx hash without waiting for a receipt")
+    if "--profile-startup" in sys.argv[1:]:
+        # Checked before parse_args so `--profile-startup --help` works too
+        raise SystemExit(profile_startup([a for a in sys.argv[1:] if a != "--profile-startup"]))
     args = p.parse_args()
 
-    if args.cmd == "get_balance":
-        print(json.dumps(get_balance(args.address), indent=2))
-    elif args.cmd == "simulate_transfer":
-        print(json.dumps(simulate_transfer(args.to, args.value_wei), indent=2))
-    elif args.cmd == "send_transfer":
-        print(json.dumps(send_transfer(args.to, args.value_wei, args.max_value_wei), indent=2))
-    else:
-        p.print_help()
+    try:
+        if args.cmd == "get_balance":
+            print(json.dumps(get_balance(args.address), indent=2))
+        elif args.cmd == "get_balances":
+            addrs = list(args.addresses)
+            if args.file:
+                text = sys.stdin.read() if args.file == "-" else Path(args.file).read_text()
+                addrs += [line.strip() for line in text.splitlines() if line.strip()]
+            out = get_balances(addrs, args.block, args.batch_size, args.concurrency)
+            print(json.dumps(out, indent=2))
+        elif args.cmd == "get_block":
+            block = int(args.block) if args.block.isdigit() else args.block
+            print(json.dumps(get_block(block, args.full), indent=2))
+        elif args.cmd == "get_receipt":
+            print(json.dumps(get_receipt(args.tx_hash), indent=2))
+        elif args.cmd == "multicall":
+            text = sys.stdin.read() if args.file == "-" else Path(args.file).read_text()
+            print(json.dumps(multicall(json.loads(text), args.block, args.batch_size, args.concurrency), indent=2))
+        elif args.cmd == "simulate_transfer":
+            print(json.dumps(simulate_transfer(args.to, args.value_wei), indent=2))
+        elif args.cmd == "send_transfer":
+            print(json.dumps(send_transfer(args.to, args.value_wei, args.max_value_wei, not args.no_wait), indent=2))
+        else:
+            p.print_help()
+    finally:
+        close_ctx()
 
 
 if __name__ == "__main__":
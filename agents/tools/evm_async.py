@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+AsyncWeb3 twin of agents/tools/evm.py for the FastAPI server. Same tool
+signatures and outputs, but every RPC is awaited so a single process can hold
+many in-flight requests (including receipt waits) without a worker per call.
+"""
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from dotenv import load_dotenv
+from eth_account import Account
+from web3 import AsyncWeb3, Web3
+
+from agents.ledger import LEDGER
+from agents.tools.chain import async_chain_id, async_fee_params
+from agents.tools.evm import (
+    DEFAULT_BATCH_CONCURRENCY,
+    DEFAULT_BATCH_SIZE,
+    NONCE_RETRIES,
+    balance_calls,
+    balance_chunks,
+    charge_budgets,
+    check_policy,
+    fill_balances,
+)
+from agents.tools.multicall import (
+    DEFAULT_MULTICALL_BATCH,
+    DEFAULT_MULTICALL_CONCURRENCY,
+    DEPLOYED,
+    MULTICALL3_ADDRESS,
+    decode_aggregate3,
+    dev_set_code_method,
+    encode_aggregate3,
+    missing_code,
+    prepare,
+    runtime_code,
+)
+from agents.tools.nonce import NONCES, is_nonce_error
+from agents.tools.rpc import (
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RPC_TIMEOUT,
+    block_tag,
+    count_request,
+    decode_batch,
+    encode_batch,
+)
+
+
+@dataclass
+class AsyncEVMContext:
+    w3: AsyncWeb3
+    address: str
+    pk: str
+    session: ClientSession
+
+
+_CTX: Optional[AsyncEVMContext] = None
+_LOCK: Optional[asyncio.Lock] = None
+# Read-only client used when no signing context exists (needs only EVM_RPC_URL)
+_RPC: Optional[Tuple[AsyncWeb3, ClientSession]] = None
+
+
+class PooledAsyncHTTPProvider(AsyncWeb3.AsyncHTTPProvider):
+    """AsyncHTTPProvider that posts through one caller-owned aiohttp session."""
+
+    def __init__(self, endpoint_uri: str, session: ClientSession, **kwargs: Any) -> None:
+        super().__init__(endpoint_uri, **kwargs)
+        self._session = session
+        self._chain_id: Optional[str] = None
+
+    async def make_request(self, method, params):
+        if method == "eth_chainId" and self._chain_id is not None:
+            return {"jsonrpc": "2.0", "id": 0, "result": self._chain_id}
+        kwargs = dict(self.get_request_kwargs())
+        body = self.encode_rpc_request(method, params)
+        async with self._session.post(self.endpoint_uri, data=body, **kwargs) as resp:
+            count_request(body)
+            resp.raise_for_status()
+            raw = await resp.read()
+        out = self.decode_rpc_response(raw)
+        if method == "eth_chainId" and "result" in out:
+            self._chain_id = out["result"]
+        return out
+
+    async def make_batch(self, calls: Sequence[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        kwargs = dict(self.get_request_kwargs())
+        body = encode_batch(calls)
+        async with self._session.post(self.endpoint_uri, data=body, **kwargs) as resp:
+            count_request(body)
+            resp.raise_for_status()
+            raw = await resp.read()
+        return decode_batch(raw, len(calls))
+
+
+def new_async_w3(rpc: str, pool_size: Optional[int] = None) -> Tuple[AsyncWeb3, ClientSession]:
+    size = pool_size or int(os.environ.get("EVM_RPC_POOL_SIZE", DEFAULT_POOL_SIZE))
+    timeout = int(os.environ.get("EVM_RPC_TIMEOUT", DEFAULT_RPC_TIMEOUT))
+    session = ClientSession(
+        connector=TCPConnector(limit_per_host=size), timeout=ClientTimeout(total=timeout)
+    )
+    return AsyncWeb3(PooledAsyncHTTPProvider(rpc, session)), session
+
+
+async def init_async_ctx(
+    rpc: Optional[str] = None, pk: Optional[str] = None, pool_size: Optional[int] = None
+) -> AsyncEVMContext:
+    """Build the shared async context; must run inside the serving event loop."""
+    global _CTX
+    load_dotenv()
+    rpc = rpc or os.environ.get("EVM_RPC_URL")
+    pk = pk or os.environ.get("PRIVATE_KEY")
+    if not rpc or not pk:
+        raise SystemExit("Set EVM_RPC_URL and PRIVATE_KEY in .env or env")
+    w3, session = new_async_w3(rpc, pool_size)
+    ctx = AsyncEVMContext(
+        w3=w3,
+        address=Account.from_key(pk).address,
+        pk=pk,
+        session=session,
+    )
+    old, _CTX = _CTX, ctx
+    if old is not None:
+        await old.session.close()
+    return ctx
+
+
+async def load_async_ctx() -> AsyncEVMContext:
+    global _LOCK
+    if _CTX is not None:
+        return _CTX
+    if _LOCK is None:
+        _LOCK = asyncio.Lock()
+    async with _LOCK:
+        return _CTX or await init_async_ctx()
+
+
+async def load_async_w3() -> AsyncWeb3:
+    """AsyncWeb3 for read-only tools: the signing context's if one exists, else one that needs only EVM_RPC_URL."""
+    global _RPC
+    if _CTX is not None:
+        return _CTX.w3
+    if _RPC is None:
+        load_dotenv()
+        rpc = os.environ.get("EVM_RPC_URL")
+        if not rpc:
+            raise SystemExit("Set EVM_RPC_URL in .env or env")
+        _RPC = new_async_w3(rpc)
+    return _RPC[0]
+
+
+async def close_async_ctx() -> None:
+    global _CTX, _RPC
+    ctx, _CTX = _CTX, None
+    rpc, _RPC = _RPC, None
+    if ctx is not None:
+        await ctx.session.close()
+    if rpc is not None:
+        await rpc[1].close()
+
+
+async def get_balance(address: str) -> Dict[str, Any]:
+    w3 = await load_async_w3()
+    bal = await w3.eth.get_balance(Web3.to_checksum_address(address))
+    return {"address": Web3.to_checksum_address(address), "wei": bal}
+
+
+async def resolve_block(w3: AsyncWeb3, block: Union[str, int]) -> int:
+    height = block_tag(block)
+    if height is None:
+        height = int((await w3.eth.get_block(block))["number"])
+    return height
+
+
+async def get_balances(
+    addresses: List[str],
+    block: Union[str, int] = "latest",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+) -> Dict[str, Any]:
+    w3 = await load_async_w3()
+    height = await resolve_block(w3, block)
+    results, calls = balance_calls(addresses, height)
+    chunks = balance_chunks(calls, batch_size)
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def fetch(chunk):
+        async with sem:
+            try:
+                responses = await w3.provider.make_batch([c for _, c in chunk])
+            except Exception as e:
+                responses = [{"error": {"message": str(e)}} for _ in chunk]
+        fill_balances(results, chunk, responses)
+
+    await asyncio.gather(*(fetch(c) for c in chunks))
+    return {"block": height, "balances": results}
+
+
+async def ensure_multicall3(w3: AsyncWeb3) -> None:
+    endpoint = w3.provider.endpoint_uri
+    if endpoint in DEPLOYED:
+        return
+    if missing_code(await w3.eth.get_code(MULTICALL3_ADDRESS)):
+        method = dev_set_code_method(await w3.client_version)
+        if method is None:
+            raise SystemExit(f"Multicall3 is not deployed at {MULTICALL3_ADDRESS} on this chain")
+        out = await w3.provider.make_request(method, [MULTICALL3_ADDRESS, runtime_code()])
+        if out.get("error"):
+            raise ValueError(out["error"])
+    DEPLOYED.add(endpoint)
+
+
+async def multicall(
+    calls: List[Dict[str, Any]],
+    block: Union[str, int] = "latest",
+    batch_size: int = DEFAULT_MULTICALL_BATCH,
+    concurrency: int = DEFAULT_MULTICALL_CONCURRENCY,
+) -> Dict[str, Any]:
+    w3 = await load_async_w3()
+    await ensure_multicall3(w3)
+    height = await resolve_block(w3, block)
+    chunks = prepare(calls, batch_size)
+    sem = asyncio.Semaphore(max(1, int(concurrency)))
+
+    async def run(chunk):
+        async with sem:
+            out = await w3.provider.make_request(
+                "eth_call", [{"to": MULTICALL3_ADDRESS, "data": encode_aggregate3(chunk)}, hex(height)]
+            )
+        if out.get("error"):
+            raise ValueError(out["error"])
+        return decode_aggregate3(chunk, out["result"])
+
+    batches = await asyncio.gather(*(run(c) for c in chunks))
+    return {"block": height, "results": [r for batch in batches for r in batch]}
+
+
+async def simulate_transfer(to: str, value_wei: int) -> Dict[str, Any]:
+    ctx = await load_async_ctx()
+    tx = {
+        "from": ctx.address,
+        "to": Web3.to_checksum_address(to),
+        "value": int(value_wei),
+        "data": b"",
+    }
+    try:
+        gas = await ctx.w3.eth.estimate_gas(tx)
+        return {"ok": True, "estimated_gas": int(gas)}
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+
+async def broadcast(ctx: AsyncEVMContext, tx: Dict[str, Any]) -> bytes:
+    key = (int(tx["chainId"]), ctx.address)
+    for attempt in range(NONCE_RETRIES + 1):
+        nonce = NONCES.reserve(key)
+        if nonce is None:
+            NONCES.seed(key, await ctx.w3.eth.get_transaction_count(ctx.address, "pending"))
+            nonce = NONCES.reserve(key)
+        signed = Account.sign_transaction({**tx, "nonce": nonce}, ctx.pk)
+        try:
+            txh = await ctx.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception as e:
+            if is_nonce_error(e) and attempt < NONCE_RETRIES:
+                NONCES.resync(key, await ctx.w3.eth.get_transaction_count(ctx.address, "pending"), nonce)
+                continue
+            NONCES.release(key, nonce)
+            raise
+        NONCES.sent(key, nonce)
+        return txh
+
+
+async def send_transfer(
+    to: str, value_wei: int, max_value_wei: int = None, wait: bool = True
+) -> Dict[str, Any]:
+    check_policy(to, value_wei, max_value_wei)
+    ctx = await load_async_ctx()
+    sim = await simulate_transfer(to, value_wei)
+    if not sim.get("ok"):
+        raise SystemExit(f"Simulation failed: {sim.get('error')}")
+    cid, fees = await asyncio.gather(async_chain_id(ctx.w3), async_fee_params(ctx.w3))
+    tx = {
+        "to": Web3.to_checksum_address(to),
+        "value": int(value_wei),
+        "gas": max(21_000, int(sim.get("estimated_gas", 21_000))),
+        "chainId": cid,
+        **fees,
+    }
+    charge = charge_budgets(ctx.address, to, value_wei)
+    try:
+        txh = await broadcast(ctx, tx)
+    except Exception:
+        if charge is not None:
+            LEDGER.refund(charge)
+        raise
+    if not wait:
+        return {"tx_hash": Web3.to_hex(txh), "status": "pending"}
+    try:
+        rcpt = await ctx.w3.eth.wait_for_transaction_receipt(txh)
+    except Exception as e:
+        # Name the hash so callers (e.g. playbook resume) know the transfer already went out
+        raise SystemExit(f"Transaction {Web3.to_hex(txh)} was broadcast but its receipt was not fetched: {e}")
+    return json.loads(Web3.to_json(rcpt))
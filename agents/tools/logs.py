@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Chunked, concurrent eth_getLogs scanning.
+
+`scan_logs` splits a block range into chunks, fetches up to `concurrency`
+chunks at once over the pooled RPC session, and yields logs in block order.
+Chunks shrink (and the failed chunk is split and retried) when the provider
+rejects a range as too large or too busy, and grow again while results are
+sparse, so one call can cover an arbitrary range without tripping provider
+limits or silently truncating. Rate-limit responses (HTTP status 429 and the
+like) are retried on the same range with exponential backoff.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from agents.tools.decode import TRANSFER_TOPIC, decode_logs
+from agents.tools.rpc import RPC, to_checksum_address
+
+DEFAULT_CHUNK = 2_000
+MAX_CHUNK = 100_000
+DEFAULT_SCAN_CONCURRENCY = 4
+# Grow the chunk while a chunk returns fewer logs than this
+TARGET_LOGS = 2_000
+RATE_RETRIES = 5
+RATE_BACKOFF = 0.5
+MAX_RATE_BACKOFF = 10.0
+
+# Substrings providers use when a range or result set is over their limit
+RANGE_ERRORS = (
+    "query returned more than",
+    "too many results",
+    "more than 10000",
+    "block range",
+    "range too large",
+    "range is too large",
+    "exceed maximum block range",
+    "response size exceeded",
+    "response is too big",
+    "query timeout",
+    "413 client error",
+    "payload too large",
+)
+
+
+# Substrings providers use when throttling (besides HTTP 429); these are retried, not split
+RATE_ERRORS = (
+    "too many requests",
+    "rate limit",
+    "rate-limit",
+    "request limit",
+    "capacity exceeded",
+)
+
+
+def is_rate_error(err: Exception) -> bool:
+    # Match the HTTP status, not "429" in the text, which may be part of a block number or hash
+    if getattr(getattr(err, "response", None), "status_code", None) == 429:
+        return True
+    msg = str(err).lower()
+    return any(marker in msg for marker in RATE_ERRORS)
+
+
+def is_range_error(err: Exception) -> bool:
+    msg = str(err).lower()
+    return not is_rate_error(err) and any(marker in msg for marker in RANGE_ERRORS)
+
+
+def get_logs(rpc: RPC, start: int, end: int, address: Optional[str] = None,
+             topics: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    flt: Dict[str, Any] = {"fromBlock": hex(start), "toBlock": hex(end)}
+    if address:
+        flt["address"] = address
+    if topics:
+        flt["topics"] = list(topics)
+    return rpc.call("eth_getLogs", [flt])
+
+
+def get_logs_backoff(rpc: RPC, start: int, end: int, address: Optional[str] = None,
+                     topics: Optional[Sequence[Any]] = None) -> List[Dict[str, Any]]:
+    """get_logs, waiting and retrying the same range while the provider is rate limiting."""
+    attempt = 0
+    while True:
+        try:
+            return get_logs(rpc, start, end, address, topics)
+        except Exception as e:
+            if not is_rate_error(e) or attempt >= RATE_RETRIES:
+                raise
+        time.sleep(min(MAX_RATE_BACKOFF, RATE_BACKOFF * 2 ** attempt))
+        attempt += 1
+
+
+def log_key(log: Dict[str, Any]) -> Tuple[int, int]:
+    return int(log["blockNumber"], 16), int(log["logIndex"], 16)
+
+
+def scan_logs(
+    rpc: RPC,
+    start: int,
+    end: int,
+    address: Optional[str] = None,
+    topics: Optional[Sequence[Any]] = None,
+    chunk: int = DEFAULT_CHUNK,
+    concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+    max_chunk: int = MAX_CHUNK,
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of raw logs covering [start, end] in (block, logIndex) order, one list per chunk.
+
+    At most 2 * concurrency chunks are in flight or buffered awaiting an
+    earlier chunk, so memory stays bounded on long ranges.
+    """
+    size = max(1, int(chunk))
+    cursor = start
+    emit_from = start
+    ready: Dict[int, Tuple[int, List[Dict[str, Any]]]] = {}
+    inflight: Dict[Any, Tuple[int, int]] = {}
+    workers = max(1, int(concurrency))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        def submit(a: int, b: int) -> None:
+            inflight[pool.submit(get_logs_backoff, rpc, a, b, address, topics)] = (a, b)
+
+        while cursor <= end or inflight or ready:
+            while cursor <= end and len(inflight) < workers and len(inflight) + len(ready) < 2 * workers:
+                b = min(end, cursor + size - 1)
+                submit(cursor, b)
+                cursor = b + 1
+            if inflight:
+                finished, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    a, b = inflight.pop(fut)
+                    try:
+                        logs = fut.result()
+                    except Exception as e:
+                        if not is_range_error(e) or a == b:
+                            raise
+                        # Split the rejected range in place so block order is preserved
+                        mid = (a + b) // 2
+                        size = max(1, min(size, (b - a + 1) // 2))
+                        submit(a, mid)
+                        submit(mid + 1, b)
+                        continue
+                    if len(logs) < TARGET_LOGS // 4:
+                        size = min(max_chunk, size * 2)
+                    elif len(logs) > TARGET_LOGS:
+                        size = max(1, size // 2)
+                    ready[a] = (b, logs)
+            while emit_from in ready:
+                b, logs = ready.pop(emit_from)
+                logs.sort(key=log_key)
+                emit_from = b + 1
+                yield logs
+
+
+def scan_transfers(rpc: RPC, token: str, start: int, end: int, **kwargs: Any) -> Iterator[Dict[str, Any]]:
+    """Stream decoded Transfer events of one token over [start, end] in block order."""
+    for logs in scan_logs(rpc, start, end, to_checksum_address(token), [TRANSFER_TOPIC], **kwargs):
+        yield from decode_logs(logs)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Aggregate contract reads through Multicall3.
+
+Each call is {"target", "abi", "function", "args"?, "allow_failure"?} (or a
+raw {"target", "data"}); calls are ABI-encoded locally, sent as one
+`aggregate3` eth_call per `batch_size` calls, and each return value is
+decoded with the caller's ABI. Multicall3 lives at the same address on most
+chains; on a local Anvil/Hardhat node without it, the runtime code is
+installed with `anvil_setCode`/`hardhat_setCode`.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from agents.tools.rpc import RPC, in_context, to_checksum_address
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+# Canonical Multicall3 runtime code (github.com/mds1/multicall, MIT)
+MULTICALL3_CODE_PATH = Path(__file__).resolve().parent / "multicall3.hex"
+AGGREGATE3_SELECTOR = "82ad56cb"
+DEFAULT_MULTICALL_BATCH = 500
+DEFAULT_MULTICALL_CONCURRENCY = 4
+DEV_NODES = {"anvil": "anvil_setCode", "hardhat": "hardhat_setCode"}
+
+
+def abi_type(param: Dict[str, Any]) -> str:
+    """Canonical type string for an ABI parameter, expanding tuples."""
+    t = param["type"]
+    if t.startswith("tuple"):
+        return "(" + ",".join(abi_type(c) for c in param["components"]) + ")" + t[len("tuple"):]
+    return t
+
+
+def find_function(abi: Sequence[Dict[str, Any]], name: str, nargs: int) -> Dict[str, Any]:
+    for item in abi:
+        if item.get("type", "function") == "function" and item.get("name") == name and len(item.get("inputs", [])) == nargs:
+            return item
+    raise ValueError(f"Function {name} with {nargs} args not in ABI")
+
+
+def jsonable(value: Any) -> Any:
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    return value
+
+
+class Call:
+    __slots__ = ("target", "data", "allow_failure", "outputs")
+
+    def __init__(self, spec: Dict[str, Any]) -> None:
+        from eth_abi import encode
+        from eth_hash.auto import keccak
+
+        self.target = to_checksum_address(spec["target"])
+        self.allow_failure = bool(spec.get("allow_failure", True))
+        self.outputs: Optional[List[str]] = None
+        if spec.get("data") is not None:
+            data = spec["data"]
+            self.data = bytes.fromhex(data[2:] if data.startswith("0x") else data)
+            return
+        args = list(spec.get("args") or [])
+        fn = find_function(spec["abi"], spec["function"], len(args))
+        inputs = [abi_type(p) for p in fn.get("inputs", [])]
+        self.outputs = [abi_type(p) for p in fn.get("outputs", [])]
+        selector = keccak(f"{fn['name']}({','.join(inputs)})".encode())[:4]
+        self.data = selector + encode(inputs, args)
+
+    def decode(self, ok: bool, ret: bytes) -> Dict[str, Any]:
+        from eth_abi import decode
+
+        if not ok:
+            return {"success": False, "error": "0x" + ret.hex()}
+        if self.outputs is None:
+            return {"success": True, "result": "0x" + ret.hex()}
+        try:
+            values = decode(self.outputs, ret)
+        except Exception as e:
+            return {"success": False, "error": f"decode failed: {e}"}
+        result = values[0] if len(values) == 1 else list(values)
+        return {"success": True, "result": jsonable(result)}
+
+
+def encode_aggregate3(calls: Sequence[Call]) -> str:
+    from eth_abi import encode
+
+    body = encode(["(address,bool,bytes)[]"], [[(c.target, c.allow_failure, c.data) for c in calls]])
+    return "0x" + AGGREGATE3_SELECTOR + body.hex()
+
+
+def decode_aggregate3(calls: Sequence[Call], raw: str) -> List[Dict[str, Any]]:
+    from eth_abi import decode
+
+    (results,) = decode(["(bool,bytes)[]"], bytes.fromhex(raw[2:]))
+    return [c.decode(ok, ret) for c, (ok, ret) in zip(calls, results)]
+
+
+def runtime_code() -> str:
+    return MULTICALL3_CODE_PATH.read_text().strip()
+
+
+def prepare(calls: Sequence[Dict[str, Any]], batch_size: int = DEFAULT_MULTICALL_BATCH) -> List[List[Call]]:
+    """Encode call specs and group them into aggregate3 batches."""
+    prepared = [Call(spec) for spec in calls]
+    size = max(1, int(batch_size))
+    return [prepared[i:i + size] for i in range(0, len(prepared), size)]
+
+
+def missing_code(code: Any) -> bool:
+    if not isinstance(code, str):
+        code = "0x" + bytes(code or b"").hex()
+    return code in ("0x", "0x0")
+
+
+def dev_set_code_method(client_version: str) -> Optional[str]:
+    """anvil_setCode/hardhat_setCode for local dev nodes, else None."""
+    version = client_version.lower()
+    return next((m for name, m in DEV_NODES.items() if name in version), None)
+
+
+# Endpoints already known to have Multicall3, so the code check runs once per process
+DEPLOYED: Set[str] = set()
+
+
+def ensure_multicall3(rpc: RPC) -> str:
+    """Make sure Multicall3 exists on the node, installing it on a local dev node if missing."""
+    if rpc.endpoint in DEPLOYED:
+        return MULTICALL3_ADDRESS
+    if missing_code(rpc.call("eth_getCode", [MULTICALL3_ADDRESS, "latest"])):
+        method = dev_set_code_method(rpc.call("web3_clientVersion"))
+        if method is None:
+            raise SystemExit(f"Multicall3 is not deployed at {MULTICALL3_ADDRESS} on this chain")
+        rpc.call(method, [MULTICALL3_ADDRESS, runtime_code()])
+    DEPLOYED.add(rpc.endpoint)
+    return MULTICALL3_ADDRESS
+
+
+def aggregate(
+    rpc: RPC,
+    calls: Sequence[Dict[str, Any]],
+    height: int,
+    batch_size: int = DEFAULT_MULTICALL_BATCH,
+    concurrency: int = DEFAULT_MULTICALL_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+    """Run view calls through Multicall3 at one block height, results in call order.
+
+    Each result is {"success", "result"|"error"}; a call with allow_failure
+    false that reverts fails its whole aggregate3 batch instead.
+    """
+    ensure_multicall3(rpc)
+    chunks = prepare(calls, batch_size)
+
+    def run(chunk: List[Call]) -> List[Dict[str, Any]]:
+        raw = rpc.call("eth_call", [{"to": MULTICALL3_ADDRESS, "data": encode_aggregate3(chunk)}, hex(height)])
+        return decode_aggregate3(chunk, raw)
+
+    with ThreadPoolExecutor(max_workers=max(1, int(concurrency))) as pool:
+        return [r for batch in pool.map(in_context(run), chunks) for r in batch]
+
+
+def _view(name: str, inputs: List[Tuple[str, str]], out: str) -> Dict[str, Any]:
+    return {
+        "type": "function", "name": name, "stateMutability": "view",
+        "inputs": [{"name": n, "type": t} for n, t in inputs],
+        "outputs": [{"name": "", "type": out}],
+    }
+
+
+# Multicall3's own helpers, usable as call targets alongside contract reads
+MULTICALL3_ABI = [
+    _view("getBlockNumber", [], "uint256"),
+    _view("getCurrentBlockTimestamp", [], "uint256"),
+    _view("getEthBalance", [("addr", "address")], "uint256"),
+]
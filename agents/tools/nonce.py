@@ -0,0 +1,122 @@
+"""
+In-process nonce allocator for hot wallets.
+
+Nonces are reserved locally per (chain_id, address) so concurrent sends from one
+key get distinct, consecutive nonces without a `get_transaction_count` round
+trip each. The counter is seeded from the `pending` tag and resynced from it when
+the node reports a nonce conflict. Reserved nonces count as in flight until they
+are sent or released, and a resync never moves the counter back below them.
+"""
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+Key = Tuple[int, str]
+
+NONCE_ERRORS = (
+    "nonce too low",
+    "nonce too high",
+    "invalid nonce",
+    "replacement transaction underpriced",
+)
+
+
+def is_nonce_error(err: Exception) -> bool:
+    msg = str(err).lower()
+    return any(s in msg for s in NONCE_ERRORS)
+
+
+class NonceManager:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._next: Dict[Key, int] = {}
+        self._inflight: Dict[Key, Set[int]] = {}
+        # Released nonces below the counter, handed out again before new ones
+        self._free: Dict[Key, Set[int]] = {}
+
+    def _floor(self, key: Key, pending_count: int) -> int:
+        inflight = self._inflight.get(key)
+        return max(int(pending_count), max(inflight) + 1) if inflight else int(pending_count)
+
+    def reserve(self, key: Key) -> Optional[int]:
+        """Atomically take the lowest free nonce, or None if the key has not been seeded."""
+        with self._lock:
+            n = self._next.get(key)
+            if n is None:
+                return None
+            free = self._free.get(key)
+            if free:
+                n = min(free)
+                free.discard(n)
+            else:
+                self._next[key] = n + 1
+            self._inflight.setdefault(key, set()).add(n)
+            return n
+
+    def sent(self, key: Key, nonce: int) -> None:
+        """Mark a reserved nonce as broadcast; the node's pending count now covers it."""
+        with self._lock:
+            self._done(key, nonce)
+
+    def _done(self, key: Key, nonce: int) -> None:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight.discard(nonce)
+            if not inflight:
+                del self._inflight[key]
+
+    def seed(self, key: Key, pending_count: int) -> None:
+        """Set the counter from the node's pending count unless already tracked."""
+        with self._lock:
+            self._next.setdefault(key, self._floor(key, pending_count))
+
+    def resync(self, key: Key, pending_count: int, rejected: Optional[int] = None) -> None:
+        """Reset the counter after the node rejected `rejected` for its nonce.
+
+        With no other reservations outstanding the counter follows the node's
+        pending count; otherwise it only moves forward, past those reservations.
+        Released nonces the node has already seen used are forgotten.
+        """
+        with self._lock:
+            if rejected is not None:
+                self._done(key, rejected)
+            pending = int(pending_count)
+            if key in self._inflight:
+                self._next[key] = max(self._next.get(key, 0), self._floor(key, pending))
+                free = {n for n in self._free.get(key, ()) if n >= pending}
+                if free:
+                    self._free[key] = free
+                else:
+                    self._free.pop(key, None)
+            else:
+                self._next[key] = pending
+                self._free.pop(key, None)
+
+    def release(self, key: Key, nonce: int) -> None:
+        """Return a nonce that was reserved but never broadcast.
+
+        If it was the most recent reservation the counter steps back; otherwise
+        it is kept and handed out by the next `reserve`, so no gap is left.
+        """
+        with self._lock:
+            self._done(key, nonce)
+            n = self._next.get(key)
+            if n is None:
+                return
+            free = self._free.setdefault(key, set())
+            free.add(nonce)
+            # Step the counter back over released nonces at the top
+            while n - 1 in free:
+                n -= 1
+                free.discard(n)
+            self._next[key] = n
+            if not free:
+                del self._free[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._next.clear()
+            self._inflight.clear()
+            self._free.clear()
+
+
+NONCES = NonceManager()
@@ -0,0 +1,42 @@
+"""web3 provider backed by the shared session pool in agents/tools/rpc.py."""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from web3 import Web3
+
+from agents.tools.rpc import decode_batch, encode_batch, rpc_timeout
+
+
+class PooledHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider that posts through one shared session for every thread.
+
+    web3's own session cache is keyed per thread, so a threadpool server ends up
+    with one connection (and TLS handshake) per worker; this keeps a single pool.
+    """
+
+    def __init__(self, endpoint_uri: str, session: requests.Session, **kwargs: Any) -> None:
+        super().__init__(endpoint_uri, **kwargs)
+        self._session = session
+        self._chain_id: Optional[str] = None
+
+    def make_request(self, method, params):
+        # chain_id never changes for an endpoint; web3's validation middleware
+        # would otherwise ask for it before every eth_call/eth_estimateGas
+        if method == "eth_chainId" and self._chain_id is not None:
+            return {"jsonrpc": "2.0", "id": 0, "result": self._chain_id}
+        kwargs = dict(self.get_request_kwargs())
+        kwargs.setdefault("timeout", rpc_timeout())
+        resp = self._session.post(self.endpoint_uri, data=self.encode_rpc_request(method, params), **kwargs)
+        resp.raise_for_status()
+        out = self.decode_rpc_response(resp.content)
+        if method == "eth_chainId" and "result" in out:
+            self._chain_id = out["result"]
+        return out
+
+    def make_batch(self, calls: Sequence[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """POST calls as one JSON-RPC batch array; responses come back in call order."""
+        kwargs = dict(self.get_request_kwargs())
+        kwargs.setdefault("timeout", rpc_timeout())
+        resp = self._session.post(self.endpoint_uri, data=encode_batch(calls), **kwargs)
+        resp.raise_for_status()
+        return decode_batch(resp.content, len(calls))
@@ -0,0 +1,153 @@
+"""
+Background receipt tracker for fire-and-forget sends.
+
+`send_transfer(..., wait=False)` returns as soon as the transaction is
+broadcast; the hash is handed to TRACKER, which polls pending receipts in
+JSON-RPC batches once per new block and wakes any long-poll or SSE waiters.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from agents.tools.evm_async import load_async_ctx
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_MAX_DONE = 10_000
+
+
+def summarize(tx_hash: str, receipt: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if receipt is None:
+        return {"tx_hash": tx_hash, "status": "pending"}
+    ok = int(receipt.get("status", "0x1"), 16) == 1
+    return {
+        "tx_hash": tx_hash,
+        "status": "confirmed" if ok else "failed",
+        "block_number": int(receipt["blockNumber"], 16),
+        "gas_used": int(receipt["gasUsed"], 16),
+        "receipt": receipt,
+    }
+
+
+class ReceiptTracker:
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        batch_size: int = 100,
+        max_done: int = DEFAULT_MAX_DONE,
+    ) -> None:
+        self.interval = interval or float(os.environ.get("EVM_RECEIPT_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+        self.batch_size = batch_size
+        self.max_done = max_done
+        self._pending: Dict[str, float] = {}
+        self._done: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_block: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._cond: Optional[asyncio.Condition] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._cond = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def track(self, tx_hash: str) -> Dict[str, Any]:
+        self.start()
+        self._pending.setdefault(tx_hash, time.time())
+        self._wake.set()
+        return summarize(tx_hash, None)
+
+    def status(self, tx_hash: str) -> Optional[Dict[str, Any]]:
+        if tx_hash in self._done:
+            return self._done[tx_hash]
+        if tx_hash in self._pending:
+            return summarize(tx_hash, None)
+        return None
+
+    async def lookup(self, tx_hash: str) -> Dict[str, Any]:
+        """Status for any hash; untracked ones are fetched once from the node."""
+        st = self.status(tx_hash)
+        if st is not None:
+            return st
+        ctx = await load_async_ctx()
+        (resp,) = await ctx.w3.provider.make_batch([("eth_getTransactionReceipt", [tx_hash])])
+        if resp.get("result"):
+            return self._finish(tx_hash, resp["result"])
+        return {"tx_hash": tx_hash, "status": "unknown"}
+
+    async def wait(self, tx_hash: str, timeout: float) -> Dict[str, Any]:
+        """Long-poll: return once the tx leaves pending or the timeout elapses."""
+        st = await self.lookup(tx_hash)
+        if st["status"] != "pending":
+            return st
+        self.start()
+        try:
+            async with self._cond:
+                await asyncio.wait_for(
+                    self._cond.wait_for(lambda: tx_hash in self._done), timeout
+                )
+        except asyncio.TimeoutError:
+            pass
+        return self.status(tx_hash)
+
+    async def updates(self, tx_hash: str, heartbeat: float = 15.0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the current status, then heartbeats until a final status."""
+        while True:
+            st = await self.wait(tx_hash, heartbeat)
+            yield st
+            if st["status"] != "pending":
+                return
+
+    def _finish(self, tx_hash: str, receipt: Dict[str, Any]) -> Dict[str, Any]:
+        self._pending.pop(tx_hash, None)
+        st = summarize(tx_hash, receipt)
+        self._done[tx_hash] = st
+        while len(self._done) > self.max_done:
+            self._done.popitem(last=False)
+        return st
+
+    async def poll_once(self) -> None:
+        if not self._pending:
+            return
+        ctx = await load_async_ctx()
+        block = await ctx.w3.eth.block_number
+        if block == self._last_block:
+            return
+        self._last_block = block
+        hashes: List[str] = list(self._pending)
+        for i in range(0, len(hashes), self.batch_size):
+            chunk = hashes[i:i + self.batch_size]
+            responses = await ctx.w3.provider.make_batch(
+                [("eth_getTransactionReceipt", [h]) for h in chunk]
+            )
+            for h, r in zip(chunk, responses):
+                if r.get("result"):
+                    self._finish(h, r["result"])
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def _run(self) -> None:
+        while True:
+            if not self._pending:
+                self._wake.clear()
+                await self._wake.wait()
+            try:
+                await self.poll_once()
+            except Exception:
+                # Transient RPC failures: keep the hashes and retry next tick
+                pass
+            await asyncio.sleep(self.interval)
+
+
+TRACKER = ReceiptTracker()
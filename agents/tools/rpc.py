@@ -0,0 +1,189 @@
+"""
+Lightweight JSON-RPC plumbing shared by the EVM tools.
+
+Only the standard library is imported at module load; `requests` and
+`eth_hash` are pulled in on first use. Read-only tools (balances) talk to the
+node through RPC directly, so they never import web3 or eth_account.
+"""
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RPC_TIMEOUT = 30
+
+# One keep-alive session per RPC endpoint, shared by every thread
+_SESSIONS: Dict[str, "requests.Session"] = {}
+_LOCK = threading.Lock()
+
+
+class RPCCounter:
+    """JSON-RPC traffic seen inside a `count_rpc()` block: HTTP requests, calls and calls per method."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.calls = 0
+        self.methods: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, methods: Sequence[str]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.calls += len(methods)
+            for m in methods:
+                self.methods[m] = self.methods.get(m, 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"requests": self.requests, "calls": self.calls, "methods": dict(self.methods)}
+
+
+_COUNTER: "contextvars.ContextVar[Optional[RPCCounter]]" = contextvars.ContextVar("rpc_counter", default=None)
+
+
+@contextmanager
+def count_rpc() -> Iterator[RPCCounter]:
+    """Count JSON-RPC traffic sent through the pooled sessions by this thread or task.
+
+    Covers the requests sessions and the aiohttp session of the async tools.
+    Concurrent callers each get their own counter; tool thread pools carry it
+    into their workers through `in_context`, asyncio tasks inherit it.
+    """
+    counter = RPCCounter()
+    token = _COUNTER.set(counter)
+    try:
+        yield counter
+    finally:
+        _COUNTER.reset(token)
+
+
+def in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap fn so worker threads run it in the submitting thread's context (keeps RPC counting)."""
+    ctx = contextvars.copy_context()
+    return lambda *args: ctx.copy().run(fn, *args)
+
+
+def count_request(raw: Any) -> None:
+    """Add one sent JSON-RPC request body (single or batch) to the active counter, if any."""
+    counter = _COUNTER.get()
+    if counter is None:
+        return
+    try:
+        body = json.loads(raw or b"null")
+    except ValueError:
+        return
+    reqs = body if isinstance(body, list) else [body]
+    counter.add([r.get("method", "?") for r in reqs if isinstance(r, dict)])
+
+
+def _count_response(resp: Any, *args: Any, **kwargs: Any) -> None:
+    count_request(resp.request.body)
+
+
+def rpc_session(endpoint: str, pool_size: Optional[int] = None) -> "requests.Session":
+    """Return the pooled keep-alive session for an endpoint, creating it once."""
+    with _LOCK:
+        sess = _SESSIONS.get(endpoint)
+        if sess is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            size = pool_size or int(os.environ.get("EVM_RPC_POOL_SIZE", DEFAULT_POOL_SIZE))
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size)
+            sess = requests.Session()
+            sess.mount("http://", adapter)
+            sess.mount("https://", adapter)
+            sess.hooks["response"].append(_count_response)
+            _SESSIONS[endpoint] = sess
+        return sess
+
+
+def close_sessions() -> None:
+    with _LOCK:
+        sessions = list(_SESSIONS.values())
+        _SESSIONS.clear()
+    for sess in sessions:
+        sess.close()
+
+
+def rpc_timeout() -> int:
+    return int(os.environ.get("EVM_RPC_TIMEOUT", DEFAULT_RPC_TIMEOUT))
+
+
+def encode_batch(calls: Sequence[Tuple[str, Any]]) -> bytes:
+    body = [{"jsonrpc": "2.0", "id": i, "method": m, "params": params} for i, (m, params) in enumerate(calls)]
+    return json.dumps(body).encode()
+
+
+def decode_batch(raw: bytes, n: int) -> List[Dict[str, Any]]:
+    # Providers may reorder batch responses, so match them back up by id
+    data = json.loads(raw)
+    if not isinstance(data, list):
+        err = data.get("error", {"message": "batch request rejected"})
+        return [{"error": err} for _ in range(n)]
+    by_id = {r.get("id"): r for r in data}
+    return [by_id.get(i) or {"error": {"message": "missing response"}} for i in range(n)]
+
+
+class RPC:
+    """Minimal JSON-RPC client over the pooled session (no web3 import)."""
+
+    def __init__(self, endpoint: str, pool_size: Optional[int] = None) -> None:
+        self.endpoint = endpoint
+        self.session = rpc_session(endpoint, pool_size)
+
+    def call(self, method: str, params: Sequence[Any] = ()) -> Any:
+        body = {"jsonrpc": "2.0", "id": 0, "method": method, "params": list(params)}
+        resp = self.session.post(self.endpoint, json=body, timeout=rpc_timeout())
+        resp.raise_for_status()
+        out = resp.json()
+        if out.get("error"):
+            raise ValueError(out["error"])
+        return out["result"]
+
+    def batch(self, calls: Sequence[Tuple[str, Any]]) -> List[Dict[str, Any]]:
+        """POST calls as one JSON-RPC batch array; responses come back in call order."""
+        resp = self.session.post(
+            self.endpoint,
+            data=encode_batch(calls),
+            headers={"Content-Type": "application/json"},
+            timeout=rpc_timeout(),
+        )
+        resp.raise_for_status()
+        return decode_batch(resp.content, len(calls))
+
+
+def to_checksum_address(address: str) -> str:
+    """EIP-55 checksum without importing eth_utils/web3."""
+    from eth_hash.auto import keccak
+
+    a = address.lower()
+    a = a[2:] if a.startswith("0x") else a
+    if len(a) != 40 or any(c not in "0123456789abcdef" for c in a):
+        raise ValueError(f"Invalid address: {address!r}")
+    h = keccak(a.encode()).hex()
+    return "0x" + "".join(c.upper() if int(h[i], 16) >= 8 else c for i, c in enumerate(a))
+
+
+def block_tag(block: Union[str, int]) -> Optional[int]:
+    """Concrete height for ints/hex/decimal strings, None for named tags."""
+    if isinstance(block, int):
+        return block
+    if block.startswith("0x"):
+        return int(block, 16)
+    if block.isdigit():
+        return int(block)
+    return None
+
+
+def resolve_block(rpc: RPC, block: Union[str, int]) -> int:
+    """Pin a block tag (latest/safe/finalized/hex/int) to a concrete height."""
+    height = block_tag(block)
+    if height is None:
+        height = int(rpc.call("eth_getBlockByNumber", [block, False])["number"], 16)
+    return height
@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 import json
 import os
-from datetime import datetime
+import sys
 from pathlib import Path
 
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agents.run_store import record_run
+from agents.tools.chain import chain_id, fee_params
+
+LAB = Path(__file__).resolve().parent.name
 
 def main():
     load_dotenv()
@@ -19,16 +26,11 @@ def main():
     w3 = Web3(Web3.HTTPProvider(rpc))
     acct = Account.from_key(pk)
 
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    runs = Path("runs")
-    runs.mkdir(parents=True, exist_ok=True)
-
-    (runs / f"{ts}-wallet.json").write_text(
-        json.dumps({"address": acct.address, "chain_id": w3.eth.chain_id}, indent=2)
-    )
+    ids = [record_run({"address": acct.address, "chain_id": chain_id(w3)}, "artifact", lab=LAB, task="wallet")]
 
     bal = w3.eth.get_balance(acct.address)
-    (runs / f"{ts}-balance.json").write_text(json.dumps({"wei": bal}, indent=2))
+    ids.append(record_run({"address": acct.address, "wei": bal}, "artifact", lab=LAB, task="balance",
+                          tool="evm.get_balance"))
 
     # Prepare a small self-transfer (or set RECIPIENT env)
     to_addr = os.environ.get("RECIPIENT", acct.address)
@@ -37,15 +39,14 @@ def main():
         "value": Web3.to_wei(0, "ether"),
         "nonce": w3.eth.get_transaction_count(acct.address),
         "gas": 21_000,
-        "maxFeePerGas": w3.eth.gas_price,
-        "maxPriorityFeePerGas": w3.eth.gas_price,
-        "chainId": w3.eth.chain_id,
+        "chainId": chain_id(w3),
+        **fee_params(w3),
     }
     signed = w3.eth.account.sign_transaction(tx, private_key=pk)
     tx_hash = w3.eth.send_raw_transaction(signed.rawTransaction)
     receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    (runs / f"{ts}-transfer.json").write_text(Web3.to_json(receipt))
-    print(f"Wrote artifacts under {runs} with timestamp {ts}")
+    ids.append(record_run(json.loads(Web3.to_json(receipt)), "artifact", lab=LAB, task="transfer"))
+    print(f"Recorded artifacts {', '.join(ids)}")
 
 
 if __name__ == "__main__":
@@ -1,51 +1,137 @@
 #!/usr/bin/env python3
+import argparse
 import os
 import json
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List
 
-from web3 import Web3
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-def get_rpc_transfers(w3: Web3, token: str, start_block: int, end_block: int) -> Dict[str, Any]:
-    # Minimal ERC20 Transfer topic
-    topic = w3.keccak(text="Transfer(address,address,uint256)").hex()
-    logs = w3.eth.get_logs({
-        "fromBlock": start_block,
-        "toBlock": end_block,
-        "address": Web3.to_checksum_address(token),
-        "topics": [topic]
-    })
-    return {"count": len(logs), "logs": [dict(x) for x in logs[:50]]}
+from agents.analytics import CHUNK, FlowStats, chunk_columns, event_rows, flow_stats, to_columns
+from agents.event_store import EventStore
+from agents.run_store import record_run
+from agents.tools.blocks import ChainCache, chain_cache
+from agents.tools.logs import DEFAULT_CHUNK, DEFAULT_SCAN_CONCURRENCY, scan_transfers
+from agents.tools.rpc import RPC
+
+LAB = Path(__file__).resolve().parent.name
+
+def summarize(stats: FlowStats, top: int = 10) -> Dict[str, Any]:
+    holders = stats.holders()
+    return {
+        "holders": len(holders),
+        "top_holders": [{"address": a, "balance": b} for a, b in holders[:top]],
+        "over_time": stats.over_time(),
+    }
+
+
+def add_timestamps(buckets: List[Dict[str, Any]], cache: ChainCache) -> None:
+    # Bucket boundaries repeat across runs, so their headers come from the block cache
+    heads = cache.get_blocks([b["from_block"] for b in buckets])
+    for b, head in zip(buckets, heads):
+        if head is not None:
+            b["timestamp"] = int(head["timestamp"], 16)
+
+
+def get_rpc_transfers(rpc: RPC, token: str, start_block: int, end_block: int, out: Path,
+                      chunk: int = DEFAULT_CHUNK, concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+                      bucket_blocks: int = 1_000) -> Dict[str, Any]:
+    # Stream every decoded Transfer to JSONL in block order instead of keeping a sample in memory
+    stats = FlowStats(bucket_blocks)
+    count, batch = 0, []
+    with out.open("w") as f:
+        for ev in scan_transfers(rpc, token, start_block, end_block, chunk=chunk, concurrency=concurrency):
+            f.write(json.dumps(ev) + "\n")
+            count += 1
+            batch.append(ev)
+            if len(batch) >= CHUNK:
+                stats.add(to_columns(list(event_rows(batch))))
+                batch = []
+    stats.add(to_columns(list(event_rows(batch))))
+    return {"token": token, "from_block": start_block, "to_block": end_block, "count": count, "transfers": str(out),
+            **summarize(stats)}
+
+
+def get_stored_transfers(store: EventStore, rpc: RPC, token: str, start_block: int, end_block: int, out: Path,
+                         chunk: int = DEFAULT_CHUNK, concurrency: int = DEFAULT_SCAN_CONCURRENCY,
+                         bucket_blocks: int = 1_000) -> Dict[str, Any]:
+    # Fetch only confirmed blocks the store has not indexed yet, then answer from disk
+    synced = store.sync(rpc, token, start_block, end_block, chunk=chunk, concurrency=concurrency)
+    stored_to = min(end_block, synced["confirmed_to"])
+    count = 0
+    # Holders cover everything indexed for the token; over_time buckets likewise
+    stats = flow_stats(chunk_columns(store.rows(token)), bucket_blocks)
+    with out.open("w") as f:
+        for ev in store.transfers(token, start_block, stored_to):
+            f.write(json.dumps(ev) + "\n")
+            count += 1
+        # Blocks newer than the confirmation depth may still reorg: read them from the node, never store them
+        recent = []
+        if stored_to < end_block:
+            for ev in scan_transfers(rpc, token, max(start_block, stored_to + 1), end_block,
+                                     chunk=chunk, concurrency=concurrency):
+                f.write(json.dumps(ev) + "\n")
+                count += 1
+                recent.append(ev)
+            stats.add(to_columns(list(event_rows(recent))))
+    return {
+        "token": token, "from_block": start_block, "to_block": end_block, "count": count, "transfers": str(out),
+        "fetched": synced["fetched"], "added": synced["added"], "indexed_span": synced["span"],
+        "unconfirmed": len(recent),
+        **summarize(stats),
+    }
 
 
 def main():
+    p = argparse.ArgumentParser(description="Fetch ERC-20 Transfer logs over a block range")
+    p.add_argument("--from-block", type=int, default=None, help="default: 5000 blocks before --to-block")
+    p.add_argument("--to-block", type=int, default=None, help="default: latest")
+    p.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="initial blocks per eth_getLogs (adapts)")
+    p.add_argument("--concurrency", type=int, default=DEFAULT_SCAN_CONCURRENCY)
+    p.add_argument("--bucket-blocks", type=int, default=1_000, help="bucket width for transfers over time")
+    p.add_argument("--no-store", action="store_true", help="scan RPC directly instead of syncing the local event store")
+    args = p.parse_args()
+
     load_dotenv()
-    rpc = os.environ.get("EVM_RPC_URL")
+    url = os.environ.get("EVM_RPC_URL")
     token = os.environ.get("ERC20_ADDRESS")
-    if not rpc or not token:
+    if not url or not token:
         raise SystemExit("Set EVM_RPC_URL and ERC20_ADDRESS in .env")
-    w3 = Web3(Web3.HTTPProvider(rpc))
-    latest = w3.eth.block_number
-    start = max(0, latest - 5_000)
-    res = get_rpc_transfers(w3, token, start, latest)
+    rpc = RPC(url)
+    cache = chain_cache(rpc)
+    end = args.to_block if args.to_block is not None else cache.block_number()
+    start = args.from_block if args.from_block is not None else max(0, end - 5_000)
 
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
     runs = Path("runs"); runs.mkdir(exist_ok=True)
-    (runs / f"{ts}-rpc.json").write_text(json.dumps(res, indent=2, default=str))
-    print(f"Saved RPC transfers to {runs}/{ts}-rpc.json")
+    out = runs / f"{ts}-transfers.jsonl"
+    if args.no_store:
+        res = get_rpc_transfers(rpc, token, start, end, out, args.chunk, args.concurrency, args.bucket_blocks)
+    else:
+        store = EventStore()
+        try:
+            res = get_stored_transfers(store, rpc, token, start, end, out, args.chunk, args.concurrency,
+                                       args.bucket_blocks)
+        finally:
+            store.close()
+        print(f"Fetched {res['fetched'] or 'nothing'} from RPC; {store.path} covers blocks {res['indexed_span']}")
+    add_timestamps(res["over_time"], cache)
+    run_id = record_run(json.loads(json.dumps(res, default=str)), "artifact", lab=LAB, task="rpc")
+    print(f"Saved {res['count']} RPC transfers to {res['transfers']} (summary run {run_id})")
 
     # Placeholder for The Graph / Dune: save config expectation for users
     graph_query = {
         "subgraph": os.environ.get("GRAPH_SUBGRAPH"),
         "query": "query { transfers(first: 10) { id from to value } }"
     }
-    (runs / f"{ts}-subgraph.json").write_text(json.dumps(graph_query, indent=2))
+    record_run(graph_query, "artifact", lab=LAB, task="subgraph")
     print("Wrote subgraph query placeholder; set GRAPH_SUBGRAPH and run externally.")
 
 
 if __name__ == "__main__":
     main()
-
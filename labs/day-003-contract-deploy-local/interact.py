@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 import json
 import os
-from datetime import datetime
+import sys
 from pathlib import Path
 
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agents.run_store import record_run
+from agents.tools.chain import chain_id, fee_params
+
 
 ABI = [
   {"inputs": [], "name": "count", "outputs": [{"internalType":"uint256","name":"","type":"uint256"}], "stateMutability": "view", "type": "function"},
   {"inputs": [], "name": "increment", "outputs": [], "stateMutability": "nonpayable", "type": "function"}
 ]
+LAB = Path(__file__).resolve().parent.name
 
 
 def main():
@@ -32,21 +39,20 @@ def main():
         "from": acct.address,
         "nonce": w3.eth.get_transaction_count(acct.address),
         "gas": 200_000,
-        "maxFeePerGas": w3.eth.gas_price,
-        "maxPriorityFeePerGas": w3.eth.gas_price,
-        "chainId": w3.eth.chain_id,
+        "chainId": chain_id(w3),
+        **fee_params(w3),
     })
     signed = w3.eth.account.sign_transaction(tx, pk)
     txh = w3.eth.send_raw_transaction(signed.rawTransaction)
     receipt = w3.eth.wait_for_transaction_receipt(txh)
-    after = c.functions.count().call()
-
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    runs = Path("runs"); runs.mkdir(exist_ok=True)
-    (runs / f"{ts}-calls.json").write_text(json.dumps({
-        "before": before, "after": after, "receipt": Web3.to_json(receipt)
-    }, indent=2))
-    print(f"Incremented from {before} to {after}. Artifacts under {runs}.")
+    # Pinned to the block that mined the increment, still a single eth_call
+    after = c.functions.count().call(block_identifier=receipt["blockNumber"])
+
+    run_id = record_run({
+        "before": before, "after": after,
+        "receipt": json.loads(Web3.to_json(receipt)),
+    }, "artifact", lab=LAB, task="calls")
+    print(f"Incremented from {before} to {after}. Recorded run {run_id}.")
 
 
 if __name__ == "__main__":
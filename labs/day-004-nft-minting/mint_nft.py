@@ -1,49 +1,331 @@
 #!/usr/bin/env python3
+import argparse
+import csv
 import json
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, IO, Iterator, List, Optional, Set, Tuple
 
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
 
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from agents.run_store import record_run
+from agents.tools.chain import chain_id, fee_params
+from agents.tools.decode import decode_log
+from agents.tools.rpc import RPC
+
 
 ERC721_ABI = [
   {"inputs": [{"internalType":"address","name":"to","type":"address"},{"internalType":"string","name":"tokenURI","type":"string"}],"name":"safeMint","outputs":[],"stateMutability":"nonpayable","type":"function"}
 ]
 
+MINT_GAS = 400_000
+DEFAULT_WINDOW = 256
+SIGN_CHUNK = 200
+SEND_BATCH = 100
+RECEIPT_BATCH = 100
+DEFAULT_TIMEOUT = 600.0
+LAB = Path(__file__).resolve().parent.name
 
-def main():
-    load_dotenv()
-    rpc = os.environ.get("EVM_RPC_URL")
-    pk = os.environ.get("PRIVATE_KEY")
-    nft_addr = os.environ.get("ERC721_ADDRESS")
-    token_uri = os.environ.get("TOKEN_URI")
-    if not all([rpc, pk, nft_addr, token_uri]):
-        raise SystemExit("Set EVM_RPC_URL, PRIVATE_KEY, ERC721_ADDRESS, TOKEN_URI in .env")
 
-    w3 = Web3(Web3.HTTPProvider(rpc))
+def load_manifest(path: Path) -> Iterator[Dict[str, str]]:
+    """Yield {recipient, token_uri} rows from a CSV (header row) or JSONL file."""
+    with path.open(newline="") as f:
+        rows = csv.DictReader(f) if path.suffix.lower() == ".csv" else (json.loads(line) for line in f if line.strip())
+        for row in rows:
+            row = {k.strip(): str(v).strip() for k, v in row.items() if k}
+            if not row.get("recipient") or not row.get("token_uri"):
+                raise SystemExit(f"Manifest row needs recipient and token_uri: {row}")
+            yield row
+
+
+def load_done(path: Path) -> Set[int]:
+    """Manifest indices already minted according to an earlier results file."""
+    done = set()
+    with path.open() as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("status") == "confirmed":
+                done.add(rec["index"])
+    return done
+
+
+# Signing runs in worker processes; each keeps the key from its initializer
+_SIGNER: Optional[Any] = None
+
+
+def _init_signer(pk: str) -> None:
+    global _SIGNER
+    _SIGNER = Account.from_key(pk)
+
+
+def sign_mints(base: Dict[str, Any], rows: List[Tuple[int, str, str]]) -> List[Tuple[str, str]]:
+    """Build and sign safeMint txs for (nonce, recipient, token_uri) rows -> [(tx_hash, raw_tx)]."""
+    from eth_abi import encode
+    from eth_hash.auto import keccak
+
+    selector = keccak(b"safeMint(address,string)")[:4]
+    out = []
+    for nonce, to, uri in rows:
+        data = selector + encode(["address", "string"], [Web3.to_checksum_address(to), uri])
+        signed = _SIGNER.sign_transaction({**base, "nonce": nonce, "data": data})
+        out.append((Web3.to_hex(signed.hash), Web3.to_hex(signed.rawTransaction)))
+    return out
+
+
+class MintTracker:
+    """Polls receipts for submitted mints and writes one result line per row as it settles.
+
+    If the polling thread dies, `error` is set and waiters are woken, so the
+    submitter stops instead of hanging.
+    """
+
+    def __init__(self, rpc: RPC, out: IO[str], interval: float = 0.2) -> None:
+        self.rpc = rpc
+        self.out = out
+        self.interval = interval
+        self.counts = {"confirmed": 0, "failed": 0, "pending": 0}
+        self.error: Optional[BaseException] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, tx_hash: str, rec: Dict[str, Any]) -> None:
+        with self._cond:
+            self._pending[tx_hash] = rec
+
+    def wait_below(self, limit: int, timeout: float) -> None:
+        """Block until fewer than `limit` mints are waiting for a receipt.
+
+        Raises SystemExit if no receipt frees a slot within `timeout` seconds
+        or the tracker has failed.
+        """
+        with self._cond:
+            ok = self._cond.wait_for(lambda: len(self._pending) < limit or self.error is not None, timeout=timeout)
+            if self.error is not None:
+                raise SystemExit(f"receipt tracker failed: {self.error}")
+            if not ok:
+                raise SystemExit(f"no receipt within {timeout:.0f}s for {len(self._pending)} submitted mints")
+
+    def write(self, rec: Dict[str, Any]) -> None:
+        with self._cond:
+            self.counts[rec["status"]] = self.counts.get(rec["status"], 0) + 1
+            self.out.write(json.dumps(rec) + "\n")
+            self.out.flush()
+
+    def _settle(self, tx_hash: str, rcpt: Dict[str, Any]) -> None:
+        rec = self._pending.pop(tx_hash)
+        rec["status"] = "confirmed" if int(rcpt.get("status", "0x1"), 16) == 1 else "failed"
+        rec["block_number"] = int(rcpt["blockNumber"], 16)
+        rec["gas_used"] = int(rcpt["gasUsed"], 16)
+        try:
+            for log in rcpt.get("logs") or []:
+                ev = decode_log(log)
+                if ev is not None and ev["event"] == "Transfer" and "token_id" in ev:
+                    rec["token_id"] = ev["token_id"]
+        except Exception as e:
+            # The mint itself settled; only the token id is missing
+            rec["decode_error"] = str(e)
+        rec["wall_ms"] = round((time.monotonic() - rec.pop("_sent_at")) * 1000, 1)
+        self.write(rec)
+
+    def _run(self) -> None:
+        try:
+            self._poll()
+        except BaseException as e:
+            with self._cond:
+                self.error = e
+                self._cond.notify_all()
+
+    def _poll(self) -> None:
+        while True:
+            with self._cond:
+                hashes = list(self._pending)
+                if not hashes and self._closed:
+                    return
+            for i in range(0, len(hashes), RECEIPT_BATCH):
+                chunk = hashes[i:i + RECEIPT_BATCH]
+                try:
+                    resps = self.rpc.batch([("eth_getTransactionReceipt", [h]) for h in chunk])
+                except Exception:
+                    continue  # a transient RPC error; poll again next round
+                with self._cond:
+                    for h, resp in zip(chunk, resps):
+                        if resp.get("result") is not None and h in self._pending:
+                            self._settle(h, resp["result"])
+                    self._cond.notify_all()
+            time.sleep(self.interval)
+
+    def close(self, timeout: float) -> None:
+        """Wait up to `timeout` seconds for outstanding receipts; the rest are written as pending.
+
+        Raises SystemExit afterwards if the polling thread failed.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.wait_for(lambda: not self._pending or self.error is not None, timeout=timeout)
+            left = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+        for rec in left:
+            rec.pop("_sent_at", None)
+            rec["status"] = "pending"
+            self.write(rec)
+        self._thread.join()
+        if self.error is not None:
+            raise SystemExit(f"receipt tracker failed: {self.error}")
+
+
+def send_part(rpc: RPC, tracker: MintTracker, part: List[Tuple[int, int, Dict[str, str]]],
+              txs: List[Tuple[str, str]]) -> Optional[str]:
+    """Send one batch of signed mints; returns why submission must stop, or None.
+
+    Rows after a rejected nonce are written as skipped and not tracked: they
+    cannot be mined past the gap. If the batch request itself fails, the node
+    may still have accepted some of it, so every row is tracked (its receipt
+    decides) and submission stops.
+    """
+    sent_at = time.monotonic()
+    try:
+        resps = rpc.batch([("eth_sendRawTransaction", [raw]) for _, raw in txs])
+    except Exception as e:
+        for (nonce, idx, row), (tx_hash, _) in zip(part, txs):
+            tracker.add(tx_hash, {"index": idx, **row, "nonce": nonce, "tx_hash": tx_hash,
+                                  "send_error": str(e), "_sent_at": sent_at})
+        return f"send batch at nonce {part[0][0]} had an unknown outcome: {e}"
+    aborted = None
+    for (nonce, idx, row), (tx_hash, _), resp in zip(part, txs, resps):
+        rec = {"index": idx, **row, "nonce": nonce, "tx_hash": tx_hash}
+        if aborted is not None:
+            # Accepted or not, it sits behind the gap; tx_hash is kept so it can be checked
+            tracker.write({**rec, "status": "skipped", "error": aborted, "accepted": not resp.get("error")})
+        elif resp.get("error"):
+            aborted = f"nonce {nonce} was rejected"
+            tracker.write({**rec, "status": "failed", "error": str(resp["error"])})
+        else:
+            tracker.add(tx_hash, {**rec, "_sent_at": sent_at})
+    return aborted
+
+
+def mint_batch(
+    w3: Web3,
+    rpc: RPC,
+    pk: str,
+    nft: str,
+    rows: List[Tuple[int, Dict[str, str]]],
+    out: IO[str],
+    window: int = DEFAULT_WINDOW,
+    sign_workers: Optional[int] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Dict[str, int]:
+    """Mint one token per (index, row): nonces are reserved up front, signing runs in a
+    process pool, and signed txs are sent in JSON-RPC batches while at most `window`
+    mints wait for receipts."""
+    acct = Account.from_key(pk)
+    base = {"to": Web3.to_checksum_address(nft), "gas": MINT_GAS, "value": 0, "chainId": chain_id(w3), **fee_params(w3)}
+    # The whole nonce range is ours: one pending count, then consecutive nonces
+    first = int(rpc.call("eth_getTransactionCount", [acct.address, "pending"]), 16)
+    planned = [(first + k, idx, row) for k, (idx, row) in enumerate(rows)]
+    chunks = [planned[i:i + SIGN_CHUNK] for i in range(0, len(planned), SIGN_CHUNK)]
+    aborted = None
+    with ProcessPoolExecutor(max_workers=sign_workers, initializer=_init_signer, initargs=(pk,)) as pool:
+        # Every chunk is queued at once so signing runs ahead of submission
+        signed_chunks = pool.map(sign_mints, [base] * len(chunks),
+                                 [[(n, r["recipient"], r["token_uri"]) for n, _, r in c] for c in chunks])
+        tracker = MintTracker(rpc, out)
+        try:
+            for chunk, signed in zip(chunks, signed_chunks):
+                for j in range(0, len(chunk), SEND_BATCH):
+                    part, txs = chunk[j:j + SEND_BATCH], signed[j:j + SEND_BATCH]
+                    if aborted is None:
+                        try:
+                            tracker.wait_below(max(1, window - len(part) + 1), timeout)
+                        except SystemExit as e:
+                            aborted = str(e)
+                    if aborted is not None:
+                        for nonce, idx, row in part:
+                            tracker.write({"index": idx, **row, "nonce": nonce, "status": "skipped", "error": aborted})
+                        continue
+                    aborted = send_part(rpc, tracker, part, txs)
+        finally:
+            tracker.close(timeout)
+    return tracker.counts
+
+
+def mint_one(w3: Web3, pk: str, nft_addr: str, token_uri: str) -> None:
     acct = Account.from_key(pk)
     nft = w3.eth.contract(address=Web3.to_checksum_address(nft_addr), abi=ERC721_ABI)
     tx = nft.functions.safeMint(acct.address, token_uri).build_transaction({
         "from": acct.address,
         "nonce": w3.eth.get_transaction_count(acct.address),
-        "gas": 400_000,
-        "maxFeePerGas": w3.eth.gas_price,
-        "maxPriorityFeePerGas": w3.eth.gas_price,
-        "chainId": w3.eth.chain_id,
+        "gas": MINT_GAS,
+        "chainId": chain_id(w3),
+        **fee_params(w3),
     })
     signed = w3.eth.account.sign_transaction(tx, pk)
     txh = w3.eth.send_raw_transaction(signed.rawTransaction)
     rcpt = w3.eth.wait_for_transaction_receipt(txh)
 
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    run_id = record_run(json.loads(Web3.to_json(rcpt)), "artifact", lab=LAB, task="mint")
+    print(f"Minted NFT; receipt recorded as run {run_id}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Mint one NFT, or one per manifest row")
+    p.add_argument("--manifest", help="CSV (recipient,token_uri header) or JSONL of mints")
+    p.add_argument("--window", type=int, default=DEFAULT_WINDOW, help="max submitted mints waiting for a receipt")
+    p.add_argument("--sign-workers", type=int, default=None, help="signing processes (default: CPU count)")
+    p.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds to wait for the last receipts")
+    p.add_argument("--resume", help="results JSONL of an earlier batch; confirmed rows are skipped and results appended")
+    args = p.parse_args()
+
+    load_dotenv()
+    rpc = os.environ.get("EVM_RPC_URL")
+    pk = os.environ.get("PRIVATE_KEY")
+    nft_addr = os.environ.get("ERC721_ADDRESS")
+    token_uri = os.environ.get("TOKEN_URI")
+    if not args.manifest:
+        if not all([rpc, pk, nft_addr, token_uri]):
+            raise SystemExit("Set EVM_RPC_URL, PRIVATE_KEY, ERC721_ADDRESS, TOKEN_URI in .env")
+        mint_one(Web3(Web3.HTTPProvider(rpc)), pk, nft_addr, token_uri)
+        return
+    if not all([rpc, pk, nft_addr]):
+        raise SystemExit("Set EVM_RPC_URL, PRIVATE_KEY, ERC721_ADDRESS in .env")
+
+    done = load_done(Path(args.resume)) if args.resume else set()
+    rows = [(i, row) for i, row in enumerate(load_manifest(Path(args.manifest))) if i not in done]
     runs = Path("runs"); runs.mkdir(exist_ok=True)
-    (runs / f"{ts}-mint.json").write_text(Web3.to_json(rcpt))
-    print(f"Minted NFT; receipt saved to runs/{ts}-mint.json")
+    if args.resume:
+        out_path = Path(args.resume)
+    else:
+        out_path = runs / f"{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}-mint-batch.jsonl"
+    t0 = time.perf_counter()
+    with out_path.open("a") as out:
+        counts = mint_batch(Web3(Web3.HTTPProvider(rpc)), RPC(rpc), pk, nft_addr, rows, out,
+                            args.window, args.sign_workers, args.timeout)
+    wall = time.perf_counter() - t0
+    summary = ", ".join(f"{k} {v}" for k, v in counts.items() if v) or "nothing to mint"
+    record_run({"manifest": args.manifest, "results": str(out_path), "mints": len(rows), "counts": counts,
+                "success": counts.get("confirmed", 0) == len(rows), "latency_ms": round(wall * 1000, 1)},
+               "artifact", lab=LAB, task="mint-batch")
+    print(f"{len(rows)} mints in {wall:.1f}s ({len(rows) / wall if wall else 0:.0f}/s): {summary}; results in {out_path}")
+    if len(rows) and counts.get("confirmed", 0) < len(rows):
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
     main()
-
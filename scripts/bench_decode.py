@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compare agents/tools/decode.py against web3's ContractEvent.process_log on synthetic ERC-20 logs."""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents.tools.decode import APPROVAL_TOPIC, TRANSFER_TOPIC, decode_logs
+
+ERC20_EVENTS_ABI = [
+    {"anonymous": False, "name": name, "type": "event", "inputs": [
+        {"indexed": True, "name": a, "type": "address"},
+        {"indexed": True, "name": b, "type": "address"},
+        {"indexed": False, "name": "value", "type": "uint256"},
+    ]}
+    for name, a, b in (("Transfer", "from", "to"), ("Approval", "owner", "spender"))
+]
+
+
+def synthetic_logs(n: int, holders: int = 5_000, seed: int = 1):
+    rnd = random.Random(seed)
+    token = "0x" + "ab" * 20
+    addrs = ["0x" + "00" * 12 + "%040x" % rnd.getrandbits(160) for _ in range(holders)]
+    logs = []
+    for i in range(n):
+        topic = TRANSFER_TOPIC if i % 10 else APPROVAL_TOPIC
+        logs.append({
+            "address": token,
+            "blockNumber": hex(1_000 + i // 20),
+            "logIndex": hex(i % 20),
+            "transactionHash": "0x%064x" % i,
+            "blockHash": "0x%064x" % (i // 20),
+            "transactionIndex": hex(i % 20),
+            "removed": False,
+            "topics": [topic, rnd.choice(addrs), rnd.choice(addrs)],
+            "data": "0x%064x" % rnd.getrandbits(96),
+        })
+    return logs
+
+
+def rate(fn, logs) -> float:
+    t0 = time.perf_counter()
+    fn(logs)
+    return len(logs) / (time.perf_counter() - t0)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Benchmark event decoding (logs/sec)")
+    p.add_argument("-n", type=int, default=50_000, help="number of synthetic logs")
+    p.add_argument("--holders", type=int, default=5_000, help="distinct addresses in the logs")
+    args = p.parse_args()
+
+    from hexbytes import HexBytes
+    from web3 import Web3
+    from web3.datastructures import AttributeDict
+
+    raw = synthetic_logs(args.n, args.holders)
+    formatted = [
+        AttributeDict({
+            **log,
+            "address": Web3.to_checksum_address(log["address"]),
+            "blockNumber": int(log["blockNumber"], 16),
+            "logIndex": int(log["logIndex"], 16),
+            "transactionIndex": int(log["transactionIndex"], 16),
+            "transactionHash": HexBytes(log["transactionHash"]),
+            "blockHash": HexBytes(log["blockHash"]),
+            "topics": [HexBytes(t) for t in log["topics"]],
+            "data": HexBytes(log["data"]),
+        })
+        for log in raw
+    ]
+    contract = Web3().eth.contract(abi=ERC20_EVENTS_ABI)
+    by_topic = {HexBytes(TRANSFER_TOPIC): contract.events.Transfer(), HexBytes(APPROVAL_TOPIC): contract.events.Approval()}
+
+    def web3_decode(logs):
+        return [by_topic[log["topics"][0]].process_log(log) for log in logs]
+
+    ours = decode_logs(raw)
+    theirs = web3_decode(formatted)
+    mismatches = sum(
+        a["value"] != b["args"]["value"] or a.get("from", a.get("owner")) != b["args"].get("from", b["args"].get("owner"))
+        for a, b in zip(ours, theirs)
+    )
+    if len(ours) != len(theirs) or mismatches:
+        raise SystemExit(f"Decoders disagree on {mismatches} of {len(theirs)} logs")
+
+    results = [
+        ("web3 process_log", rate(web3_decode, formatted)),
+        ("decode_logs (raw JSON-RPC)", rate(decode_logs, raw)),
+        ("decode_logs (web3 log objects)", rate(decode_logs, formatted)),
+    ]
+    base = results[0][1]
+    for name, r in results:
+        print(f"{name:<32} {r:>12,.0f} logs/s  {r / base:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
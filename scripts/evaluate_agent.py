@@ -1,22 +1,187 @@
 #!/usr/bin/env python3
+"""
+Record agent runs for a lab.
+
+With --adapter, drives an AgentAdapter (agents/adapters/base.py) through
+plan -> act -> evaluate for N seeded trials on a worker pool and measures
+each trial itself: time to first step and end-to-end latency (monotonic
+clock), JSON-RPC calls sent through the shared sessions, and gas and fees
+from the receipts of any transactions the steps produced. Each trial is
+added to the run store (agents/run_store.py) as it finishes. Without
+--adapter, a single externally measured run is recorded from the flags.
+"""
 import argparse
+import importlib
 import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents.run_store import run_store
+from agents.tools.rpc import count_rpc
+
+ADAPTERS = {
+    "assistants": "agents.adapters.assistants_adapter:AssistantsAdapter",
+    "langgraph": "agents.adapters.langgraph_adapter:LangGraphAdapter",
+}
+TX_HASH_KEYS = ("transactionHash", "tx_hash")
+
+
+def load_adapter(spec: str) -> type:
+    """Adapter class from a short name in ADAPTERS or a "module:Class" path."""
+    path = ADAPTERS.get(spec, spec)
+    if ":" not in path:
+        raise SystemExit(f"Unknown adapter {spec!r}; use one of {sorted(ADAPTERS)} or module:Class")
+    mod, cls = path.split(":", 1)
+    return getattr(importlib.import_module(mod), cls)
+
+
+def tx_hashes(obj: Any, found: Optional[Set[str]] = None) -> Set[str]:
+    """Transaction hashes anywhere in step artifacts (receipts or {"tx_hash": ...})."""
+    found = set() if found is None else found
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            if k in TX_HASH_KEYS and isinstance(v, str) and len(v) == 66:
+                found.add(v.lower())
+            else:
+                tx_hashes(v, found)
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            tx_hashes(v, found)
+    return found
+
+
+def chain_usage(hashes: Iterable[str]) -> Dict[str, Any]:
+    """Gas used and fees paid by the given transactions, from their receipts."""
+    hashes = sorted(hashes)
+    if not hashes:
+        return {"txs": 0, "gas_used": 0, "fee_wei": 0}
+    from agents.tools.blocks import chain_cache
+    from agents.tools.evm import load_rpc
+
+    receipts = [r for r in chain_cache(load_rpc()).get_receipts(hashes) if r is not None]
+    gas = [int(r["gasUsed"], 16) for r in receipts]
+    fees = [g * int(r.get("effectiveGasPrice", "0x0"), 16) for g, r in zip(gas, receipts)]
+    return {"txs": len(hashes), "mined": len(receipts), "gas_used": sum(gas), "fee_wei": sum(fees)}
+
+
+def run_trial(adapter_cls: type, task: str, context: Dict[str, Any], seed: int) -> Dict[str, Any]:
+    """One plan -> act -> evaluate pass, timed from adapter construction to metrics."""
+    rec: Dict[str, Any] = {"seed": seed, "success": False, "error": None, "ttfs_ms": None}
+    t0 = time.monotonic()
+    artifacts: Dict[str, Any] = {"task": task, "seed": seed, "steps": []}
+    with count_rpc() as rpc:
+        try:
+            adapter = adapter_cls()
+            steps = adapter.plan(task, {**context, "seed": seed})
+            rec["plan_ms"] = round((time.monotonic() - t0) * 1000, 3)
+            for step in steps:
+                out = adapter.act(step)
+                artifacts["steps"].append(out)
+                if rec["ttfs_ms"] is None:
+                    rec["ttfs_ms"] = round((time.monotonic() - t0) * 1000, 3)
+                if isinstance(out, dict) and out.get("ok") is False:
+                    rec["error"] = f"step {len(artifacts['steps'])} failed: {out.get('error')}"
+                    break
+            metrics = adapter.evaluate(artifacts)
+            rec["metrics"] = metrics
+            rec["success"] = rec["error"] is None and bool(metrics.get("success"))
+            rec["cost"] = metrics.get("cost", 0)
+        except (Exception, SystemExit) as e:
+            rec["error"] = f"{type(e).__name__}: {e}"
+    rec["latency_ms"] = round((time.monotonic() - t0) * 1000, 3)
+    rec["steps"] = len(artifacts["steps"])
+    rec["rpc_requests"] = rpc.requests
+    rec["rpc_calls"] = rpc.calls
+    rec["rpc_methods"] = dict(rpc.methods)
+    try:
+        rec.update(chain_usage(tx_hashes(artifacts["steps"])))
+    except (Exception, SystemExit) as e:
+        rec["gas_error"] = str(e)
+    return rec
+
+
+def run_trials(
+    adapter_cls: type,
+    task: str,
+    context: Dict[str, Any],
+    record: Callable[[Dict[str, Any]], Any],
+    trials: int = 10,
+    workers: int = 1,
+    seed: int = 0,
+    base: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Run `trials` trials with seeds seed, seed+1, ... on `workers` threads, passing each record to `record`."""
+    lock = threading.Lock()
+    records = []
+
+    def one(i: int) -> None:
+        rec = {**(base or {}), "trial": i, **run_trial(adapter_cls, task, context, seed + i)}
+        rec["run_id"] = record(rec)
+        with lock:
+            records.append(rec)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        list(pool.map(one, range(trials)))
+    return sorted(records, key=lambda r: r["trial"])
+
+
+def pct(values: List[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    lat = [r["latency_ms"] for r in records]
+    ttfs = [r["ttfs_ms"] for r in records if r["ttfs_ms"] is not None]
+    return {
+        "trials": len(records),
+        "successes": sum(1 for r in records if r["success"]),
+        "latency_ms_p50": median(lat) if lat else 0,
+        "latency_ms_p95": pct(lat, 0.95),
+        "ttfs_ms_p50": median(ttfs) if ttfs else None,
+        "rpc_calls_mean": sum(r["rpc_calls"] for r in records) / len(records) if records else 0,
+        "gas_used_total": sum(r.get("gas_used", 0) for r in records),
+    }
+
 
 def main():
-    p = argparse.ArgumentParser(description="Minimal harness to record agent run metadata.")
+    p = argparse.ArgumentParser(description="Evaluate an agent adapter on a lab task, or record one run.")
     p.add_argument("--lab", required=True, help="lab folder name, e.g., day-001-wallets-and-rpc")
     p.add_argument("--framework", required=True, help="agent framework id")
     p.add_argument("--task", required=True, help="task id within the lab")
-    p.add_argument("--success", action="store_true", help="mark success")
+    p.add_argument("--adapter", help=f"adapter to drive: {', '.join(sorted(ADAPTERS))} or module:Class")
+    p.add_argument("--trials", type=int, default=10, help="number of seeded trials (with --adapter)")
+    p.add_argument("--workers", type=int, default=1, help="trials run concurrently (with --adapter)")
+    p.add_argument("--seed", type=int, default=0,
+                   help="seed of the first trial (trial i gets seed + i); only passed to plan() as context['seed']")
+    p.add_argument("--context", default="{}", help="JSON context passed to plan(), e.g. '{\"address\": \"0x...\"}'")
+    p.add_argument("--success", action="store_true", help="mark success (manual record)")
     p.add_argument("--cost", type=float, default=0.0)
     p.add_argument("--latency_ms", type=int, default=0)
     args = p.parse_args()
 
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    lab_dir = Path(__file__).resolve().parents[1] / "labs" / args.lab / "runs"
-    lab_dir.mkdir(parents=True, exist_ok=True)
+    store = run_store()
+    if args.adapter:
+        adapter_cls = load_adapter(args.adapter)
+        base = {"framework": args.framework, "lab": args.lab, "task": args.task, "timestamp": ts}
+        records = run_trials(adapter_cls, args.task, json.loads(args.context),
+                             lambda rec: store.add(rec, "eval", started_at=time.time() - rec["latency_ms"] / 1000),
+                             args.trials, args.workers, args.seed, base)
+        print(json.dumps({**base, **summarize(records), "records": str(store.path)}, indent=2))
+        if not all(r["success"] for r in records):
+            raise SystemExit(1)
+        return
+
     out = {
         "framework": args.framework,
         "task": args.task,
@@ -25,9 +190,8 @@ def main():
         "latency_ms": args.latency_ms,
         "timestamp": ts,
     }
-    (lab_dir / f"{ts}.json").write_text(json.dumps(out, indent=2))
+    out["run_id"] = store.add(out, "eval", lab=args.lab)
     print(json.dumps(out))
 
 if __name__ == "__main__":
     main()
-
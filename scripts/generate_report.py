@@ -1,46 +1,260 @@
 #!/usr/bin/env python3
+"""
+Summarize a lab's recorded runs into REPORT.md.
+
+Runs are streamed one at a time from the run store and folded into per-(framework, task)
+accumulators, so memory does not grow with the number of runs. Latency
+percentiles come from a log-bucketed histogram (relative error within
+SKETCH_ACCURACY, mergeable by adding bucket counts); success rates carry a
+95% Wilson interval. With --baseline, each group is compared against an
+earlier `--save-baseline` summary and regressions are flagged.
+"""
+import argparse
 import json
+import math
 import sys
 from pathlib import Path
-from statistics import mean
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents.run_store import RunStore, run_store
+
+RUN_KINDS = ("eval", "lab")
+SKETCH_ACCURACY = 0.01
+PERCENTILES = (0.5, 0.9, 0.99)
+Z95 = 1.96
+DEFAULT_TOLERANCE = 0.10
+MIN_VALUE = 1e-6
+
+
+class LogHistogram:
+    """Quantile sketch over non-negative values with bounded relative error.
+
+    Values fall into buckets whose bounds grow geometrically by gamma, so any
+    reported quantile is within `accuracy` of a true sample value; two
+    sketches merge by adding their bucket counts.
+    """
+
+    def __init__(self, accuracy: float = SKETCH_ACCURACY) -> None:
+        self.accuracy = accuracy
+        self._log_gamma = math.log((1 + accuracy) / (1 - accuracy))
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value < MIN_VALUE:
+            self.zeros += 1
+            return
+        i = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[i] = self.buckets.get(i, 0) + 1
+
+    def merge(self, other: "LogHistogram") -> None:
+        if other.accuracy != self.accuracy:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for i, n in other.buckets.items():
+            self.buckets[i] = self.buckets.get(i, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zeros:
+            return 0.0
+        seen = self.zeros
+        for i in sorted(self.buckets):
+            seen += self.buckets[i]
+            if seen > rank:
+                # Midpoint of (gamma^(i-1), gamma^i] in relative terms
+                value = 2 * math.exp(i * self._log_gamma) / (1 + math.exp(self._log_gamma))
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"accuracy": self.accuracy, "zeros": self.zeros, "count": self.count, "total": self.total,
+                "min": self.min if self.count else None, "max": self.max if self.count else None,
+                "buckets": {str(i): n for i, n in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "LogHistogram":
+        h = cls(data["accuracy"])
+        h.buckets = {int(i): n for i, n in data["buckets"].items()}
+        h.zeros, h.count, h.total = data["zeros"], data["count"], data["total"]
+        if h.count:
+            h.min, h.max = data["min"], data["max"]
+        return h
+
+
+def wilson(successes: int, n: int, z: float = Z95) -> Tuple[float, float]:
+    """Wilson score interval for a success proportion."""
+    if not n:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class GroupStats:
+    """Streaming accumulator for one (framework, task) group."""
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.successes = 0
+        self.latency = LogHistogram()
+        self.ttfs = LogHistogram()
+        self.cost = 0.0
+        self.rpc_calls = 0
+        self.gas_used = 0
+
+    def add(self, run: Dict[str, Any]) -> None:
+        self.runs += 1
+        self.successes += bool(run.get("success"))
+        self.latency.add(float(run.get("latency_ms") or 0))
+        if run.get("ttfs_ms") is not None:
+            self.ttfs.add(float(run["ttfs_ms"]))
+        self.cost += float(run.get("cost") or 0)
+        self.rpc_calls += int(run.get("rpc_calls") or 0)
+        self.gas_used += int(run.get("gas_used") or 0)
+
+    def summary(self) -> Dict[str, Any]:
+        lo, hi = wilson(self.successes, self.runs)
+        return {
+            "runs": self.runs,
+            "successes": self.successes,
+            "success_rate": self.successes / self.runs if self.runs else 0.0,
+            "success_ci95": [lo, hi],
+            "latency_ms": {f"p{int(q * 100)}": self.latency.quantile(q) for q in PERCENTILES},
+            "latency_ms_mean": self.latency.mean(),
+            "ttfs_ms": {f"p{int(q * 100)}": self.ttfs.quantile(q) for q in PERCENTILES} if self.ttfs.count else None,
+            "cost_mean": self.cost / self.runs if self.runs else 0.0,
+            "rpc_calls_mean": self.rpc_calls / self.runs if self.runs else 0.0,
+            "gas_used": self.gas_used,
+            "latency_sketch": self.latency.to_dict(),
+        }
+
+
+def iter_runs(store: RunStore, lab: str) -> Iterator[Dict[str, Any]]:
+    """Yield the lab's harness and lab-runner records one at a time."""
+    for kind in RUN_KINDS:
+        yield from store.query(lab=lab, kind=kind)
+
+
+def aggregate(records: Iterator[Dict[str, Any]]) -> Dict[Tuple[str, str], GroupStats]:
+    groups: Dict[Tuple[str, str], GroupStats] = {}
+    for run in records:
+        key = (str(run.get("framework")), str(run.get("task")))
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = GroupStats()
+        g.add(run)
+    return groups
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of one group against its baseline summary."""
+    out = []
+    lo, hi = current["success_ci95"]
+    if hi < baseline["success_rate"]:
+        out.append(f"success rate {current['success_rate']:.1%} (95% CI {lo:.1%}-{hi:.1%}) "
+                   f"below baseline {baseline['success_rate']:.1%}")
+    for p, value in current["latency_ms"].items():
+        base = (baseline.get("latency_ms") or {}).get(p)
+        if value is None or not base:
+            continue
+        if value > base * (1 + tolerance):
+            out.append(f"latency {p} {value:.1f} ms vs baseline {base:.1f} ms (+{value / base - 1:.0%})")
+    return out
+
+
+def fmt(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:,.1f}"
+
+
+def render(summaries: Dict[str, Dict[str, Any]], regressions: Dict[str, List[str]], baseline: Optional[str]) -> str:
+    total = sum(s["runs"] for s in summaries.values())
+    succ = sum(s["successes"] for s in summaries.values())
+    lines = [
+        "# Report",
+        f"Total runs: {total}",
+        f"Successes: {succ}",
+        "",
+        "## By framework and task",
+        "| framework | task | runs | success (95% CI) | p50 ms | p90 ms | p99 ms | ttfs p50 ms | avg cost | avg RPC calls | gas |",
+        "|---|---|---|---|---|---|---|---|---|---|---|",
+    ]
+    for key in sorted(summaries):
+        s = summaries[key]
+        framework, task = key.split("|", 1)
+        lo, hi = s["success_ci95"]
+        lat = s["latency_ms"]
+        ttfs = (s["ttfs_ms"] or {}).get("p50")
+        lines.append(
+            f"| {framework} | {task} | {s['runs']} | {s['success_rate']:.1%} ({lo:.1%}-{hi:.1%}) | "
+            f"{fmt(lat['p50'])} | {fmt(lat['p90'])} | {fmt(lat['p99'])} | {fmt(ttfs)} | "
+            f"{round(s['cost_mean'], 4)} | {s['rpc_calls_mean']:.1f} | {s['gas_used']} |"
+        )
+    if baseline:
+        lines += ["", f"## Regressions vs {baseline}"]
+        flagged = [(k, r) for k in sorted(regressions) for r in regressions[k]]
+        lines += [f"- {k.replace('|', ' / ')}: {r}" for k, r in flagged] or ["None."]
+    return "\n".join(lines) + "\n"
 
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: generate_report.py <lab-folder>")
-        sys.exit(1)
-    lab = Path(sys.argv[1])
-    runs = lab / "runs"
-    scores = []
-    if runs.exists():
-        for f in runs.glob("*.json"):
-            try:
-                data = json.loads(f.read_text())
-                scores.append(data)
-            except Exception:
-                pass
+    p = argparse.ArgumentParser(description="Write labs/<day>/REPORT.md from recorded runs")
+    p.add_argument("lab", help="lab folder, e.g. labs/day-001-wallets-and-rpc")
+    p.add_argument("--baseline", help="summary JSON from an earlier --save-baseline to compare against")
+    p.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                   help="allowed relative latency increase per percentile before flagging (default 0.10)")
+    p.add_argument("--save-baseline", help="write this run's per-group summary JSON here")
+    args = p.parse_args()
+
+    lab = Path(args.lab)
     report = lab / "REPORT.md"
-    if not scores:
+    groups = aggregate(iter_runs(run_store(), lab.name))
+    if not groups:
         report.write_text("# Report\n\nNo runs recorded yet.\n")
         print(f"Wrote {report}")
         return
-    succ = sum(1 for s in scores if s.get("success"))
-    lat = [s.get("latency_ms", 0) for s in scores]
-    cost = [s.get("cost", 0.0) for s in scores]
-    lines = [
-        "# Report",
-        f"Total runs: {len(scores)}",
-        f"Successes: {succ}",
-        f"Avg latency (ms): {int(mean(lat)) if lat else 0}",
-        f"Avg cost: {round(mean(cost), 4) if cost else 0}",
-        "\n## Runs",
-    ]
-    for s in scores:
-        lines.append(f"- {s.get('framework')} | {s.get('task')} | success={s.get('success')} | cost={s.get('cost')} | latency_ms={s.get('latency_ms')}")
-    report.write_text("\n".join(lines))
+    summaries = {f"{fw}|{task}": g.summary() for (fw, task), g in groups.items()}
+    regressions: Dict[str, List[str]] = {}
+    if args.baseline:
+        base = json.loads(Path(args.baseline).read_text())["groups"]
+        for key, s in summaries.items():
+            if key in base:
+                found = compare(s, base[key], args.tolerance)
+                if found:
+                    regressions[key] = found
+    report.write_text(render(summaries, regressions, args.baseline))
     print(f"Wrote {report}")
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps({"lab": lab.name, "groups": summaries}, indent=2))
+        print(f"Wrote {args.save_baseline}")
+    if regressions:
+        for key, found in regressions.items():
+            for r in found:
+                print(f"REGRESSION {key.replace('|', ' / ')}: {r}", file=sys.stderr)
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -1,10 +1,49 @@
 #!/usr/bin/env python3
+"""
+Run labs end-to-end and record each run.
+
+Several labs, or one lab against several RPC endpoints (--rpc, repeatable),
+run as independent jobs on a bounded pool (--workers). A job runs its lab's
+steps in order and stops at the first failing step. Each job gets its own
+folder under runs/lab-runs/<ts>/ as working directory, and step output is
+streamed line by line into output.log there. Every step is recorded with
+its real exit status, wall time (monotonic clock) and CPU time (the child's
+rusage). With --anvil, each job starts its own Anvil node on a free port
+and runs against it with Anvil's first dev account, so parallel jobs never
+share nonces or state. Since that chain starts empty, the contracts a lab
+needs (LAB_SETUP) are deployed first with `forge create`, and their
+addresses are passed to the lab's steps in the env vars the scripts read.
+Jobs are independent of each other; ordering only applies within a job.
+"""
 import argparse
 import json
+import os
+import re
+import shlex
+import socket
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+import requests
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
+from agents.run_store import record_run
+
+ROOT = Path(__file__).resolve().parents[1]
+LOG_ROOT = ROOT / "runs" / "lab-runs"
+# Anvil's first account for its default mnemonic; a well-known dev key with no value elsewhere
+ANVIL_PRIVATE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+ANVIL_START_TIMEOUT = 30.0
+DEPLOYED = re.compile(r"Deployed to: (0x[0-9a-fA-F]{40})")
 
 LAB_STEPS = {
     "day-001-wallets-and-rpc": [
@@ -21,38 +60,209 @@ LAB_STEPS = {
     ],
 }
 
+# Contracts to deploy on a fresh --anvil chain before a lab's steps: env var -> forge contract id
+LAB_SETUP = {
+    "day-003-contract-deploy-local": {"COUNTER_ADDRESS": "src/Counter.sol:Counter"},
+    "day-004-nft-minting": {"ERC721_ADDRESS": "src/ERC721Simple.sol:ERC721Simple"},
+}
+
+_PRINT_LOCK = threading.Lock()
+
+
+def say(msg: str) -> None:
+    with _PRINT_LOCK:
+        print(msg, flush=True)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
 
-def run_cmd(cmd, cwd=None):
-    print("$ ", " ".join(cmd))
-    res = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
-    print(res.stdout)
-    if res.returncode != 0:
-        print(res.stderr)
-        raise SystemExit(res.returncode)
+@contextmanager
+def anvil(log: TextIO, binary: str = "anvil", extra: Optional[List[str]] = None) -> Iterator[str]:
+    """Start a private Anvil node on a free port, yield its URL, stop it afterwards."""
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    proc = subprocess.Popen([binary, "--port", str(port), *(extra or [])], stdout=log, stderr=subprocess.STDOUT)
+    try:
+        deadline = time.monotonic() + ANVIL_START_TIMEOUT
+        while True:
+            if proc.poll() is not None:
+                raise SystemExit(f"anvil exited with {proc.returncode} before serving {url}")
+            try:
+                requests.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []}, timeout=1)
+                break
+            except requests.RequestException:
+                if time.monotonic() > deadline:
+                    raise SystemExit(f"anvil did not answer on {url} within {ANVIL_START_TIMEOUT:.0f}s")
+                time.sleep(0.1)
+        yield url
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+def run_cmd(cmd: List[str], log: TextIO, cwd: Optional[Path] = None, env: Optional[Dict[str, str]] = None,
+            echo: Optional[str] = None, keep: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run one step, streaming its output into `log` (and to stdout, prefixed, when `echo` is set;
+    lines are also appended to `keep` when given).
+
+    Returns {cmd, exit_code, wall_ms, cpu_ms}; CPU time is the child's user + system time.
+    """
+    log.write(f"$ {shlex.join(cmd)}\n")
+    log.flush()
+    t0 = time.monotonic()
+    # Undecodable output is replaced rather than aborting the step
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, errors="replace", bufsize=1)
+    try:
+        for line in proc.stdout:
+            log.write(line)
+            log.flush()
+            if keep is not None:
+                keep.append(line)
+            if echo is not None:
+                say(f"{echo}{line.rstrip()}")
+    except BaseException:
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        # wait4 reaps the child (also when streaming failed) and returns its resource usage in one call
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    wall_ms = round((time.monotonic() - t0) * 1000, 1)
+    cpu_ms = round((usage.ru_utime + usage.ru_stime) * 1000, 1)
+    log.write(f"# exit {proc.returncode} wall {wall_ms} ms cpu {cpu_ms} ms\n")
+    log.flush()
+    return {"cmd": cmd, "exit_code": proc.returncode, "wall_ms": wall_ms, "cpu_ms": cpu_ms}
+
+
+def deploy(lab: str, url: str, log: TextIO, env: Dict[str, str], forge_bin: str, meta: Dict[str, Any],
+           steps: List[Dict[str, Any]], echo: Optional[str]) -> bool:
+    """Deploy LAB_SETUP contracts to a fresh node and export their addresses into `env`."""
+    for var, contract in LAB_SETUP.get(lab, {}).items():
+        lines: List[str] = []
+        cmd = [forge_bin, "create", contract, "--rpc-url", url, "--private-key", ANVIL_PRIVATE_KEY, "--broadcast"]
+        rec = run_cmd(cmd, log, cwd=ROOT / "labs" / lab, env=env, echo=echo, keep=lines)
+        rec["setup"] = var
+        steps.append(rec)
+        found = DEPLOYED.search("".join(lines))
+        if rec["exit_code"] != 0 or not found:
+            meta["error"] = f"deploying {contract} for {var} failed"
+            return False
+        env[var] = found.group(1)
+        meta.setdefault("deployed", {})[var] = found.group(1)
+    return True
+
+
+def run_job(lab: str, name: str, workdir: Path, framework: str, rpc: Optional[str] = None,
+            use_anvil: bool = False, anvil_bin: str = "anvil", anvil_args: Optional[List[str]] = None,
+            echo: bool = False, forge_bin: str = "forge") -> Dict[str, Any]:
+    """Run one lab's steps in order in its own working directory and record the run."""
+    workdir.mkdir(parents=True, exist_ok=True)
+    log_path = workdir / "output.log"
+    meta: Dict[str, Any] = {"framework": framework, "task": "full", "cost": 0, "job": name,
+                            "rpc": rpc, "anvil": use_anvil, "log": str(log_path),
+                            "timestamp": datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")}
+    steps: List[Dict[str, Any]] = []
+    code, completed = 0, False
+    prefix = f"[{name}] " if echo else None
+    started_at, t0 = time.time(), time.monotonic()
+    with log_path.open("w") as log:
+        try:
+            with anvil(log, anvil_bin, anvil_args) if use_anvil else nullcontext(rpc) as url:
+                env = dict(os.environ)
+                if url:
+                    env["EVM_RPC_URL"] = url
+                if use_anvil:
+                    env["PRIVATE_KEY"] = ANVIL_PRIVATE_KEY
+                    env.setdefault("TOKEN_URI", "ipfs://lab-runner")
+                    meta["rpc"] = url
+                    if not deploy(lab, url, log, env, forge_bin, meta, steps, prefix):
+                        code = steps[-1]["exit_code"] or 1
+                for step in LAB_STEPS[lab] if code == 0 else []:
+                    # Scripts are repo-relative; the job folder is the cwd so their runs/ output stays per job
+                    cmd = [str(ROOT / part) if (ROOT / part).is_file() else part for part in step]
+                    rec = run_cmd(cmd, log, cwd=workdir, env=env, echo=prefix)
+                    steps.append(rec)
+                    code = rec["exit_code"]
+                    if code != 0:
+                        break
+                else:
+                    completed = code == 0
+        except (SystemExit, OSError, ValueError) as e:
+            # e.g. a missing anvil/python binary: this job fails, the others carry on
+            log.write(f"# {type(e).__name__}: {e}\n")
+            meta["error"] = f"{type(e).__name__}: {e}"
+            code = code or 1
+    meta.update({
+        "success": completed,
+        "exit_code": code,
+        "latency_ms": round((time.monotonic() - t0) * 1000, 1),
+        "cpu_ms": round(sum(s["cpu_ms"] for s in steps), 1),
+        "step_ms": [s["wall_ms"] for s in steps],
+        "steps": steps,
+    })
+    meta["run_id"] = record_run(meta, "lab", lab=lab, started_at=started_at)
+    return meta
 
 
 def main():
-    p = argparse.ArgumentParser(description="Run a lab end-to-end")
-    p.add_argument("lab", help="lab folder name, e.g., day-001-wallets-and-rpc")
+    p = argparse.ArgumentParser(description="Run labs end-to-end")
+    p.add_argument("labs", nargs="+", help="lab folder name(s), e.g., day-001-wallets-and-rpc")
     p.add_argument("--framework", default="manual")
+    p.add_argument("--rpc", action="append", default=[],
+                   help="run every lab against this endpoint (repeatable; default: EVM_RPC_URL from the env)")
+    p.add_argument("--workers", type=int, default=4, help="jobs running at once")
+    p.add_argument("--anvil", action="store_true", help="start an isolated Anvil node per job")
+    p.add_argument("--anvil-bin", default="anvil")
+    p.add_argument("--anvil-args", default="", help='extra Anvil flags, e.g. "--fork-url https://..."')
+    p.add_argument("--forge-bin", default="forge", help="forge used to deploy LAB_SETUP contracts with --anvil")
     args = p.parse_args()
 
-    steps = LAB_STEPS.get(args.lab)
-    if not steps:
-        raise SystemExit(f"Unknown lab: {args.lab}")
-    for step in steps:
-        run_cmd(step)
+    unknown = [lab for lab in args.labs if lab not in LAB_STEPS]
+    if unknown:
+        raise SystemExit(f"Unknown lab: {', '.join(unknown)}")
+    if args.anvil and args.rpc:
+        raise SystemExit("--anvil and --rpc are exclusive")
+    endpoints: List[Optional[str]] = args.rpc or [None]
+    jobs, names = [], set()
+    for n, lab in enumerate(args.labs):
+        for i, rpc in enumerate(endpoints):
+            name = lab if len(endpoints) == 1 else f"{lab}-rpc{i}"
+            name = name if name not in names else f"{name}-{n}"  # the same lab listed twice
+            names.add(name)
+            jobs.append((lab, name, rpc))
+
+    base = LOG_ROOT / datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    echo = len(jobs) == 1
+    say(f"{len(jobs)} job(s), {min(len(jobs), max(1, args.workers))} at a time; logs under {base}")
 
-    # Record a minimal run metadata
-    from scripts.evaluate_agent import datetime as _dt  # type: ignore
-    ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-    runs = Path("labs") / args.lab / "runs"
-    runs.mkdir(parents=True, exist_ok=True)
-    meta = {"framework": args.framework, "task": "full", "success": True, "cost": 0, "latency_ms": 0, "timestamp": ts}
-    (runs / f"{ts}.json").write_text(json.dumps(meta, indent=2))
-    print(json.dumps(meta))
+    def one(job):
+        lab, name, rpc = job
+        meta = run_job(lab, name, base / name, args.framework, rpc, args.anvil, args.anvil_bin,
+                       shlex.split(args.anvil_args), echo, args.forge_bin)
+        status = "ok" if meta["success"] else f"failed (exit {meta['exit_code']})"
+        say(f"{name:<36} {status:<18} wall {meta['latency_ms']:>10.1f} ms  cpu {meta['cpu_ms']:>9.1f} ms  "
+            f"run {meta['run_id']}")
+        return meta
+
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = list(pool.map(one, jobs))
+    if echo:
+        print(json.dumps(results[0]))
+    failed = [m for m in results if not m["success"]]
+    if failed:
+        code = failed[0]["exit_code"]
+        raise SystemExit(code if code > 0 else 1)
 
 
 if __name__ == "__main__":
     main()
-
@@ -1,66 +1,431 @@
 #!/usr/bin/env python3
 import argparse
+import csv
 import json
 import os
 import re
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Tuple
 
 import yaml
 
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
 from agents.registry import run as run_tool
+from agents.registry import warm
+from agents.run_store import RunStore, make_row, run_store
 
 
 VAR = re.compile(r"\$\{([A-Z0-9_]+)\}")
+REF = re.compile(r"\$\{steps\.([A-Za-z0-9_-]+)\.output((?:\.[A-Za-z0-9_-]+)*)\}")
+TX_HASH = re.compile(r"0x[0-9a-fA-F]{64}")
 
 
-def resolve_env(obj):
+def resolve_env(obj, env: Mapping[str, str] = os.environ):
     if isinstance(obj, str):
         def repl(m):
             key = m.group(1)
-            val = os.environ.get(key)
+            val = env.get(key)
             if val is None:
                 raise SystemExit(f"Missing env var: {key}")
             return val
         return VAR.sub(lambda m: repl(m), obj)
     if isinstance(obj, list):
-        return [resolve_env(x) for x in obj]
+        return [resolve_env(x, env) for x in obj]
+    if isinstance(obj, dict):
+        return {k: resolve_env(v, env) for k, v in obj.items()}
+    return obj
+
+
+def find_refs(obj) -> List[str]:
+    if isinstance(obj, str):
+        return [m.group(1) for m in REF.finditer(obj)]
+    if isinstance(obj, list):
+        return [r for x in obj for r in find_refs(x)]
+    if isinstance(obj, dict):
+        return [r for v in obj.values() for r in find_refs(v)]
+    return []
+
+
+def lookup(output: Any, path: str) -> Any:
+    for part in filter(None, path.split(".")):
+        output = output[int(part)] if isinstance(output, list) else output[part]
+    return output
+
+
+def resolve_refs(obj, outputs: Mapping[str, Any]):
+    """Substitute ${steps.<id>.output.<path>}; a string that is only a reference keeps the value's type."""
+    if isinstance(obj, str):
+        m = REF.fullmatch(obj)
+        if m:
+            return lookup(outputs[m.group(1)], m.group(2))
+        return REF.sub(lambda m: str(lookup(outputs[m.group(1)], m.group(2))), obj)
+    if isinstance(obj, list):
+        return [resolve_refs(x, outputs) for x in obj]
     if isinstance(obj, dict):
-        return {k: resolve_env(v) for k, v in obj.items()}
+        return {k: resolve_refs(v, outputs) for k, v in obj.items()}
     return obj
 
 
+def plan(steps: List[Dict[str, Any]]) -> List[Tuple[str, Dict[str, Any], List[str]]]:
+    """Return (id, step, deps) per step.
+
+    Steps with `needs:` (or step references in their args) depend on exactly
+    those steps; steps without `needs:` keep the old sequential semantics and
+    depend on the step before them.
+    """
+    ids = [str(s.get("id") or f"step{i + 1}") for i, s in enumerate(steps)]
+    if len(set(ids)) != len(ids):
+        raise SystemExit("Duplicate step ids in playbook")
+    out = []
+    for i, (sid, step) in enumerate(zip(ids, steps)):
+        if "needs" in step:
+            needs = step["needs"] or []
+            deps = [needs] if isinstance(needs, str) else list(needs)
+        else:
+            deps = [ids[i - 1]] if i else []
+        deps += [r for r in find_refs(step.get("args", {})) if r not in deps]
+        for d in deps:
+            if d not in ids:
+                raise SystemExit(f"Step {sid} needs unknown step {d}")
+        out.append((sid, step, deps))
+    if len(topological({sid: deps for sid, _, deps in out})) != len(ids):
+        raise SystemExit("Playbook steps have a dependency cycle")
+    return out
+
+
+def topological(deps: Mapping[str, List[str]]) -> List[str]:
+    """Step ids ordered so each comes after its dependencies (Kahn); ids on a cycle are left out."""
+    indeg = {sid: len(d) for sid, d in deps.items()}
+    users: Dict[str, List[str]] = {sid: [] for sid in deps}
+    for sid, d in deps.items():
+        for dep in d:
+            users[dep].append(sid)
+    ready = [sid for sid, n in indeg.items() if n == 0]
+    order = []
+    while ready:
+        sid = ready.pop()
+        order.append(sid)
+        for u in users[sid]:
+            indeg[u] -= 1
+            if indeg[u] == 0:
+                ready.append(u)
+    return order
+
+
+def coerce(args_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # Coerce number strings to ints for known fields
+    for k, v in list(args_dict.items()):
+        if isinstance(v, str) and v.isdigit():
+            args_dict[k] = int(v)
+    return args_dict
+
+
+class CheckpointWriter:
+    """Append-only JSONL log of step records; each line is flushed and fsync'ed as it is written."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._f = path.open("a")
+        if self._f.tell() and not path.read_bytes().endswith(b"\n"):
+            self._f.write("\n")  # a crash cut the last line short; start on a fresh one
+
+    def write(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, default=str)
+        with self._lock:
+            self._f.write(line + "\n")
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def load_checkpoint(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Latest record per step id from a checkpoint; a torn trailing line is ignored."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    with path.open() as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(rec, dict) and "id" in rec:
+                latest[rec["id"]] = rec
+    return latest
+
+
+def execute(
+    steps: List[Dict[str, Any]],
+    call: Callable[[str, Dict[str, Any]], Any],
+    env: Mapping[str, str] = os.environ,
+    concurrency: int = 4,
+    log: Callable[[str], None] = print,
+    done: Mapping[str, Dict[str, Any]] = {},
+    on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """Run the step DAG with bounded concurrency; returns one record per step, in playbook order.
+
+    A failed step is recorded with its error and its dependents are skipped;
+    independent branches still run. Steps with an "ok" record in `done` are
+    not re-run. With `on_record`, every record is handed to it as it happens
+    (a "running" marker before each call, then the result) and the returned
+    records omit outputs; only outputs that later steps reference are kept.
+    """
+    nodes = plan(steps)
+    deps = {sid: d for sid, _, d in nodes}
+    records: Dict[str, Dict[str, Any]] = {}
+    outputs: Dict[str, Any] = {}
+    pending = {sid: step for sid, step, _ in nodes}
+    referenced = {r for _, step, _ in nodes for r in find_refs(step.get("args", {}))}
+    lock = threading.Lock()
+
+    for sid in list(pending):
+        rec = done.get(sid)
+        if rec and rec.get("status") == "ok":
+            pending.pop(sid)
+            records[sid] = {**{k: v for k, v in rec.items() if k != "output"}, "needs": deps[sid], "resumed": True}
+            outputs[sid] = rec.get("output")
+
+    def say(msg: str) -> None:
+        with lock:
+            log(msg)
+
+    def run_step(sid: str, step: Dict[str, Any]) -> Dict[str, Any]:
+        tool = step["tool"]
+        rec: Dict[str, Any] = {"id": sid, "tool": tool, "needs": deps[sid]}
+        t0 = time.perf_counter()
+        try:
+            args_dict = coerce(resolve_refs(resolve_env(step.get("args", {}), env), outputs))
+            rec["args"] = args_dict
+            say(f"Running {sid} ({tool}) with {args_dict}")
+            if on_record:
+                on_record({**rec, "status": "running"})
+            rec["output"] = call(tool, args_dict)
+            rec["status"] = "ok"
+        except (Exception, SystemExit) as e:
+            rec["status"] = "failed"
+            rec["error"] = str(e)
+            # A failure after broadcast (e.g. a receipt timeout) names the tx; keep it so resume won't re-send
+            sent = TX_HASH.findall(rec["error"])
+            if sent:
+                rec["tx_hash"] = sent[0]
+        rec["wall_ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        return rec
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        running = {}
+        while pending or running:
+            for sid in list(pending):
+                if any(records.get(d, {}).get("status") in ("failed", "skipped") for d in deps[sid]):
+                    records[sid] = {"id": sid, "tool": pending.pop(sid)["tool"], "needs": deps[sid],
+                                    "status": "skipped", "wall_ms": 0.0}
+                    if on_record:
+                        on_record(records[sid])
+                elif all(d in outputs for d in deps[sid]):
+                    running[pool.submit(run_step, sid, pending.pop(sid))] = sid
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                rec = fut.result()
+                running.pop(fut)
+                if on_record:
+                    on_record(rec)
+                    records[rec["id"]] = {k: v for k, v in rec.items() if k != "output"}
+                else:
+                    records[rec["id"]] = rec
+                if rec["status"] == "ok":
+                    outputs[rec["id"]] = rec["output"] if rec["id"] in referenced or not on_record else None
+                else:
+                    say(f"Step {rec['id']} failed: {rec['error']}")
+    return [records[sid] for sid, _, _ in nodes]
+
+
+def critical_path(records: List[Dict[str, Any]]) -> Tuple[List[str], float]:
+    """Longest chain of dependent steps by wall time."""
+    best: Dict[str, Tuple[float, List[str]]] = {}
+    by_id = {rec["id"]: rec for rec in records}
+    # `needs` may point at a later step, so walk dependencies first rather than playbook order
+    for sid in topological({sid: rec["needs"] for sid, rec in by_id.items()}):
+        rec = by_id[sid]
+        prev = max((best[d] for d in rec["needs"]), key=lambda b: b[0], default=(0.0, []))
+        best[rec["id"]] = (prev[0] + rec["wall_ms"], prev[1] + [rec["id"]])
+    total, path = max(best.values(), key=lambda b: b[0], default=(0.0, []))
+    return path, total
+
+
+def load_matrix(path: Path) -> Iterator[Dict[str, str]]:
+    """Yield variable bindings from a CSV (header row) or JSONL file."""
+    with path.open(newline="") as f:
+        if path.suffix.lower() == ".csv":
+            for row in csv.DictReader(f):
+                yield {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        else:
+            for line in f:
+                if line.strip():
+                    yield {k: str(v) for k, v in json.loads(line).items()}
+
+
+def run_matrix(
+    steps: List[Dict[str, Any]],
+    call: Callable[[str, Dict[str, Any]], Any],
+    bindings: Iterator[Dict[str, str]],
+    record: Callable[[Dict[str, Any]], Any],
+    workers: int = 8,
+    concurrency: int = 4,
+) -> Dict[str, int]:
+    """Run the playbook once per binding on a worker pool, passing one record per run to `record`.
+
+    Records are passed as runs finish (use `index` to restore input order);
+    at most 2 * workers bindings are in flight at a time.
+    """
+    plan(steps)  # fail fast on a bad playbook
+    lock = threading.Lock()
+    counts = {"ok": 0, "failed": 0}
+
+    def one(index: int, binding: Dict[str, str]) -> None:
+        t0 = time.perf_counter()
+        records = execute(steps, call, {**os.environ, **binding}, concurrency, log=lambda _: None)
+        ok = all(rec["status"] == "ok" for rec in records)
+        wall_ms = round((time.perf_counter() - t0) * 1000, 3)
+        record({
+            "index": index,
+            "bindings": binding,
+            "status": "ok" if ok else "failed",
+            "success": ok,
+            "wall_ms": wall_ms,
+            "latency_ms": wall_ms,
+            "steps": records,
+        })
+        with lock:
+            counts["ok" if ok else "failed"] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        inflight = set()
+        for index, binding in enumerate(bindings):
+            if len(inflight) >= 2 * max(1, workers):
+                done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    fut.result()
+            inflight.add(pool.submit(one, index, binding))
+        for fut in inflight:
+            fut.result()
+    return counts
+
+
+def save_run(store: RunStore, rec: Dict[str, Any], lab: Any, task: str) -> str:
+    """Add a playbook run plus one artifact per executed step (its input, tagged with the step's tool)."""
+    run = make_row(rec, "playbook", lab=lab, task=task)
+    steps = [make_row(s["args"], "artifact", lab=lab, task=task, tool=s["tool"], started_at=run[6])
+             for s in rec["steps"] if "args" in s]
+    store.add_many([run] + steps)
+    return run[0]
+
+
 def main():
     p = argparse.ArgumentParser(description="Run a YAML playbook of tools")
     p.add_argument("playbook", help="Path to YAML playbook file")
     p.add_argument("--lab", default=None)
+    p.add_argument("--socket", default=None, help="dispatch tools to a running `agents/registry.py --socket` daemon")
+    p.add_argument("--concurrency", type=int, default=4, help="max steps running at once")
+    p.add_argument("--matrix", default=None, help="CSV or JSONL file of env bindings; runs the playbook once per row")
+    p.add_argument("--workers", type=int, default=8, help="playbook runs in flight with --matrix")
+    p.add_argument("--resume", default=None, help="checkpoint (playbook-<ts>.jsonl) to continue; completed steps are skipped")
+    p.add_argument("--rerun-running", action="store_true", help="with --resume, re-run steps that were in flight when the run died")
+    p.add_argument("--rerun-broadcast", action="store_true",
+                   help="with --resume, re-run failed steps that had already broadcast a transaction")
     args = p.parse_args()
+    if args.socket:
+        from agents.registry import RegistryClient
+        call = RegistryClient(args.socket).run
+    else:
+        warm()
+        call = run_tool
 
     pb = yaml.safe_load(Path(args.playbook).read_text())
-    steps = pb.get("steps", [])
-    outputs = []
-    for step in steps:
-        tool = step["tool"]
-        args_dict = resolve_env(step.get("args", {}))
-        # Coerce number strings to ints for known fields
-        for k, v in list(args_dict.items()):
-            if isinstance(v, str) and v.isdigit():
-                args_dict[k] = int(v)
-        print(f"Running {tool} with {args_dict}")
-        out = run_tool(tool, args_dict)
-        outputs.append({"tool": tool, "args": args_dict, "output": out})
-
-    # Save artifacts
     ts = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
     if args.lab:
         runs = Path("labs") / args.lab / "runs"
     else:
         runs = Path("runs")
     runs.mkdir(parents=True, exist_ok=True)
-    (runs / f"playbook-{ts}.json").write_text(json.dumps(outputs, indent=2))
-    print(f"Saved outputs to {runs}/playbook-{ts}.json")
+    t0 = time.perf_counter()
+    store = run_store()
+    task = Path(args.playbook).stem
+
+    if args.matrix:
+        matrix = f"matrix-{ts}"
+        counts = run_matrix(
+            pb.get("steps", []), call, load_matrix(Path(args.matrix)),
+            lambda rec: save_run(store, {**rec, "matrix": matrix}, args.lab, task),
+            workers=args.workers, concurrency=args.concurrency,
+        )
+        wall_s = time.perf_counter() - t0
+        total = counts["ok"] + counts["failed"]
+        print(f"{total} runs ({counts['ok']} ok, {counts['failed']} failed) in {wall_s:.1f}s "
+              f"({total / wall_s if wall_s else 0:.1f} runs/s)")
+        print(f"Saved outputs to {store.path} (matrix {matrix}; "
+              f"python agents/run_store.py query --kind playbook --task {task})")
+        if counts["failed"]:
+            raise SystemExit(1)
+        return
+
+    done: Dict[str, Dict[str, Any]] = {}
+    if args.resume:
+        path = Path(args.resume)
+        done = load_checkpoint(path)
+        interrupted = sorted(sid for sid, rec in done.items() if rec.get("status") == "running")
+        if interrupted and not args.rerun_running:
+            raise SystemExit(
+                f"Steps {', '.join(interrupted)} were in flight when the run stopped and may already have "
+                "taken effect (e.g. a broadcast transfer); check them, then pass --rerun-running to retry"
+            )
+        sent = sorted(f"{sid} ({rec['tx_hash']})" for sid, rec in done.items()
+                      if rec.get("status") == "failed" and rec.get("tx_hash"))
+        if sent and not args.rerun_broadcast:
+            raise SystemExit(
+                f"Steps {', '.join(sent)} failed after broadcasting a transaction that may still be mined; "
+                "check them, then pass --rerun-broadcast to retry"
+            )
+        print(f"Resuming {path}: {sum(rec.get('status') == 'ok' for rec in done.values())} step(s) already done")
+    else:
+        path = runs / f"playbook-{ts}.jsonl"
+    writer = CheckpointWriter(path)
+    print(f"Checkpointing to {path}")
+    try:
+        outputs = execute(
+            pb.get("steps", []), call, concurrency=args.concurrency, done=done, on_record=writer.write
+        )
+    finally:
+        writer.close()
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    for rec in outputs:
+        print(f"  {rec['id']:<16} {rec['status']:<8} {rec['wall_ms']:>10.1f} ms")
+    chain, cp_ms = critical_path(outputs)
+    print(f"Wall time: {wall_ms:.1f} ms; critical path: {' -> '.join(chain)} ({cp_ms:.1f} ms)")
+
+    ok = all(rec["status"] == "ok" for rec in outputs)
+    run_id = save_run(store, {
+        "status": "ok" if ok else "failed",
+        "success": ok,
+        "latency_ms": round(wall_ms, 3),
+        "critical_path": chain,
+        "checkpoint": str(path),
+        "steps": outputs,
+    }, args.lab, task)
+    print(f"Saved outputs to {path}; run {run_id} recorded in {store.path}")
+    if not ok:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
     main()
-
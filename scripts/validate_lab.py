@@ -1,48 +1,156 @@
 #!/usr/bin/env python3
+"""
+Validate a lab's recorded artifacts against the tool schemas.
+
+Schemas come from agents/tools/schema/*.json, keyed by their "title" (the
+tool name, e.g. evm.get_balance). Only artifacts tagged with a tool in the
+run store are checked. Each schema is compiled into a validator once per
+process; artifacts are validated in chunks on a process pool, and a
+per-tool summary is printed at the end.
+"""
 import argparse
 import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain
 from pathlib import Path
-from jsonschema import validate, ValidationError
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from jsonschema.validators import validator_for
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from agents.run_store import run_store
+
+SCHEMA_DIR = Path(__file__).resolve().parents[1] / "agents" / "tools" / "schema"
+CHUNK = 2_000
+MAX_ERRORS_SHOWN = 20
+
+Item = Tuple[str, str, str]  # (run id, tool, body JSON)
 
 
-SCHEMAS = {
-    "evm.get_balance": Path("agents/tools/schema/evm_get_balance.schema.json"),
-    "evm.send_transfer": Path("agents/tools/schema/evm_send_transfer.schema.json"),
-}
+def load_registry(schema_dir: Path = SCHEMA_DIR) -> Dict[str, Path]:
+    """Tool name -> schema file, from each schema's title (or evm_get_balance.schema.json -> evm.get_balance)."""
+    registry = {}
+    for path in sorted(schema_dir.glob("*.json")):
+        schema = json.loads(path.read_text())
+        tool = schema.get("title") or path.name.split(".", 1)[0].replace("_", ".", 1)
+        registry[tool] = path
+    return registry
+
+
+@lru_cache(maxsize=None)
+def compiled(path: str) -> Any:
+    """Validator for one schema file, built (and the schema checked) once per process."""
+    schema = json.loads(Path(path).read_text())
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema)
+
+
+def validate_chunk(registry: Dict[str, Path], items: List[Item]) -> Tuple[Dict[str, List[int]], List[str]]:
+    """Validate (run id, tool, body) items -> ({tool: [ok, failed]}, error lines)."""
+    counts: Dict[str, List[int]] = {}
+    errors = []
+    for run_id, tool, body in items:
+        c = counts.setdefault(tool, [0, 0])
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            c[1] += 1
+            errors.append(f"Invalid JSON for {tool} in run {run_id}: {e}")
+            continue
+        found = [e.message for e in compiled(str(registry[tool])).iter_errors(data)]
+        if found:
+            c[1] += 1
+            errors.append(f"Schema mismatch for {tool} in run {run_id}: {'; '.join(found)}")
+        else:
+            c[0] += 1
+    return counts, errors
+
+
+def chunks(items: Iterator[Item], size: int) -> Iterator[List[Item]]:
+    batch: List[Item] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_lab(lab: str, workers: Optional[int] = None, chunk: int = CHUNK) -> Dict[str, Any]:
+    """Validate every tool-tagged artifact of a lab; returns the summary."""
+    registry = load_registry()
+    summary: Dict[str, Any] = {"lab": lab, "artifacts": 0, "untagged": 0, "no_schema": {}, "tools": {}, "errors": []}
+
+    def tagged() -> Iterator[Item]:
+        for run_id, _task, tool, body in run_store().artifacts(lab, parse=False):
+            summary["artifacts"] += 1
+            if not tool:
+                summary["untagged"] += 1
+            elif tool not in registry:
+                summary["no_schema"][tool] = summary["no_schema"].get(tool, 0) + 1
+            else:
+                yield run_id, tool, body
+
+    def fold(result: Tuple[Dict[str, List[int]], List[str]]) -> None:
+        counts, errors = result
+        for tool, (ok, failed) in counts.items():
+            c = summary["tools"].setdefault(tool, {"valid": 0, "invalid": 0})
+            c["valid"] += ok
+            c["invalid"] += failed
+        summary["errors"] += errors
+
+    batches = chunks(tagged(), chunk)
+    first, second = next(batches, None), next(batches, None)
+    pending = chain(filter(None, [first, second]), batches)
+    if second is None or workers == 1:
+        # A single chunk is not worth starting processes for
+        for batch in pending:
+            fold(validate_chunk(registry, batch))
+        return summary
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for result in pool.map(partial(validate_chunk, registry), pending):
+            fold(result)
+    return summary
 
 
 def main():
     p = argparse.ArgumentParser(description="Validate lab artifacts against known schemas")
     p.add_argument("lab", help="labs/day-XXX-... path")
+    p.add_argument("--workers", type=int, default=None, help="validation processes (default: CPU count)")
+    p.add_argument("--json", action="store_true", help="print the summary as JSON")
     args = p.parse_args()
-    lab = Path(args.lab)
-    runs = lab / "runs"
-    if not runs.exists():
-        print("No runs folder to validate.")
+    summary = validate_lab(Path(args.lab).name, args.workers)
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for line in summary["errors"][:MAX_ERRORS_SHOWN]:
+            print(line)
+        if len(summary["errors"]) > MAX_ERRORS_SHOWN:
+            print(f"... and {len(summary['errors']) - MAX_ERRORS_SHOWN} more")
+        print(f"{summary['artifacts']} artifact(s) recorded for {summary['lab']}; "
+              f"{summary['untagged']} not tagged with a tool")
+        for tool in sorted(summary["tools"]):
+            c = summary["tools"][tool]
+            print(f"  {tool:<20} {c['valid']:>8} valid {c['invalid']:>8} invalid")
+        for tool, n in sorted(summary["no_schema"].items()):
+            print(f"  {tool:<20} {n:>8} without a schema")
+    if not summary["artifacts"]:
+        if not args.json:
+            print("No artifacts recorded to validate.")
         return
-    # Basic heuristic: open all json artifacts and check they are valid JSON
-    errors = 0
-    for f in runs.glob("*.json"):
-        try:
-            data = json.loads(f.read_text())
-        except Exception as e:
-            print(f"Invalid JSON: {f}: {e}")
-            errors += 1
-            continue
-        # Optional: if file name includes a tool, validate payload
-        for tool, schema_path in SCHEMAS.items():
-            if tool.replace(".", "_") in f.name and schema_path.exists():
-                schema = json.loads(schema_path.read_text())
-                try:
-                    validate(instance=data, schema=schema)
-                except ValidationError as e:
-                    print(f"Schema mismatch for {tool} in {f}: {e.message}")
-                    errors += 1
-    if errors:
+    if summary["errors"]:
         raise SystemExit(1)
-    print("All artifacts valid.")
+    if not args.json:
+        print("All artifacts valid.")
 
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,72 @@
+import random
+
+import numpy as np
+
+from agents.analytics import ZERO_ADDRESS, chunk_columns, flow_stats, join_limbs, split_limbs
+
+MAX = (1 << 256) - 1
+
+
+def reference(rows, bucket_blocks):
+    net, buckets = {}, {}
+    for block, src, dst, value in rows:
+        net[src] = net.get(src, 0) - value
+        net[dst] = net.get(dst, 0) + value
+        b = buckets.setdefault(block // bucket_blocks, {"count": 0, "volume": 0, "senders": set()})
+        b["count"] += 1
+        b["volume"] += value
+        b["senders"].add(src)
+    return net, buckets
+
+
+def transfers(n, seed=7):
+    rnd = random.Random(seed)
+    addrs = [ZERO_ADDRESS] + ["0x%040x" % i for i in range(1, 40)]
+    rows = []
+    for i in range(n):
+        value = rnd.choice([0, 1, rnd.getrandbits(64), rnd.getrandbits(200), MAX >> rnd.randrange(8)])
+        rows.append((i // 3, rnd.choice(addrs), rnd.choice(addrs), value))
+    return rows
+
+
+def test_limbs_round_trip_uint256():
+    values = [0, 1, (1 << 64) - 1, 1 << 64, (1 << 128) + 5, MAX]
+    assert join_limbs(split_limbs(values)).tolist() == values
+    assert join_limbs(split_limbs([str(v) for v in values])).tolist() == values
+    assert split_limbs([]).shape == (0, 8)
+
+
+def test_flow_stats_match_exact_python_ints_across_chunks():
+    rows = transfers(3_000)
+    stats = flow_stats(chunk_columns(rows, size=250), bucket_blocks=100)
+    net, buckets = reference(rows, 100)
+
+    assert stats.events == len(rows)
+    assert stats.net_balances() == net
+    assert stats.over_time() == [
+        {"from_block": b * 100, "count": v["count"], "volume": v["volume"], "unique_senders": len(v["senders"])}
+        for b, v in sorted(buckets.items())
+    ]
+
+
+def test_holders_are_exact_and_skip_the_mint_address():
+    rows = transfers(2_000, seed=11)
+    stats = flow_stats(chunk_columns(rows, size=500))
+    net, _ = reference(rows, 1_000)
+    expected = sorted(((a, v) for a, v in net.items() if v > 0 and a != ZERO_ADDRESS), key=lambda x: -x[1])
+
+    assert stats.holders() == expected
+    assert stats.holders(3) == expected[:3]
+
+
+def test_values_close_to_each_other_are_ranked_exactly():
+    a, b = "0x" + "a" * 40, "0x" + "b" * 40
+    rows = [(1, ZERO_ADDRESS, a, MAX - 1), (1, ZERO_ADDRESS, b, MAX)]
+    assert [addr for addr, _ in flow_stats(chunk_columns(rows)).holders(1)] == [b]
+
+
+def test_empty_chunks_are_ignored():
+    stats = flow_stats([(np.zeros(0, dtype=np.int64), [], [], split_limbs([]))])
+    assert stats.events == 0
+    assert stats.holders() == []
+    assert stats.over_time() == []
@@ -0,0 +1,67 @@
+from agents.tools.blocks import ChainCache
+
+
+class FakeChain:
+    """Fake node serving blocks by number and hash; `fork` replaces a range of heights."""
+
+    endpoint = "fake"
+
+    def __init__(self, head):
+        self.blocks = {}
+        self.by_hash = {}
+        self.head = 0
+        self.extend(head)
+
+    def _put(self, n, tag):
+        parent = self.blocks[n - 1]["hash"] if n else "0x" + "00" * 32
+        block = {"number": hex(n), "hash": "0x%s%060x" % (tag, n), "parentHash": parent}
+        self.blocks[n] = block
+        self.by_hash[block["hash"]] = block
+
+    def extend(self, head, tag="aaaa"):
+        for n in range(self.head + 1 if self.blocks else 0, head + 1):
+            self._put(n, tag)
+        self.head = head
+
+    def fork(self, start, tag):
+        for n in range(start, self.head + 1):
+            self._put(n, tag)
+
+    def call(self, method, params):
+        if method == "eth_getBlockByHash":
+            return self.by_hash.get(params[0])
+        tag = params[0]
+        return self.blocks.get(self.head if tag == "latest" else int(tag, 16))
+
+    def batch(self, calls):
+        return [{"result": self.call(m, p)} for m, p in calls]
+
+
+def test_head_seen_before_a_reorg_is_not_served_once_confirmed():
+    chain = FakeChain(130)
+    cache = ChainCache(chain, confirmations=12, head_ttl=0)
+    assert cache.block_number() == 130
+    chain.fork(100, "bbbb")
+    chain.extend(142, "bbbb")
+    assert cache.get_block(130)["hash"] == chain.blocks[130]["hash"]
+    assert cache.get_blocks([100, 130])[1]["hash"] == chain.blocks[130]["hash"]
+
+
+def test_confirmed_blocks_are_served_from_cache():
+    chain = FakeChain(50)
+    cache = ChainCache(chain, confirmations=12, head_ttl=0)
+    first = cache.get_block(10)
+    misses = cache.misses
+    assert cache.get_block(10) == first
+    assert cache.misses == misses
+
+
+def test_block_fetched_by_hash_does_not_replace_the_canonical_height():
+    chain = FakeChain(50)
+    cache = ChainCache(chain, confirmations=12, head_ttl=0)
+    canonical = cache.get_block(10)
+    orphan = {"number": hex(10), "hash": "0x" + "ee" * 32, "parentHash": chain.blocks[9]["hash"]}
+    chain.by_hash[orphan["hash"]] = orphan
+    assert cache.get_block(orphan["hash"]) == orphan
+    assert cache.get_block(10) == canonical
+    assert cache.reorgs == 0
@@ -0,0 +1,67 @@
+import random
+
+import pytest
+
+from scripts.generate_report import SKETCH_ACCURACY, LogHistogram, aggregate, compare, wilson
+
+
+def samples(n, seed=3):
+    rnd = random.Random(seed)
+    return [rnd.lognormvariate(5, 1.5) for _ in range(n)] + [0.0] * (n // 20)
+
+
+def sketch(values):
+    h = LogHistogram()
+    for v in values:
+        h.add(v)
+    return h
+
+
+@pytest.mark.parametrize("q", [0.0, 0.5, 0.9, 0.99, 1.0])
+def test_quantiles_are_within_the_relative_accuracy(q):
+    values = samples(5_000)
+    exact = sorted(values)[int(q * (len(values) - 1))]
+    got = sketch(values).quantile(q)
+    assert got == pytest.approx(exact, rel=SKETCH_ACCURACY, abs=1e-9)
+
+
+def test_merged_sketches_equal_one_sketch_of_all_values():
+    values = samples(2_000)
+    merged = sketch(values[:700])
+    merged.merge(sketch(values[700:]))
+    whole = sketch(values)
+    assert merged.buckets == whole.buckets
+    assert (merged.count, merged.zeros, merged.min, merged.max) == (whole.count, whole.zeros, whole.min, whole.max)
+
+
+def test_sketch_round_trips_through_json_dict():
+    h = sketch(samples(500))
+    again = LogHistogram.from_dict(h.to_dict())
+    assert [again.quantile(q) for q in (0.5, 0.99)] == [h.quantile(q) for q in (0.5, 0.99)]
+    assert LogHistogram().quantile(0.5) is None
+
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        LogHistogram(0.01).merge(LogHistogram(0.02))
+
+
+def test_wilson_interval():
+    assert wilson(0, 0) == (0.0, 1.0)
+    lo, hi = wilson(5, 10)
+    assert lo == pytest.approx(0.2366, abs=1e-4)
+    assert hi == pytest.approx(0.7634, abs=1e-4)
+    lo, hi = wilson(10, 10)
+    assert hi == 1.0 and lo == pytest.approx(0.7225, abs=1e-4)
+
+
+def test_regressions_against_a_baseline():
+    runs = [{"framework": "f", "task": "t", "success": i % 4 != 0, "latency_ms": 100 + i} for i in range(200)]
+    base = aggregate(iter(runs))[("f", "t")].summary()
+    assert compare(base, base, 0.1) == []
+
+    slower = [{**r, "latency_ms": r["latency_ms"] * 2, "success": False} for r in runs]
+    current = aggregate(iter(slower))[("f", "t")].summary()
+    found = compare(current, base, 0.1)
+    assert any(f.startswith("success rate") for f in found)
+    assert any(f.startswith("latency p50") for f in found)
@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from agents.ledger import SpendLedger
+from agents.policies import Budget
+
+WALLET, TO = "0xWallet", "0xDest"
+
+
+def budgets(**limits):
+    return [Budget("wallet", "1m", 60, **limits)]
+
+
+def test_charge_is_on_disk_before_it_returns(tmp_path):
+    path = tmp_path / "ledger.jsonl"
+    ledger = SpendLedger(path, flush_interval=3600)
+    ledger.charge(budgets(max_value_wei=100), WALLET, TO, 40, now=1000.0)
+    [rec] = [json.loads(line) for line in path.read_text().splitlines()]
+    assert rec["value"] == 40
+    assert rec["wallet"] == WALLET.lower()
+
+
+def test_window_expires_old_entries(tmp_path):
+    ledger = SpendLedger(tmp_path / "ledger.jsonl")
+    b = budgets(max_value_wei=100)
+    ledger.charge(b, WALLET, TO, 80, now=1000.0)
+    with pytest.raises(ValueError):
+        ledger.charge(b, WALLET, TO, 30, now=1030.0)
+    ledger.charge(b, WALLET, TO, 30, now=1061.0)
+
+
+def test_refund_frees_the_budget(tmp_path):
+    ledger = SpendLedger(tmp_path / "ledger.jsonl")
+    b = budgets(max_tx_count=1)
+    ledger.refund(ledger.charge(b, WALLET, TO, 1, now=1000.0))
+    ledger.charge(b, WALLET, TO, 1, now=1001.0)
+
+
+def test_restart_replays_the_ledger(tmp_path, monkeypatch):
+    path = tmp_path / "ledger.jsonl"
+    monkeypatch.setattr("agents.ledger.time.time", lambda: 1010.0)
+    b = budgets(max_tx_count=2)
+    first = SpendLedger(path)
+    first.charge(b, WALLET, TO, 1, now=1000.0)
+    first.refund(first.charge(b, WALLET, TO, 1, now=1001.0))
+    first.charge(b, WALLET, TO, 1, now=1002.0)
+    first.flush()
+
+    restarted = SpendLedger(path)
+    with pytest.raises(ValueError, match="tx count"):
+        restarted.charge(b, WALLET, TO, 1, now=1010.0)
@@ -0,0 +1,77 @@
+import pytest
+import requests
+
+from agents.tools import logs
+from agents.tools.logs import is_range_error, is_rate_error, scan_logs
+
+
+def http_error(status):
+    resp = requests.Response()
+    resp.status_code = status
+    return requests.HTTPError(f"{status} Client Error", response=resp)
+
+
+class FakeLogs:
+    """eth_getLogs over one log per block, rejecting ranges wider than `max_range`."""
+
+    def __init__(self, max_range=None, throttle=0, error=None):
+        self.max_range = max_range
+        self.throttle = throttle
+        self.error = error
+        self.calls = []
+
+    def call(self, method, params):
+        a, b = int(params[0]["fromBlock"], 16), int(params[0]["toBlock"], 16)
+        self.calls.append((a, b))
+        if self.throttle:
+            self.throttle -= 1
+            raise http_error(429)
+        if self.max_range is not None and b - a + 1 > self.max_range:
+            raise ValueError(self.error or {"code": -32005, "message": "block range too large"})
+        return [{"blockNumber": hex(n), "logIndex": "0x0"} for n in range(b, a - 1, -1)]
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(logs.time, "sleep", lambda _: None)
+
+
+def blocks(chunks):
+    return [int(log["blockNumber"], 16) for chunk in chunks for log in chunk]
+
+
+def test_scan_covers_the_range_in_block_order():
+    rpc = FakeLogs()
+    assert blocks(scan_logs(rpc, 10, 99, chunk=7, concurrency=3)) == list(range(10, 100))
+
+
+def test_rejected_ranges_are_split():
+    rpc = FakeLogs(max_range=16)
+    assert blocks(scan_logs(rpc, 0, 199, chunk=100, concurrency=2)) == list(range(200))
+    assert all(b - a + 1 <= 100 for a, b in rpc.calls)
+
+
+def test_range_error_mentioning_429_is_split_not_retried():
+    msg = "query returned more than 10000 results; try [0x429, 0x4290]"
+    rpc = FakeLogs(max_range=8, error={"code": -32005, "message": msg})
+    assert not is_rate_error(ValueError(msg))
+    assert blocks(scan_logs(rpc, 0, 31, chunk=32, concurrency=1)) == list(range(32))
+
+
+def test_rate_limits_are_retried_on_the_same_range():
+    rpc = FakeLogs(throttle=2)
+    assert blocks(scan_logs(rpc, 0, 9, chunk=10, concurrency=1)) == list(range(10))
+    assert rpc.calls == [(0, 9)] * 3
+
+
+def test_rate_limit_is_raised_after_the_retries():
+    rpc = FakeLogs(throttle=logs.RATE_RETRIES + 1)
+    with pytest.raises(requests.HTTPError):
+        list(scan_logs(rpc, 0, 9, chunk=10, concurrency=1))
+
+
+def test_error_classification():
+    assert is_rate_error(http_error(429))
+    assert is_rate_error(ValueError("rate limit exceeded"))
+    assert not is_range_error(ValueError("rate limit exceeded"))
+    assert is_range_error(ValueError("range too large"))
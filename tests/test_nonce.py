@@ -0,0 +1,64 @@
+from agents.tools.nonce import NonceManager, is_nonce_error
+
+KEY = (1, "0xabc")
+
+
+def seeded(pending):
+    m = NonceManager()
+    m.seed(KEY, pending)
+    return m
+
+
+def test_reserve_requires_a_seed():
+    assert NonceManager().reserve(KEY) is None
+
+
+def test_reservations_are_consecutive():
+    m = seeded(5)
+    assert [m.reserve(KEY) for _ in range(3)] == [5, 6, 7]
+
+
+def test_releasing_the_latest_nonce_steps_back():
+    m = seeded(5)
+    m.reserve(KEY)
+    n = m.reserve(KEY)
+    m.release(KEY, n)
+    assert m.reserve(KEY) == 6
+
+
+def test_released_nonce_below_inflight_ones_is_reused():
+    m = seeded(5)
+    a, b = m.reserve(KEY), m.reserve(KEY)
+    m.release(KEY, a)
+    m.seed(KEY, 5)
+    assert m.reserve(KEY) == 5
+    assert m.reserve(KEY) == 7
+    m.sent(KEY, b)
+
+
+def test_release_of_all_reservations_returns_to_the_seed():
+    m = seeded(5)
+    a, b = m.reserve(KEY), m.reserve(KEY)
+    m.release(KEY, a)
+    m.release(KEY, b)
+    assert m.reserve(KEY) == 5
+
+
+def test_resync_does_not_move_below_inflight_nonces():
+    m = seeded(5)
+    a, _b, _c = m.reserve(KEY), m.reserve(KEY), m.reserve(KEY)
+    m.resync(KEY, 3, rejected=a)
+    assert m.reserve(KEY) == 8
+
+
+def test_resync_follows_the_node_when_nothing_is_inflight():
+    m = seeded(5)
+    for _ in range(3):
+        m.sent(KEY, m.reserve(KEY))
+    m.resync(KEY, 6)
+    assert m.reserve(KEY) == 6
+
+
+def test_nonce_errors():
+    assert is_nonce_error(ValueError("nonce too low: next nonce 7, tx nonce 5"))
+    assert not is_nonce_error(ValueError("insufficient funds"))
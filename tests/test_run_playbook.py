@@ -0,0 +1,27 @@
+import pytest
+
+from scripts.run_playbook import critical_path, execute, plan
+
+
+def test_needs_may_point_at_a_later_step():
+    steps = [{"id": "a", "tool": "t", "needs": ["b"]}, {"id": "b", "tool": "t", "needs": []}]
+    records = execute(steps, lambda tool, args: {}, env={}, log=lambda _: None)
+    assert [r["status"] for r in records] == ["ok", "ok"]
+    path, _ = critical_path(records)
+    assert path == ["b", "a"]
+
+
+def test_plan_rejects_cycles():
+    with pytest.raises(SystemExit):
+        plan([{"id": "a", "tool": "t", "needs": ["b"]}, {"id": "b", "tool": "t", "needs": ["a"]}])
+
+
+def test_failure_after_broadcast_keeps_the_tx_hash():
+    tx = "0x" + "ab" * 32
+
+    def call(tool, args):
+        raise SystemExit(f"Transaction {tx} was broadcast but its receipt was not fetched: timeout")
+
+    records = execute([{"id": "send", "tool": "evm.send_transfer"}], call, env={}, log=lambda _: None)
+    assert records[0]["status"] == "failed"
+    assert records[0]["tx_hash"] == tx
@@ -0,0 +1,20 @@
+import json
+
+from agents.run_store import RunStore, import_files
+
+
+def test_import_keeps_legacy_playbook_runs_and_skips_checkpoints(tmp_path):
+    runs = tmp_path / "labs" / "day-001-wallets-and-rpc" / "runs"
+    runs.mkdir(parents=True)
+    (runs / "playbook-20240102T030405Z.json").write_text(json.dumps({"balance": {"wei": 1}}))
+    (runs / "playbook-20240102T030405Z.jsonl").write_text(json.dumps({"id": "balance", "status": "ok"}) + "\n")
+    (runs / "20240102T030405Z-balance.json").write_text(json.dumps({"wei": 1}))
+    store = RunStore(tmp_path / "runs.sqlite")
+
+    assert import_files(store, [runs]) == 2
+    [run] = store.query(kind="playbook")
+    assert run["outputs"] == {"balance": {"wei": 1}}
+    assert run["lab"] == "day-001-wallets-and-rpc"
+    assert run["started_at"] == 1704164645.0
+    assert store.count(kind="artifact") == 1
+    assert import_files(store, [runs]) == 0